@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Fixed-rate load test reporting p50/p99 latency per route.
+
+Requests are scheduled at a constant rate regardless of how quickly earlier
+requests complete, and latency is measured from the scheduled start time so
+that a stalled server is not hidden by fewer requests being sent.
+
+Paths are sampled from the rankings in the local (seeded) database::
+
+    python benchmarks/load_test.py http://localhost:8000 -r 50 -d 60
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+
+import click
+from click import echo
+import numpy as np
+import requests
+
+from growser.app import app
+from growser.models import Ranking, RankingPeriod
+
+
+def sample_paths(num_repos: int) -> list:
+    """Return paths for the most popular repositories, their owners &
+    languages."""
+    with app.app_context():
+        rankings = Ranking.query \
+            .filter(Ranking.language == "All") \
+            .filter(Ranking.period == RankingPeriod.Recent) \
+            .order_by(Ranking.end_date.desc(), Ranking.rank) \
+            .limit(num_repos).all()
+        repos = [r.repository for r in rankings]
+
+    rv = []
+    for repo in repos:
+        rv.append(('repository', '/r/' + repo.name))
+        rv.append(('organization', '/o/' + repo.owner))
+        if repo.language:
+            rv.append(('browse', '/browse/' + repo.language))
+            rv.append(('releases', '/releases/' + repo.language))
+    return rv
+
+
+@click.command()
+@click.argument('url')
+@click.option('-r', '--rate', default=20, help='Requests per second')
+@click.option('-d', '--duration', default=30, help='Seconds to run for')
+@click.option('-n', '--num-repos', default=500, help='Repositories to sample')
+@click.option('-t', '--timeout', default=30, help='Request timeout (seconds)')
+@click.option('-c', '--concurrency', default=200,
+              help='Maximum requests in flight')
+def main(url, rate, duration, num_repos, timeout, concurrency):
+    paths = sample_paths(num_repos)
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    local = threading.local()
+
+    def fetch(route, path, scheduled):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        try:
+            rsp = local.session.get(url + path, timeout=timeout)
+            if rsp.status_code >= 500:
+                errors[route] += 1
+        except requests.RequestException:
+            errors[route] += 1
+        results[route].append((time.perf_counter() - scheduled) * 1000)
+
+    echo('Sending {} requests/sec for {} seconds'.format(rate, duration))
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        for idx in range(rate * duration):
+            scheduled = start + idx / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fetch, *random.choice(paths), scheduled)
+
+    echo('{:<14} {:>7} {:>7} {:>9} {:>9}'.format(
+        'route', 'count', 'errors', 'p50 (ms)', 'p99 (ms)'))
+    for route, latencies in sorted(results.items()):
+        ms = np.array(latencies)
+        echo('{:<14} {:>7} {:>7} {:>9.1f} {:>9.1f}'.format(
+            route, len(ms), errors[route],
+            np.percentile(ms, 50), np.percentile(ms, 99)))
+
+
+if __name__ == '__main__':
+    main()
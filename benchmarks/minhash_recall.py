@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+"""Recall@100 and speedup of MinHash/LSH against exact Jaccard (model 6).
+
+Example::
+
+    python benchmarks/minhash_recall.py data/ratings/120.csv -n 2000
+"""
+import click
+from click import echo
+
+from growser.recommenders.cooccurrence import fetch_ratings
+from growser.recommenders.minhash import NUM_PERM, benchmark
+
+
+@click.command()
+@click.argument('ratings')
+@click.option('-n', '--num-repos', default=2000, help='Repositories to score')
+@click.option('-r', '--recall', default=0.95, help='Candidate recall target')
+@click.option('-t', '--threshold', default=0.1,
+              help='Jaccard similarity the recall target applies to')
+@click.option('-p', '--num-perm', default=NUM_PERM, help='Hash functions')
+def main(ratings, num_repos, recall, threshold, num_perm):
+    matrix = fetch_ratings(ratings, num_repos)
+    results = benchmark(matrix, recall, threshold, num_perm)
+    for key, value in sorted(results.items()):
+        echo('{:<16} {}'.format(key, value))
+
+
+if __name__ == '__main__':
+    main()
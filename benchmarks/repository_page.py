@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Latency of the repository page queries: the previous five ORM queries
+against the single-statement :class:`~growser.queries.FindRepositoryPage`.
+
+Example::
+
+    python benchmarks/repository_page.py -n 200
+"""
+import time
+
+import click
+from click import echo
+import numpy as np
+
+from growser.app import app
+from growser.models import (Ranking, RankingPeriod, Recommendation, Release,
+                            Repository)
+from growser.queries import FindRepositoryPage
+from growser.services import queries
+
+
+def legacy(name: str):
+    """Queries previously issued by ``growser.web.repository``."""
+    repo = Repository.query.filter(Repository.name == name).first()
+    for language in ("All", repo.language):
+        Ranking.query \
+            .filter(Ranking.period == RankingPeriod.Recent) \
+            .filter(Ranking.repo_id == repo.repo_id) \
+            .filter(Ranking.language == language) \
+            .order_by(Ranking.start_date.desc()).first()
+    Release.query.filter(Release.repo_id == repo.repo_id) \
+        .order_by(Release.created_at).all()
+    Recommendation.find_by_repository(3, repo.repo_id, 100)
+
+
+def timed(func, names) -> np.ndarray:
+    rv = []
+    for name in names:
+        start = time.perf_counter()
+        func(name)
+        rv.append((time.perf_counter() - start) * 1000)
+    return np.array(rv)
+
+
+@click.command()
+@click.option('-n', '--num-repos', default=200, help='Repositories to load')
+def main(num_repos):
+    bus = queries(app)
+    with app.app_context():
+        names = [r.repository.name for r in Ranking.query
+                 .filter(Ranking.language == "All")
+                 .filter(Ranking.period == RankingPeriod.Recent)
+                 .order_by(Ranking.end_date.desc(), Ranking.rank)
+                 .limit(num_repos)]
+
+        results = [
+            ('legacy', timed(legacy, names)),
+            ('single', timed(lambda n: bus.execute(FindRepositoryPage(n)),
+                             names))
+        ]
+
+    echo('{:<8} {:>8} {:>8} {:>8}'.format('query', 'mean', 'p50', 'p99'))
+    for name, ms in results:
+        echo('{:<8} {:>8.2f} {:>8.2f} {:>8.2f}'.format(
+            name, ms.mean(), np.percentile(ms, 50), np.percentile(ms, 99)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""Throughput of fixed batches against a sliding window of tasks.
+
+Tasks sleep for a skewed duration: most are short, but a few stragglers take
+much longer. Waiting for each batch leaves workers idle behind every
+straggler, whereas the window starts a new task as soon as any completes.
+A thread pool stands in for the Celery workers::
+
+    python benchmarks/sliding_window.py -n 400 -w 16 --straggler-rate 0.02
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+import random
+import time
+
+import click
+from click import echo
+
+from growser.executor import SlidingWindow
+
+
+class FutureResult:
+    """Adapt a :class:`~concurrent.futures.Future` to the interface of a
+    Celery :class:`~celery.result.AsyncResult`."""
+    def __init__(self, future):
+        self.future = future
+
+    def ready(self):
+        return self.future.done()
+
+    def get(self):
+        return self.future.result()
+
+    def revoke(self, terminate=False):
+        self.future.cancel()
+
+
+def durations(num_tasks: int, short: float, long: float, rate: float,
+              seed: int=0) -> list:
+    """Exponentially distributed durations with a `rate` of stragglers."""
+    rnd = random.Random(seed)
+    return [long if rnd.random() < rate else rnd.expovariate(1 / short)
+            for _ in range(num_tasks)]
+
+
+def run_batched(pool, tasks: list, batch_size: int) -> float:
+    start = time.time()
+    for i in range(0, len(tasks), batch_size):
+        wait([pool.submit(time.sleep, t) for t in tasks[i:i+batch_size]])
+    return time.time() - start
+
+
+def run_window(pool, tasks: list, size: int, timeout: float=None) -> tuple:
+    start = time.time()
+    window = SlidingWindow(lambda t: FutureResult(pool.submit(time.sleep, t)),
+                           size, timeout, interval=0.005)
+    completed = sum(1 for _ in window.map(tasks))
+    return time.time() - start, completed, len(window.timed_out)
+
+
+@click.command()
+@click.option('-n', '--num-tasks', default=400, help='Tasks to run')
+@click.option('-w', '--workers', default=16, help='Concurrent workers')
+@click.option('--short', default=0.02, help='Mean seconds of a task')
+@click.option('--long', default=1.0, help='Seconds of a straggler')
+@click.option('--straggler-rate', default=0.02, help='Share of stragglers')
+@click.option('--timeout', default=None, type=float,
+              help='Seconds before a task in the window is cancelled')
+def main(num_tasks, workers, short, long, straggler_rate, timeout):
+    tasks = durations(num_tasks, short, long, straggler_rate)
+    echo('{} tasks, {:.1f}s of work, {} stragglers'.format(
+        len(tasks), sum(tasks), sum(1 for t in tasks if t == long)))
+
+    with ThreadPoolExecutor(workers) as pool:
+        elapsed = run_batched(pool, tasks, workers)
+        echo('{:<16} {:.2f}s'.format('batched', elapsed))
+
+    with ThreadPoolExecutor(workers) as pool:
+        elapsed, completed, timed_out = run_window(
+            pool, tasks, workers, timeout)
+        echo('{:<16} {:.2f}s ({} completed, {} timed out)'.format(
+            'sliding window', elapsed, completed, timed_out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+-- Move the rolling window for :period from [:prev_start_date, :prev_end_date)
+-- to [:start_date, :end_date) by adding the days that entered the window and
+-- subtracting the days that dropped out of it.
+--
+-- Window updates are serialised, and the delta is only applied if the window
+-- still ends on :prev_end_date, so that rankings for several languages moving
+-- the same window concurrently cannot apply it twice.
+LOCK TABLE ranking_window IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TEMP TABLE window_delta (
+    repo_id INTEGER PRIMARY KEY,
+    delta BIGINT NOT NULL
+);
+
+WITH advanced AS (
+    UPDATE ranking_window
+    SET start_date = :start_date, end_date = :end_date
+    WHERE period = :period
+        AND end_date = :prev_end_date
+    RETURNING period
+)
+INSERT INTO window_delta (repo_id, delta)
+    SELECT
+        repo_id,
+        SUM(CASE WHEN date >= :prev_end_date
+            THEN num_events ELSE -num_events END)
+    FROM repository_daily_events
+    WHERE EXISTS (SELECT 1 FROM advanced)
+        AND ((date >= :prev_end_date AND date < :end_date)
+          OR (date >= :prev_start_date AND date < :start_date))
+    GROUP BY repo_id;
+
+UPDATE ranking_window_events AS w
+SET num_events = w.num_events + d.delta
+FROM window_delta AS d
+WHERE w.period = :period
+    AND w.repo_id = d.repo_id;
+
+INSERT INTO ranking_window_events (period, repo_id, num_events)
+    SELECT :period, repo_id, delta
+    FROM window_delta AS d
+    WHERE d.delta > 0
+        AND NOT EXISTS (
+            SELECT 1
+            FROM ranking_window_events AS w
+            WHERE w.period = :period
+                AND w.repo_id = d.repo_id
+        );
+
+DELETE FROM ranking_window_events
+WHERE period = :period
+    AND num_events <= 0
+    AND repo_id IN (SELECT repo_id FROM window_delta);
+
+DROP TABLE window_delta;
@@ -0,0 +1,37 @@
+-- Move the start of the task queue window from :prev_start_date to
+-- :start_date by subtracting the events of the days leaving it.
+--
+-- The events are only subtracted if the window still starts on
+-- :prev_start_date, so that running this twice cannot subtract them twice.
+LOCK TABLE task_queue_window IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TEMP TABLE queue_expired (
+    repo_id INTEGER PRIMARY KEY,
+    num_events BIGINT NOT NULL
+);
+
+WITH advanced AS (
+    UPDATE task_queue_window
+    SET start_date = :start_date
+    WHERE start_date = :prev_start_date
+    RETURNING start_date
+)
+INSERT INTO queue_expired (repo_id, num_events)
+    SELECT repo_id, SUM(num_events)
+    FROM repository_daily_events
+    WHERE EXISTS (SELECT 1 FROM advanced)
+        AND date >= :prev_start_date
+        AND date < :start_date
+    GROUP BY repo_id;
+
+UPDATE task_queue AS q
+SET num_events = q.num_events - e.num_events
+FROM queue_expired AS e
+WHERE e.repo_id = q.repo_id;
+
+-- Repositories without events in the window, as rebuild_task_queue.sql
+DELETE FROM task_queue
+WHERE num_events <= 0
+    AND repo_id IN (SELECT repo_id FROM queue_expired);
+
+DROP TABLE queue_expired;
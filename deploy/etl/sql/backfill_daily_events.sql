@@ -0,0 +1,7 @@
+-- One-off backfill of repository_daily_events from existing ratings
+TRUNCATE repository_daily_events;
+
+INSERT INTO repository_daily_events (repo_id, date, num_events)
+    SELECT repo_id, created_at::date, COUNT(1)
+    FROM rating
+    GROUP BY repo_id, created_at::date;
@@ -0,0 +1,6 @@
+-- One-off backfill of owner from existing repositories. Run with
+-- update_owners.sql appended:
+--   cat backfill_owners.sql update_owners.sql | psql growser
+SELECT DISTINCT owner
+INTO TEMP owners_tmp
+FROM repository;
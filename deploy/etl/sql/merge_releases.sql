@@ -1,10 +1,11 @@
-SELECT
+-- Merge releases fetched from the GitHub API in release_tmp. Authors missing
+-- from login keep the GitHub user ID of the API response.
+SELECT DISTINCT ON (r.release_id)
     r.release_id,
     rr.repo_id,
-    l.login_id,
+    COALESCE(l.login_id, r.author_id) AS login_id,
     r.url,
     r.name,
-    r.commitish,
     r.tag,
     r.body,
     r.published_at,
@@ -12,21 +13,28 @@ SELECT
 INTO TEMP releases_ins
 FROM release_tmp AS r
 JOIN repository AS rr ON rr.name = r.repo
-JOIN login AS l ON l.login = r.login
-WHERE rr.num_events >= 500;
-
-DELETE FROM releases_ins WHERE EXISTS (
+LEFT JOIN login AS l ON l.login = r.login
+WHERE NOT EXISTS (
     SELECT 1
     FROM release
-    WHERE release_id = releases_ins.release_id
+    WHERE release_id = r.release_id
 );
 
-INSERT INTO release SELECT * FROM releases_ins;
+INSERT INTO release (release_id, repo_id, login_id, url, name, tag, body,
+                     published_at, created_at)
+    SELECT release_id, repo_id, login_id, url, name, tag, body,
+           published_at, created_at
+    FROM releases_ins;
 
 UPDATE repository AS r
 SET last_release_at = u.published_at
-FROM releases_ins AS u
-WHERE u.repo_id = r.repo_id;
+FROM (
+    SELECT repo_id, MAX(published_at) AS published_at
+    FROM releases_ins
+    GROUP BY repo_id
+) AS u
+WHERE u.repo_id = r.repo_id
+  AND (r.last_release_at IS NULL OR r.last_release_at < u.published_at);
 
 DROP TABLE release_tmp;
-DROP TABLE releases_ins;
\ No newline at end of file
+DROP TABLE releases_ins;
@@ -50,6 +50,21 @@ WHERE r.old_repo_id = t.repo_id
             AND r2.repo_id = r.new_repo_id
     );
 
+-- Daily event counts for ratings not already stored
+SELECT
+    repo_id,
+    created_at::date AS date,
+    COUNT(1) AS num_events
+INTO TEMP daily_events_tmp
+FROM rating_tmp AS rt
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM rating AS r
+    WHERE r.login_id = rt.login_id
+        AND r.repo_id = rt.repo_id
+)
+GROUP BY repo_id, created_at::date;
+
 INSERT INTO rating
 	SELECT *
 	FROM rating_tmp AS rt
@@ -73,6 +88,88 @@ SET num_events = r.num_events + u.num_events
 FROM repo_events AS u
 WHERE u.repo_id = r.repo_id;
 
+UPDATE repository_daily_events AS d
+SET num_events = d.num_events + u.num_events
+FROM daily_events_tmp AS u
+WHERE u.repo_id = d.repo_id
+    AND u.date = d.date;
+
+INSERT INTO repository_daily_events (repo_id, date, num_events)
+    SELECT repo_id, date, num_events
+    FROM daily_events_tmp AS u
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM repository_daily_events AS d
+        WHERE d.repo_id = u.repo_id
+            AND d.date = u.date
+    );
+
+-- Add new events within each rolling window to its totals (see
+-- advance_ranking_window.sql, which this waits on so that no days are missed)
+LOCK TABLE ranking_window IN SHARE ROW EXCLUSIVE MODE;
+
+SELECT
+    w.period,
+    u.repo_id,
+    SUM(u.num_events) AS num_events
+INTO TEMP window_events_tmp
+FROM daily_events_tmp AS u
+JOIN ranking_window AS w ON u.date >= w.start_date AND u.date < w.end_date
+GROUP BY w.period, u.repo_id;
+
+UPDATE ranking_window_events AS w
+SET num_events = w.num_events + u.num_events
+FROM window_events_tmp AS u
+WHERE u.period = w.period
+    AND u.repo_id = w.repo_id;
+
+INSERT INTO ranking_window_events (period, repo_id, num_events)
+    SELECT period, repo_id, num_events
+    FROM window_events_tmp AS u
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM ranking_window_events AS w
+        WHERE w.period = u.period
+            AND w.repo_id = u.repo_id
+    );
+
+-- Add new events within the window to the task queue (see rebuild_task_queue.sql)
+LOCK TABLE task_queue_window IN SHARE ROW EXCLUSIVE MODE;
+
+SELECT
+    u.repo_id,
+    SUM(u.num_events) AS num_events
+INTO TEMP queue_events_tmp
+FROM daily_events_tmp AS u
+JOIN task_queue_window AS w ON u.date >= w.start_date
+GROUP BY u.repo_id;
+
+UPDATE task_queue AS q
+SET num_events = q.num_events + u.num_events
+FROM queue_events_tmp AS u
+WHERE u.repo_id = q.repo_id;
+
+INSERT INTO task_queue (task, repo_id, num_events)
+    SELECT t.task, u.repo_id, u.num_events
+    FROM queue_events_tmp AS u
+    JOIN repository AS r ON r.repo_id = u.repo_id AND r.status = 1
+    CROSS JOIN (VALUES ('github.api.repos'), ('screenshot')) AS t (task)
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM task_queue AS q
+        WHERE q.task = t.task
+            AND q.repo_id = u.repo_id
+    );
+
+-- Owners of repositories with new events, updated by update_owners.sql
+SELECT DISTINCT r.owner
+INTO TEMP owners_tmp
+FROM repo_events AS u
+JOIN repository AS r ON r.repo_id = u.repo_id;
+
+DROP TABLE window_events_tmp;
+DROP TABLE queue_events_tmp;
+DROP TABLE daily_events_tmp;
 DROP TABLE rating_tmp;
 DROP TABLE login_tmp;
 DROP TABLE repository_tmp;
@@ -0,0 +1,15 @@
+-- Recalculate the rolling window for :period from the daily rollups
+LOCK TABLE ranking_window IN SHARE ROW EXCLUSIVE MODE;
+
+DELETE FROM ranking_window_events WHERE period = :period;
+
+INSERT INTO ranking_window_events (period, repo_id, num_events)
+    SELECT :period, repo_id, SUM(num_events)
+    FROM repository_daily_events
+    WHERE date >= :start_date
+        AND date < :end_date
+    GROUP BY repo_id;
+
+DELETE FROM ranking_window WHERE period = :period;
+INSERT INTO ranking_window (period, start_date, end_date)
+    VALUES (:period, :start_date, :end_date);
@@ -0,0 +1,25 @@
+-- Rebuild the task queue from the daily rollups & repository_task history.
+-- Each task type matches the repository_task names recorded by its handlers.
+LOCK TABLE task_queue_window IN SHARE ROW EXCLUSIVE MODE;
+
+TRUNCATE task_queue;
+
+INSERT INTO task_queue (task, repo_id, num_events, refreshed_at)
+    SELECT t.task, e.repo_id, e.num_events, MAX(rt.created_at)
+    FROM (
+        SELECT repo_id, SUM(num_events) AS num_events
+        FROM repository_daily_events
+        WHERE date >= :start_date
+        GROUP BY repo_id
+    ) AS e
+    JOIN repository AS r ON r.repo_id = e.repo_id AND r.status = 1
+    CROSS JOIN (VALUES
+        ('github.api.repos', 'github.api.repos'),
+        ('screenshot', 'screenshot.%')
+    ) AS t (task, pattern)
+    LEFT JOIN repository_task AS rt
+        ON rt.repo_id = e.repo_id AND rt.name LIKE t.pattern
+    GROUP BY t.task, e.repo_id, e.num_events;
+
+DELETE FROM task_queue_window;
+INSERT INTO task_queue_window (start_date) VALUES (:start_date);
@@ -0,0 +1,73 @@
+-- Recalculate the totals of every owner in owners_tmp. Appended to the events
+-- ETL & GitHub API updates, which create owners_tmp from the repositories
+-- they changed.
+SELECT
+    r.owner,
+    COUNT(1) AS num_repos,
+    SUM(r.num_events) AS num_events,
+    SUM(r.num_stars) AS num_stars,
+    SUM(r.num_forks) AS num_forks
+INTO TEMP owner_totals_tmp
+FROM repository AS r
+JOIN owners_tmp AS o ON o.owner = r.owner
+WHERE r.status = 1
+GROUP BY r.owner;
+
+-- Top 5 languages of each owner by number of events
+SELECT
+    owner,
+    array_agg(language ORDER BY pos) AS languages
+INTO TEMP owner_languages_tmp
+FROM (
+    SELECT
+        r.owner,
+        r.language,
+        ROW_NUMBER() OVER (
+            PARTITION BY r.owner
+            ORDER BY SUM(r.num_events) DESC, r.language
+        ) AS pos
+    FROM repository AS r
+    JOIN owners_tmp AS o ON o.owner = r.owner
+    WHERE r.status = 1
+        AND r.language <> ''
+    GROUP BY r.owner, r.language
+) AS l
+WHERE pos <= 5
+GROUP BY owner;
+
+UPDATE owner
+SET num_repos  = t.num_repos,
+    num_events = t.num_events,
+    num_stars  = t.num_stars,
+    num_forks  = t.num_forks,
+    languages  = COALESCE(l.languages, '{}'),
+    updated_at = NOW()
+FROM owner_totals_tmp AS t
+LEFT JOIN owner_languages_tmp AS l ON l.owner = t.owner
+WHERE t.owner = owner.owner;
+
+INSERT INTO owner (owner, num_repos, num_events, num_stars, num_forks,
+                   languages, updated_at)
+    SELECT t.owner, t.num_repos, t.num_events, t.num_stars, t.num_forks,
+           COALESCE(l.languages, '{}'), NOW()
+    FROM owner_totals_tmp AS t
+    LEFT JOIN owner_languages_tmp AS l ON l.owner = t.owner
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM owner
+        WHERE owner.owner = t.owner
+    );
+
+-- Owners without any active repositories
+DELETE FROM owner
+USING owners_tmp AS o
+WHERE o.owner = owner.owner
+    AND NOT EXISTS (
+        SELECT 1
+        FROM owner_totals_tmp AS t
+        WHERE t.owner = o.owner
+    );
+
+DROP TABLE owner_languages_tmp;
+DROP TABLE owner_totals_tmp;
+DROP TABLE owners_tmp;
@@ -0,0 +1,46 @@
+-- Rank movement between consecutive end dates in [:start_date, :end_date].
+-- Rankings from :scan_date (two days prior to :start_date) onwards are read
+-- so that the first day has both a prior rank and a prior velocity.
+DELETE FROM ranking_trend
+WHERE end_date BETWEEN :start_date AND :end_date
+    AND period IN :periods
+    AND language IN :languages;
+
+INSERT INTO ranking_trend (language, period, repo_id, end_date, rank,
+                           num_events, rank_delta, velocity, acceleration)
+SELECT
+    language,
+    period,
+    repo_id,
+    end_date,
+    rank,
+    num_events,
+    rank_delta,
+    velocity,
+    acceleration
+FROM (
+    SELECT
+        v.*,
+        CASE WHEN LAG(end_date) OVER w = end_date - 1
+            THEN velocity - LAG(velocity) OVER w END AS acceleration
+    FROM (
+        SELECT
+            language,
+            period,
+            repo_id,
+            end_date,
+            rank,
+            num_events,
+            CASE WHEN LAG(end_date) OVER w = end_date - 1
+                THEN LAG(rank) OVER w - rank END AS rank_delta,
+            CASE WHEN LAG(end_date) OVER w = end_date - 1
+                THEN num_events - LAG(num_events) OVER w END AS velocity
+        FROM ranking
+        WHERE end_date BETWEEN :scan_date AND :end_date
+            AND period IN :periods
+            AND language IN :languages
+        WINDOW w AS (PARTITION BY language, period, repo_id ORDER BY end_date)
+    ) AS v
+    WINDOW w AS (PARTITION BY language, period, repo_id ORDER BY end_date)
+) AS a
+WHERE end_date >= :start_date;
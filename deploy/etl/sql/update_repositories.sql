@@ -1,17 +1,44 @@
-UPDATE repository SET
-    description   = u.description,
-    homepage      = u.homepage,
-    language      = u.language,
-    num_forks     = u.num_forks,
-    num_stars     = u.num_stars,
-    num_watchers  = u.num_watchers,
-    updated_at    = NOW()
-FROM repos_tmp AS u
-WHERE u.name = repository.name;
+-- Apply GitHub API results in repos_tmp to repository in a single statement:
+-- found repositories are updated and missing ones disabled. Every repository
+-- checked is recorded as a task and marked as refreshed in the task queue so
+-- that it is not fetched again too soon.
+WITH checked AS (
+    UPDATE repository AS r SET
+        description   = CASE WHEN u.found THEN COALESCE(u.description, '') ELSE r.description END,
+        homepage      = CASE WHEN u.found THEN COALESCE(u.homepage, '') ELSE r.homepage END,
+        language      = CASE WHEN u.found THEN COALESCE(u.language, '') ELSE r.language END,
+        num_forks     = CASE WHEN u.found THEN u.num_forks ELSE r.num_forks END,
+        num_stars     = CASE WHEN u.found THEN u.num_stars ELSE r.num_stars END,
+        num_watchers  = CASE WHEN u.found THEN u.num_watchers ELSE r.num_watchers END,
+        updated_at    = CASE WHEN u.found THEN NOW() ELSE r.updated_at END,
+        status        = CASE WHEN u.found THEN r.status ELSE 2 END
+    FROM repos_tmp AS u
+    WHERE u.name = r.name
+    RETURNING r.repo_id
+), tasks AS (
+    INSERT INTO repository_task (repo_id, name, created_at)
+        SELECT repo_id, 'github.api.repos', NOW()
+        FROM checked
+)
+UPDATE task_queue AS q
+SET refreshed_at = NOW()
+FROM checked AS c
+WHERE q.task = 'github.api.repos'
+    AND q.repo_id = c.repo_id;
 
-INSERT INTO repository_task (repo_id, name, created_at)
-    SELECT r.repo_id, 'github.api.repos', NOW()
+-- Disabled repositories are no longer refreshed by any task
+DELETE FROM task_queue
+WHERE repo_id IN (
+    SELECT r.repo_id
     FROM repos_tmp AS t
-    JOIN repository AS r ON r.name = t.name;
+    JOIN repository AS r ON r.name = t.name
+    WHERE NOT t.found
+);
 
-DROP TABLE repos_tmp;
\ No newline at end of file
+-- Owners of the updated repositories, updated by update_owners.sql
+SELECT DISTINCT r.owner
+INTO TEMP owners_tmp
+FROM repos_tmp AS t
+JOIN repository AS r ON r.name = t.name;
+
+DROP TABLE repos_tmp;
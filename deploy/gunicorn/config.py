@@ -0,0 +1,40 @@
+"""Gunicorn settings for growser.web.
+
+Example::
+
+    gunicorn -c deploy/gunicorn/config.py growser.web:app
+
+Each gevent worker serves up to ``worker_connections`` requests
+concurrently, so a slow query no longer blocks every other request handled
+by the same worker. Each worker has its own connection pool, so keep
+``worker_connections <= SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW``
+and ``workers * (SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW)`` below
+Postgres' ``max_connections``.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', ':8000')
+
+#: ``gevent`` for concurrent requests, ``sync`` for one request per worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+#: Concurrent requests per gevent worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 50))
+
+#: Restart workers that have not responded in this many seconds
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+#: Bound the time a single request can spend in Postgres (milliseconds).
+#: Only web workers receive this setting; Celery ETL jobs are unaffected.
+raw_env = ['GROWSER_STATEMENT_TIMEOUT={}'.format(
+    os.environ.get('GROWSER_STATEMENT_TIMEOUT', 10000))]
+
+
+def post_fork(server, worker):
+    """Make psycopg2 cooperative so queries yield to other greenlets."""
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
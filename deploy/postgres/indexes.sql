@@ -0,0 +1,18 @@
+-- Indexes supporting keyset pagination. Apply once the tables exist:
+--   psql growser < deploy/postgres/indexes.sql
+
+-- /browse/<language>: WHERE end_date, language, period ORDER BY rank, repo_id
+CREATE INDEX ix_ranking_browse
+    ON ranking (end_date, language, period, rank, repo_id);
+
+-- /releases: ORDER BY created_at DESC, release_id DESC
+CREATE INDEX ix_release_created_at
+    ON release (created_at DESC, release_id DESC);
+
+-- /releases/<language>: EXISTS (... repository.language = ?)
+CREATE INDEX ix_repository_language
+    ON repository (repo_id, language);
+
+-- /o/<name>: WHERE owner ORDER BY num_events DESC, repo_id DESC
+CREATE INDEX ix_repository_owner
+    ON repository (owner, num_events DESC, repo_id DESC);
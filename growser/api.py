@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from datetime import date, datetime
+import ujson as json
+
+from flask import Blueprint, Response, abort, request
+
+from growser.app import app, cache
+from growser.emojis import render_release
+from growser.queries import (
+    FindCurrentRankings,
+    FindProject,
+    FindProjects,
+    FindRecommendations,
+    FindRecommendationsBatch,
+    FindRelease,
+    FindReleases,
+    FindTopLanguages
+)
+from growser.reference import reference
+from growser.search import search
+from growser.services import queries
+
+#: Maximum number of repositories per batch request
+MAX_BATCH_SIZE = 100
+
+#: Maximum number of results per request
+MAX_LIMIT = 100
+
+#: Seconds to keep a rendered release body; bodies rarely change
+RELEASE_TIMEOUT = 86400 * 7
+
+#: JSON endpoints backed by the queries in :mod:`growser.queries`
+api = Blueprint('api', __name__, url_prefix='/api')
+
+#: Executes :mod:`growser.queries` using the handlers in ``CMDR_QUERIES``
+bus = queries(app)
+
+
+@api.route('/repos')
+def repositories():
+    """Batch lookup of repositories: ``/api/repos?name=a/b&name=c/d``."""
+    names = batch_args('name', str)
+    return to_json(bus.execute(FindProjects(names)))
+
+
+@api.route('/repos/<path:name>')
+def repository(name: str):
+    repo = bus.execute(FindProject(name))
+    if not repo:
+        abort(404)
+    return to_json(repo)
+
+
+@api.route('/rankings/<int:repo_id>')
+@cache.page('rankings')
+def rankings(repo_id: int):
+    return to_json(bus.execute(FindCurrentRankings(repo_id)))
+
+
+@api.route('/recommendations/<int:repo_id>')
+@cache.page('recommendations')
+def recommendations(repo_id: int):
+    query = FindRecommendations(repo_id, model_arg(), limit_arg())
+    return to_json(bus.execute(query))
+
+
+@api.route('/recommendations')
+@cache.page('recommendations')
+def recommendations_batch():
+    """Batch lookup: ``/api/recommendations?repo_id=1&repo_id=2``.
+
+    Returns ``{repo_id: [[recommended_repo_id, score], ...]}``.
+    """
+    query = FindRecommendationsBatch(
+        batch_args('repo_id', int), model_arg(), limit_arg())
+
+    rv = OrderedDict((repo_id, []) for repo_id in query.repo_ids)
+    for repo_id, recommended_repo_id, score in bus.execute(query):
+        rv[repo_id].append([recommended_repo_id, score])
+    return to_json(rv)
+
+
+@api.route('/releases/<int:repo_id>')
+@cache.page('releases')
+def releases(repo_id: int):
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return to_json(bus.execute(FindReleases(repo_id, limit_arg(), offset)))
+
+
+@api.route('/release/<int:release_id>')
+def release(release_id: int):
+    """Body of a release as HTML, previewed on the ``/releases`` pages."""
+    def render():
+        rv = bus.execute(FindRelease(release_id))
+        return render_release(rv.body, reference.get('emoji_filter')) \
+            if rv else None
+
+    html = cache.get_or_set('release:{}'.format(release_id), render,
+                            timeout=RELEASE_TIMEOUT)
+    if html is None:
+        abort(404)
+    return html
+
+
+@api.route('/suggest')
+def suggest():
+    """Repositories matching a prefix: ``/api/suggest?q=pand``."""
+    results = search.get('index').suggest(
+        request.args.get('q', ''), limit_arg(10))
+    return to_json([{'repo_id': repo_id, 'name': name}
+                    for repo_id, name in results])
+
+
+@api.route('/languages')
+def languages():
+    return to_json(bus.execute(FindTopLanguages(limit_arg(25))))
+
+
+def batch_args(name: str, python_type: type) -> list:
+    """Return the values of a repeated or comma-separated query argument."""
+    values = []
+    for value in request.args.getlist(name):
+        values += [v for v in value.split(',') if v]
+    if not values or len(values) > MAX_BATCH_SIZE:
+        abort(400)
+    try:
+        return [python_type(v) for v in values]
+    except ValueError:
+        abort(400)
+
+
+def model_arg() -> int:
+    return request.args.get('model', 3, type=int)
+
+
+def limit_arg(default: int=MAX_LIMIT) -> int:
+    return max(1, min(request.args.get('limit', default, type=int), MAX_LIMIT))
+
+
+def to_json(data) -> Response:
+    """Serialize query results, keeping only the columns listed in the
+    optional ``fields`` argument, e.g. ``?fields=repo_id,name``."""
+    fields = request.args.get('fields')
+    fields = set(fields.split(',')) if fields else None
+
+    def serialize(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if hasattr(value, 'to_dict'):
+            value = value.to_dict()
+            if fields:
+                value = {k: v for k, v in value.items() if k in fields}
+        if isinstance(value, dict):
+            return {k: serialize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [serialize(v) for v in value]
+        return value
+
+    return Response(json.dumps(serialize(data)), mimetype='application/json')
@@ -3,7 +3,8 @@ import os
 
 from flask import Flask
 
-from growser.services import bigquery, celery, sqlalchemy, log, storage
+from growser.services import (bigquery, cache, celery, httpcache, ratelimit,
+                              sqlalchemy, log, storage)
 
 
 ROOT_PATH = os.path.realpath(__file__)
@@ -19,4 +20,7 @@ log = log(app, 'logging.cfg')
 bigquery = bigquery(app)
 storage = storage(app)
 celery = celery(app)
+cache = cache(app)
+httpcache = httpcache(app)
+ratelimit = ratelimit(app)
 db = sqlalchemy(app)
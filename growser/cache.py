@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from functools import wraps
+import hashlib
+import pickle
+import threading
+import time
+
+from flask import make_response, request
+
+#: Default number of seconds to cache a page, regardless of data version.
+DEFAULT_TIMEOUT = 3600
+
+
+class LRUCache:
+    def __init__(self, max_size: int=1000):
+        """In-process least-recently-used cache.
+
+        :param max_size: Maximum number of items to keep.
+        """
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: int=None):
+        expires = time.time() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCache:
+    def __init__(self, client, prefix: str='growser:'):
+        """Cache shared between processes using Redis.
+
+        :param client: A :class:`redis.StrictRedis` instance.
+        :param prefix: Prefix for every key.
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key: str, value, timeout: int=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+
+class ResponseCache:
+    def __init__(self, backend, timeout: int=DEFAULT_TIMEOUT):
+        """Cache for rendered pages & fragments keyed on data versions.
+
+        Each kind of data (e.g. ``rankings``) has a version, the time it was
+        last updated. Versions are part of every cache key, so bumping a
+        version invalidates every page that depends on it.
+
+        Example::
+
+            @app.route("/browse/<language>")
+            @cache.page('rankings')
+            def browse(language):
+                pass
+
+            cache.bump('rankings')
+
+        Versions are stored in `backend`, so only a :class:`RedisCache`
+        shares them between processes. With an :class:`LRUCache`, a bump
+        only invalidates the pages of the process that made it. Pages cached
+        by other processes are served until they expire after `timeout`.
+
+        :param backend: :class:`LRUCache` or :class:`RedisCache`.
+        :param timeout: Seconds before cached items expire.
+        """
+        self.backend = backend
+        self.timeout = timeout
+
+    def version(self, *names) -> tuple:
+        """Return the current version of each kind of data in `names`."""
+        return tuple(self.backend.get('version:' + name) or 0
+                     for name in names)
+
+    def bump(self, name: str) -> int:
+        """Invalidate everything cached against the `name` version, in
+        every process when the backend is shared."""
+        version = int(time.time() * 1000)
+        self.backend.set('version:' + name, version)
+        return version
+
+    def get_or_set(self, key: str, func, *versions, timeout: int=None):
+        """Return a cached fragment, calling `func` to create it if missing.
+
+        :param key: Unique name of the fragment.
+        :param func: Callable returning the value to cache.
+        :param versions: Names of the data the fragment depends on.
+        """
+        key = 'fragment:' + _hash(key, self.version(*versions))
+        rv = self.backend.get(key)
+        if rv is None:
+            rv = func()
+            self.backend.set(key, rv, timeout or self.timeout)
+        return rv
+
+    def page(self, *versions, timeout: int=None):
+        """Decorator caching the full response of a view.
+
+        Pages are keyed by endpoint, view & query string arguments and the
+        current versions. Responses carry an ``ETag`` derived from that key
+        and a ``Last-Modified`` of the latest version so that browsers and
+        nginx can revalidate without the page being rendered.
+
+        :param versions: Names of the data the page depends on.
+        :param timeout: Seconds before the page expires.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                current = self.version(*versions)
+                etag = _hash(request.endpoint, sorted(kwargs.items()),
+                             sorted(request.args.items(multi=True)), current)
+
+                if etag in request.if_none_match:
+                    rv = make_response('', 304)
+                else:
+                    key = 'page:' + etag
+                    cached = self.backend.get(key)
+                    if cached is None:
+                        rv = make_response(func(*args, **kwargs))
+                        if rv.status_code != 200:
+                            return rv
+                        cached = (rv.get_data(), rv.mimetype)
+                        self.backend.set(key, cached, timeout or self.timeout)
+                    rv = make_response(cached[0])
+                    rv.mimetype = cached[1]
+
+                rv.set_etag(etag)
+                if max(current, default=0):
+                    rv.last_modified = max(current) / 1000
+                rv.cache_control.public = True
+                rv.cache_control.no_cache = True
+                return rv.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+def _hash(*parts) -> str:
+    return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
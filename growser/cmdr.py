@@ -243,20 +243,24 @@ class LocalCommandBus:
 
         invoker = HandlerInvoker(handler.klass, handler())
         rv = invoker.execute(cmd)
-
-        # Allow commands to return commands to execute - will be removed after
-        # event listeners are integrated.
-        if isinstance(rv, Iterable):
-            for result in rv:
-                if isinstance(result, Command):
-                    self.execute(result)
-                if isinstance(result, DomainEvent):
-                    self.publish(result)
-
+        self._dispatch(rv)
         return rv
 
     def publish(self, event: DomainEvent):
-        pass
+        """Notify the listener registered for the type of `event`, if any."""
+        handler = self.registry.find(event.__class__)
+        if handler:
+            self._dispatch(
+                HandlerInvoker(handler.klass, handler()).execute(event))
+
+    def _dispatch(self, rv):
+        """Execute the commands & publish the events returned by a handler."""
+        results = rv if isinstance(rv, Iterable) else [rv]
+        for result in results:
+            if isinstance(result, Command):
+                self.execute(result)
+            if isinstance(result, DomainEvent):
+                self.publish(result)
 
 
 class DuplicateHandlerError(Exception):
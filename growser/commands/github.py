@@ -9,25 +9,40 @@ class UpdateFromGitHubAPI(Command):
         return '<{} {}>'.format(self.__class__.__name__, self.name)
 
 
+class UpdateManyFromGitHubAPI(Command):
+    def __init__(self, names: list):
+        """Update local repository data for multiple repositories using a
+        single GitHub GraphQL query.
+
+        :param names: Full names of the repositories, such as pydata/pandas.
+        """
+        self.names = names
+
+    def __repr__(self):
+        return '<{} {} repos>'.format(self.__class__.__name__, len(self.names))
+
+
 class BatchUpdateFromGitHubAPI(Command):
     def __init__(self, limit: int, batch_size: int, rating_window: int=90,
                  task_window: int=30, min_events: int=100):
         """Update local repository data using the GitHub API.
 
         For example, to update 1,250 repositories in batches of 100 based on the
-        most number of ratings in the prior 180 days that have not already been
-        updated in the prior 45 days::
+        most number of recent ratings that have not already been updated in
+        the prior 45 days::
 
             command = BatchUpdateFromGitHubAPI(1250, 100, 180, 45)
 
         :param limit: Total number of repositories to update.
-        :param batch_size: Number of API requests to wait for before updating
-                           our local data.
-        :param rating_window: Prioritize repositories based on the number of
-                              events within this window of days.
+        :param batch_size: Number of repositories to wait for before updating
+                           our local data. Each task fetches up to 100 of
+                           them with a single GraphQL query.
+        :param rating_window: Ignored. Repositories are prioritized by the
+                              number of events within the task queue window
+                              (:data:`growser.taskqueue.WINDOW` days).
         :param task_window: Don't include repositories that have already been
                             updated within this number of days.
-        :param min_events: Minimum number of events within `rating_window`.
+        :param min_events: Minimum number of events within the window.
 
         ..note:: Will be deprecated once event listeners have been implemented.
         """
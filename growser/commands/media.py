@@ -52,10 +52,12 @@ class BatchUpdateRepositoryScreenshots(Command):
         BatchUpdateRepositoryScreenshots(1000, 180, 30)
 
     :param limit: Total number of repositories to update.
-    :param rating_window: Sort repos by most ratings within this time frame
+    :param rating_window: Ignored. Repos are sorted by most ratings within the
+                          task queue window (:data:`growser.taskqueue.WINDOW`
+                          days).
     :param task_window: Exclude repos that have already been updated in
                         `task_window` prior days.
-    :param min_events: Minimum events in `rating_window`.
+    :param min_events: Minimum events within the window.
     """
     def __init__(self, limit: int, rating_window: int=90,
                  task_window: int=30, min_events: int=100):
@@ -0,0 +1,26 @@
+from growser.cmdr import Command
+
+
+class RenderRankingPages(Command):
+    def __init__(self, languages: list=None, periods: list=None,
+                 num_pages: int=None):
+        """Pre-render the current ``/browse`` pages to static HTML.
+
+        Example::
+
+            RenderRankingPages(["All", "Python"], [RankingPeriod.Week])
+
+        :param languages: Languages to render. Defaults to "All" and the top
+                          languages.
+        :param periods: :class:`~growser.commands.rankings.RankingPeriod` to
+                        render. Defaults to every period shown on /browse.
+        :param num_pages: Number of pages to render per language & period.
+                          Defaults to ``SNAPSHOT_PAGES``.
+        """
+        self.languages = languages
+        self.periods = periods
+        self.num_pages = num_pages
+
+    def __repr__(self):
+        return "{}(languages={}, periods={})".format(
+            self.__class__.__name__, self.languages, self.periods)
@@ -80,3 +80,65 @@ class UpdateWeeklyRankings(UpdateRankings):
         .. seealso:: :class:`UpdateRecentRankings`
         """
         super().__init__(RankingPeriod.Week, language, limit)
+
+
+class UpdateRankingsBatch(Command):
+    def __init__(self, limit: int, languages: list=None, end_date: date=None):
+        """Update the rankings of every language & period in a single pass.
+
+        Example::
+
+            UpdateRankingsBatch(1000, ["All", "Python", "Rust"])
+
+        :param limit: Number of repositories to include per ranking.
+        :param languages: Languages to rank. Defaults to "All" and the top
+                          languages.
+        :param end_date: Latest date to include user ratings (exclusive).
+                         Defaults to yesterday.
+        """
+        self.limit = limit
+        self.languages = languages
+        self.end_date = end_date
+
+    def __repr__(self):
+        return "{}(languages={}, end_date={})".format(
+            self.__class__.__name__, self.languages, self.end_date)
+
+
+class BackfillRankings(Command):
+    def __init__(self, start_date: date, end_date: date, limit: int,
+                 languages: list=None, min_events: int=1):
+        """Regenerate the rankings of every period for a range of end dates.
+
+        Memory depends on the number of repositories ranked rather than on
+        the number of days. Peak usage is about 100 bytes per repository,
+        for the running totals of each period and the copies made to rank
+        them, plus about 50 bytes per daily rollup in the last 90 days and
+        in the block being loaded (``BACKFILL_BLOCK_DAYS``). For 5 million
+        repositories with 200,000 rollups a day that is roughly 1.7 GB.
+
+        Example::
+
+            BackfillRankings(date(2015, 1, 1), date(2016, 5, 1), 1000)
+
+        :param start_date: First end date to rank (inclusive).
+        :param end_date: Last end date to rank (inclusive).
+        :param limit: Number of repositories to include per ranking.
+        :param languages: Languages to rank. Defaults to "All" and the top
+                          languages.
+        :param min_events: Exclude repositories with fewer all-time events
+                           as of `end_date`. The default keeps every
+                           repository with events, as the daily rankings
+                           do. A higher value lowers the memory used, but
+                           drops repositories that may still rank in the
+                           shorter periods.
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+        self.limit = limit
+        self.languages = languages
+        self.min_events = min_events
+
+    def __repr__(self):
+        return "{}(start_date={}, end_date={})".format(
+            self.__class__.__name__, self.start_date, self.end_date)
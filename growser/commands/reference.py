@@ -0,0 +1,10 @@
+from growser.cmdr import Command
+
+
+class RefreshReferenceData(Command):
+    """Reload languages & emojis in every web process.
+
+    Example::
+
+        RefreshReferenceData()
+    """
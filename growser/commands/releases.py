@@ -0,0 +1,18 @@
+from growser.cmdr import Command
+
+
+class UpdateReleases(Command):
+    def __init__(self, limit: int=None, min_events: int=500):
+        """Fetch new releases of the most active repositories.
+
+        Paging stops at the first page without a release that is not already
+        stored, so a daily update costs roughly one conditional request per
+        repository plus one per page of new releases::
+
+            UpdateReleases(min_events=500)
+
+        :param limit: Maximum number of repositories to check.
+        :param min_events: Minimum number of events of each repository.
+        """
+        self.limit = limit
+        self.min_events = min_events
@@ -0,0 +1,11 @@
+from growser.cmdr import Command
+
+
+class BuildSearchIndex(Command):
+    """Build the index of repositories used for search suggestions and save
+    it to ``SEARCH_INDEX_PATH`` for the web processes to load.
+
+    Example::
+
+        BuildSearchIndex()
+    """
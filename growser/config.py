@@ -1,3 +1,6 @@
+import os
+
+
 class DefaultConfig:
     """Configuration values that do not change based on the environment."""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -8,11 +11,15 @@ class DefaultConfig:
     CELERY_RESULT_SERIALIZER = 'pickle'
 
     CMDR_HANDLERS = (
+        'growser.handlers.cache',
         'growser.handlers.events',
         'growser.handlers.github',
         'growser.handlers.media',
+        'growser.handlers.pages',
         'growser.handlers.rankings',
-        'growser.handlers.recommendations'
+        'growser.handlers.recommendations',
+        'growser.handlers.releases',
+        'growser.handlers.search'
     )
 
     CMDR_QUERIES = (
@@ -51,8 +58,67 @@ class BasicConfig(DefaultConfig):
     #: SQLAlchemy connection pool
     SQLALCHEMY_POOL_SIZE = 20
 
+    #: Connections opened beyond the pool size under load. Pool size plus
+    #: overflow should cover the gunicorn ``worker_connections`` per worker.
+    SQLALCHEMY_MAX_OVERFLOW = 30
+
+    #: Seconds to wait for a connection from the pool before failing
+    SQLALCHEMY_POOL_TIMEOUT = 10
+
+    #: Abort statements running longer than this many milliseconds (0 to
+    #: disable). Set for web workers by ``deploy/gunicorn/config.py``.
+    SQLALCHEMY_STATEMENT_TIMEOUT = int(
+        os.environ.get('GROWSER_STATEMENT_TIMEOUT', 0))
+
     #: Celery Broker
     BROKER_URL = ""
 
     #: Celery backend for persisting task results
     CELERY_RESULT_BACKEND = ""
+
+    #: Redis used to share cached pages & data versions between workers. An
+    #: in-process LRU cache is used when empty, in which case versions bumped
+    #: by the Celery workers never reach the web processes, and pages are
+    #: only refreshed once they expire after ``CACHE_TIMEOUT``.
+    CACHE_REDIS_URL = os.environ.get('GROWSER_CACHE_REDIS_URL', "")
+
+    #: Number of pages & fragments kept by the in-process LRU cache
+    CACHE_LRU_SIZE = 1000
+
+    #: Seconds before cached pages expire, even if the data has not changed
+    CACHE_TIMEOUT = 3600
+
+    #: Directory for pre-rendered /browse pages served directly by nginx
+    SNAPSHOT_PATH = "static/snapshots"
+
+    #: Number of pages pre-rendered per language & ranking period
+    SNAPSHOT_PAGES = 3
+
+    #: SQLite database caching responses from GitHub
+    HTTPCACHE_PATH = "data/httpcache.sqlite"
+
+    #: Byte budget of the (compressed) cached responses
+    HTTPCACHE_MAX_BYTES = 10 * 1024 ** 3
+
+    #: Seconds before a cached response is evicted, even if recently used
+    HTTPCACHE_MAX_AGE = 86400 * 60
+
+    #: Celery tasks kept in flight by handlers that fan out work
+    TASK_WINDOW = 16
+
+    #: Redis used to pace GitHub API requests across workers. Requests are
+    #: only paced within each process when empty.
+    RATELIMIT_REDIS_URL = os.environ.get('GROWSER_RATELIMIT_REDIS_URL', "")
+
+    #: GitHub API requests that can be made at once after a pause
+    RATELIMIT_BURST = 10
+
+    #: GitHub API requests left in each rate limit window for other clients
+    RATELIMIT_RESERVE = 250
+
+    #: Minimum number of events for a repository to appear in search
+    #: suggestions
+    SEARCH_MIN_EVENTS = 10
+
+    #: Search index built by the workers & memory-mapped by the web processes
+    SEARCH_INDEX_PATH = "data/search/index"
@@ -1,6 +1,9 @@
 from collections import OrderedDict
+from contextlib import contextmanager
+import csv
 import datetime
-from typing import Iterator, List
+from io import StringIO
+from typing import Iterable, Iterator, List
 
 from flask_sqlalchemy import SQLAlchemy
 from psycopg2.extensions import QuotedString
@@ -206,6 +209,61 @@ def from_sqlalchemy_table(table: Table, data: Iterator, columns: list,
     return BulkInsertFromIterator(table, data, wrapped, batch_size, header)
 
 
+@contextmanager
+def transaction(engine):
+    """Yield a DB-API cursor whose statements run in a single transaction.
+
+    The engine runs in AUTOCOMMIT mode (see :class:`SQLAlchemyAutoCommit`),
+    so autocommit is disabled on the underlying connection for the duration.
+
+    Example::
+
+        with transaction(db.engine) as cursor:
+            cursor.execute("DELETE FROM ranking WHERE end_date = %s", [day])
+            copy_from_rows(cursor, 'ranking', columns, rows)
+
+    :param engine: SQLAlchemy engine to take a connection from.
+    """
+    conn = engine.raw_connection()
+    autocommit = conn.connection.autocommit
+    conn.connection.autocommit = False
+    cursor = conn.cursor()
+    try:
+        yield cursor
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.connection.autocommit = autocommit
+        conn.close()
+
+
+def copy_from_rows(cursor, table: str, columns: list, rows: Iterable) -> int:
+    """Load `rows` into `table` using a single ``COPY ... FROM STDIN``.
+
+    Values are serialized as CSV; ``None`` becomes ``NULL``.
+
+    :param cursor: A ``psycopg2`` cursor.
+    :param table: Name of the table to copy into.
+    :param columns: Names of the columns, in the same order as each row.
+    :param rows: Iterable of tuples.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    total = 0
+    for row in rows:
+        writer.writerow(row)
+        total += 1
+    buffer.seek(0)
+
+    query = 'COPY {} ({}) FROM STDIN WITH CSV'.format(
+        table, ', '.join(columns))
+    cursor.copy_expert(query, buffer)
+    return total
+
+
 def as_columns(columns) -> List[Column]:
     rv = []
     for column in columns:
@@ -238,3 +296,8 @@ class SQLAlchemyAutoCommit(SQLAlchemy):
     def apply_driver_hacks(self, app, info, options):
         super().apply_driver_hacks(app, info, options)
         options['isolation_level'] = 'AUTOCOMMIT'
+
+        timeout = app.config.get('SQLALCHEMY_STATEMENT_TIMEOUT')
+        if timeout:
+            options.setdefault('connect_args', {})['options'] = \
+                '-c statement_timeout={:d}'.format(timeout)
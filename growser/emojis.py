@@ -0,0 +1,43 @@
+import re
+
+from markupsafe import Markup, escape
+
+#: Emoji names & image paths, one ``name,path`` per line
+EMOJIS_PATH = "data/github/emojis.csv"
+
+#: Markup substituted for each ``:name:``
+IMG_TAG = '<img src="/static/{}" class="emoji" width="20" height="20" />'
+
+#: Characters allowed in an emoji name, e.g. ``:+1:`` or ``:e-mail:``
+EMOJI_PATTERN = re.compile(r":([\w+-]+):")
+
+
+class EmojiFilter:
+    def __init__(self, emojis: dict):
+        """Replace ``:name:`` with an image in a single pass over the text.
+
+        The replacement markup is built once per emoji so that rendering is
+        a single regular expression substitution with a dictionary lookup
+        per match, rather than a ``str.replace`` per emoji found.
+
+        :param emojis: Mapping of emoji name to image path under /static/.
+        """
+        self.images = {name: IMG_TAG.format(path)
+                       for name, path in emojis.items()}
+
+    def __call__(self, txt: str) -> str:
+        return EMOJI_PATTERN.sub(self._replace, txt)
+
+    def _replace(self, match):
+        return self.images.get(match.group(1), match.group(0))
+
+
+def load_emojis(path: str=EMOJIS_PATH) -> dict:
+    with open(path) as fh:
+        return dict(line.strip().split(",") for line in fh if line.strip())
+
+
+def render_release(body: str, emojis: EmojiFilter) -> Markup:
+    """Escape the body of a release and replace emojis & line breaks."""
+    html = emojis(str(escape(body)))
+    return Markup(html.replace("\n", "<br />\n"))
@@ -0,0 +1,94 @@
+from collections import deque
+import time
+from typing import Callable, Iterable, Iterator
+
+from growser.app import log
+
+#: Default number of tasks kept in flight
+DEFAULT_WINDOW = 16
+
+#: Seconds between checks of the tasks in flight when none have completed
+POLL_INTERVAL = 0.1
+
+
+def revoke(result):
+    """Stop a Celery task, terminating it if it has already started."""
+    result.revoke(terminate=True)
+
+
+class SlidingWindow:
+    def __init__(self, submit: Callable, size: int=DEFAULT_WINDOW,
+                 timeout: float=None, interval: float=POLL_INTERVAL,
+                 cancel: Callable=revoke, clock=time.monotonic,
+                 sleep=time.sleep):
+        """Keep up to `size` tasks in flight, yielding results as each task
+        completes rather than waiting for a whole batch.
+
+        A new task is submitted as soon as one completes, so a slow task only
+        occupies a single slot. Tasks running longer than `timeout` are
+        cancelled and skipped, as are tasks that fail.
+
+        Example::
+
+            window = SlidingWindow(run_command.delay, 16, timeout=60)
+            for cmd, rv in window.map(commands):
+                pass
+
+        :param submit: Callable starting a task for an item, returning an
+                       object with ``ready()`` & ``get()``, such as a Celery
+                       :class:`~celery.result.AsyncResult`.
+        :param size: Maximum number of tasks in flight.
+        :param timeout: Seconds after which a task is cancelled.
+        :param interval: Seconds to wait when no task has completed.
+        :param cancel: Callable stopping a task that timed out.
+        """
+        self.submit = submit
+        self.size = size
+        self.timeout = timeout
+        self.interval = interval
+        self.cancel = cancel
+        self.clock = clock
+        self.sleep = sleep
+        self.timed_out = []
+        self.failed = []
+
+    def map(self, items: Iterable) -> Iterator[tuple]:
+        """Yield `(item, result)` for each task in order of completion."""
+        items = iter(items)
+        pending = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.size:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append((item, self.submit(item), self.clock()))
+
+            if not pending:
+                return
+
+            completed = False
+            now = self.clock()
+            for _ in range(len(pending)):
+                item, result, started_at = pending.popleft()
+                if result.ready():
+                    completed = True
+                    try:
+                        rv = result.get()
+                    except Exception as e:
+                        log.warning('Task failed for %s: %s', item, e)
+                        self.failed.append(item)
+                        continue
+                    yield item, rv
+                elif self.timeout and now - started_at > self.timeout:
+                    completed = True
+                    log.warning('Task timed out for %s', item)
+                    self.cancel(result)
+                    self.timed_out.append(item)
+                else:
+                    pending.append((item, result, started_at))
+
+            if not completed:
+                self.sleep(self.interval)
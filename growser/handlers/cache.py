@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from growser.app import cache
+from growser.commands.pages import RenderRankingPages
+from growser.commands.reference import RefreshReferenceData
+from growser.commands.search import BuildSearchIndex
+from growser.handlers.github import RepositoriesUpdated
+from growser.handlers.rankings import RankingsUpdated
+from growser.handlers.releases import ReleasesUpdated
+from growser.handlers.recommendations import RecommendationsUpdated
+from growser.handlers.search import SearchIndexBuilt
+
+
+def rankings_updated(event: RankingsUpdated):
+    """Invalidate cached pages that display rankings and re-render the
+    static snapshot of the ranking if it is the one shown by default."""
+    cache.bump('rankings')
+    if event.end_date == date.today() - timedelta(days=1):
+        yield RenderRankingPages([event.language], [event.period])
+
+
+def recommendations_updated(event: RecommendationsUpdated):
+    """Invalidate cached pages that display recommendations."""
+    cache.bump('recommendations')
+
+
+def repositories_updated(event: RepositoriesUpdated):
+    """Rebuild the search index with the latest names & descriptions."""
+    yield BuildSearchIndex()
+
+
+def search_index_built(event: SearchIndexBuilt):
+    """Load the new search index in each web process."""
+    cache.bump('search')
+
+
+def releases_updated(event: ReleasesUpdated):
+    """Invalidate cached pages that list releases."""
+    cache.bump('releases')
+
+
+def refresh_reference_data(cmd: RefreshReferenceData):
+    """Invalidate the languages & emojis loaded by each process."""
+    cache.bump('reference')
@@ -8,6 +8,7 @@ import pandas as pd
 
 from growser.app import app, bigquery, db, log, storage
 from growser.cmdr import Handles, Command
+from growser.taskqueue import advance_window
 from growser.google import (DownloadBucketPath, DeleteTable,
                             ExportTableToCSV, PersistQueryToTable)
 
@@ -116,8 +117,10 @@ class BatchManager:
         events.to_csv('data/batch/events.csv', index=False)
 
         log.info("Processing CSV files in Postgres")
-        sql = open("deploy/etl/sql/process_events_batch.sql").read()
+        sql = open("deploy/etl/sql/process_events_batch.sql").read() + \
+            open("deploy/etl/sql/update_owners.sql").read()
         self.engine.execute(sql)
+        advance_window()
         self.repos.append_delta()
         self.logins.append_delta()
 
@@ -1,21 +1,18 @@
-from datetime import date, timedelta
 from functools import partial
 import ujson as json
 from typing import List, Union
 
-from celery import group
-import pandas as pd
-from sqlalchemy import and_, exists, func, text
-
 from growser import httpcache
-from growser.app import app, db, log
+from growser.app import app, db, log, ratelimit
 from growser.cmdr import DomainEvent, Handles, handles
 from growser.commands.github import (
     BatchUpdateFromGitHubAPI,
-    UpdateFromGitHubAPI
+    UpdateFromGitHubAPI,
+    UpdateManyFromGitHubAPI
 )
-from growser.models import Repository, RepositoryTask, Rating
-from growser.tasks import run_command
+from growser.db import copy_from_rows, transaction
+from growser.taskqueue import GITHUB_API, next_repositories
+from growser.tasks import execute_many
 
 
 class RepositoryUpdated(DomainEvent):
@@ -36,11 +33,17 @@ class RepositoryNotFound(DomainEvent):
         self.name = name
 
 
+class RepositoriesUpdated(DomainEvent):
+    def __init__(self, num_repos: int):
+        self.num_repos = num_repos
+
+
 @handles(UpdateFromGitHubAPI)
 def update_repository(cmd: UpdateFromGitHubAPI) \
         -> Union[RepositoryNotFound, RepositoryUpdated]:
     """Update local repository data from GitHub API."""
-    api = GitHubAPIWrapper(app.config.get('GITHUB_OAUTH'), 86400*14)
+    api = GitHubAPIWrapper(app.config.get('GITHUB_OAUTH'), 86400*14,
+                           limiter=ratelimit)
     rsp = api.repository(cmd.name)
 
     # Not found or repository blocked/disabled
@@ -48,125 +51,256 @@ def update_repository(cmd: UpdateFromGitHubAPI) \
                              'block' in rsp['message']):
         return RepositoryNotFound(cmd.name)
 
-    rv = RepositoryUpdated(
+    return RepositoryUpdated(
         name=cmd.name,
         description=rsp['description'] or '',
-        homepage=rsp['homepage'] or '',
+        homepage=clean_homepage(rsp['homepage']),
         language=rsp['language'] or '',
         num_stars=int(rsp['watchers']),
         num_forks=int(rsp['forks']),
         num_watchers=int(rsp['subscribers_count'])
     )
 
-    if '.' in rv.homepage and ' ' not in rv.homepage and rv.homepage[:4] != 'http':
-        rv.homepage = 'http://' + rv.homepage
-
-    if len(rv.homepage) >= 250:
-        rv.homepage = ''
 
+@handles(UpdateManyFromGitHubAPI)
+def update_repositories(cmd: UpdateManyFromGitHubAPI) \
+        -> List[Union[RepositoryNotFound, RepositoryUpdated]]:
+    """Update local data of up to 100 repositories with one GraphQL query."""
+    api = GitHubAPIWrapper(app.config.get('GITHUB_OAUTH'), 86400*14,
+                           limiter=ratelimit)
+    return fetch_repositories(api, cmd.names)
+
+
+def fetch_repositories(api, names: list) \
+        -> List[Union[RepositoryNotFound, RepositoryUpdated]]:
+    """Fetch repositories in batches of :data:`GRAPHQL_BATCH_SIZE`.
+
+    Each repository is aliased in a single query so that a batch costs one
+    request & a single point of the GraphQL rate limit. Repositories that
+    no longer exist, or have been disabled or blocked, are returned as
+    :class:`RepositoryNotFound`.
+    """
+    rv = []
+    for i in range(0, len(names), GRAPHQL_BATCH_SIZE):
+        batch = names[i:i+GRAPHQL_BATCH_SIZE]
+        rsp = api.graphql(*repositories_query(batch))
+
+        errors = [e for e in rsp.get('errors', [])
+                  if e.get('type') not in GRAPHQL_MISSING]
+        if errors or rsp.get('data') is None:
+            raise GraphQLError(errors or rsp.get('errors'))
+
+        for idx, name in enumerate(batch):
+            repo = rsp['data'].get('r{}'.format(idx))
+            if repo is None or repo['isDisabled']:
+                rv.append(RepositoryNotFound(name))
+                continue
+            rv.append(RepositoryUpdated(
+                name=name,
+                description=repo['description'] or '',
+                homepage=clean_homepage(repo['homepageUrl']),
+                language=(repo['primaryLanguage'] or {}).get('name') or '',
+                num_stars=int(repo['stargazerCount']),
+                num_forks=int(repo['forkCount']),
+                num_watchers=int(repo['watchers']['totalCount'])
+            ))
     return rv
 
 
-class BatchUpdateGitHubAPIHandler(Handles[BatchUpdateFromGitHubAPI]):
-    def handle(self, cmd: BatchUpdateFromGitHubAPI):
-        """Use Celery to update multiple repositories."""
-        api = GitHubAPIWrapper(app.config.get('GITHUB_OAUTH'), 86400*14)
-        limit = api.rate_limit()
-
-        if cmd.limit > limit['rate']['remaining']:
-            raise ValueError('Exceeds current API limit: {}'.format(limit))
-
-        repos = get_repositories(cmd.limit, cmd.task_window,
-                                 cmd.rating_window, cmd.min_events)
-        tasks = [UpdateFromGitHubAPI(repo.name) for repo in repos]
-
-        def batched(l, n):
-            for i in range(0, len(l), n):
-                yield l[i:i+n]
-
-        for batch in batched(tasks, cmd.batch_size):
-            self._execute_batch(batch)
-
-    def _execute_batch(self, batch: List[UpdateFromGitHubAPI]):
-        """Process a single batch of updates."""
-        tasks = map(run_command.s, batch)
-        results = group(tasks).apply_async().get(interval=1)
+def repositories_query(names: list) -> tuple:
+    """Return the GraphQL query & variables to fetch `names` at once."""
+    params, fields, variables = [], [], {}
+    for idx, name in enumerate(names):
+        owner, _, repo = name.partition('/')
+        params.append('$o{0}: String!, $n{0}: String!'.format(idx))
+        fields.append('r{0}: repository(owner: $o{0}, name: $n{0}) '
+                      '{{ ...repo }}'.format(idx))
+        variables['o{}'.format(idx)] = owner
+        variables['n{}'.format(idx)] = repo
+    query = 'query({}) {{\n  {}\n}}\n{}'.format(
+        ', '.join(params), '\n  '.join(fields), GRAPHQL_FRAGMENT)
+    return query, variables
+
+
+def clean_homepage(homepage: str) -> str:
+    """Add a missing scheme to `homepage` and drop values too long to
+    store."""
+    homepage = homepage or ''
+    if '.' in homepage and ' ' not in homepage and homepage[:4] != 'http':
+        homepage = 'http://' + homepage
+    if len(homepage) >= 250:
+        return ''
+    return homepage
 
-        updated = [r for r in results if isinstance(r, RepositoryUpdated)]
-        missing = [r for r in results if isinstance(r, RepositoryNotFound)]
 
+class BatchUpdateGitHubAPIHandler(Handles[BatchUpdateFromGitHubAPI]):
+    def handle(self, cmd: BatchUpdateFromGitHubAPI):
+        """Use Celery to update multiple repositories.
+
+        Workers share :data:`~growser.app.ratelimit`, so batches larger than
+        the remaining API limit are spread over the following windows.
+        """
+        repos = next_repositories(GITHUB_API, cmd.limit, cmd.task_window,
+                                  cmd.min_events)
+        names = [repo.name for repo in repos]
+
+        tasks = [UpdateManyFromGitHubAPI(names[i:i+GRAPHQL_BATCH_SIZE])
+                 for i in range(0, len(names), GRAPHQL_BATCH_SIZE)]
+        self._execute_batch(tasks, cmd.batch_size)
+
+        return RepositoriesUpdated(len(names))
+
+    def _execute_batch(self, batch: List[UpdateManyFromGitHubAPI],
+                       merge_size: int):
+        """Keep a window of tasks in flight, merging the results every
+        `merge_size` repositories rather than waiting for the slowest task
+        of each batch."""
+        results = []
+        for _, rv in execute_many(batch, TASK_TIMEOUT):
+            results += rv
+            if len(results) >= merge_size:
+                self._merge(results)
+                results = []
+        self._merge(results)
+
+    @staticmethod
+    def _merge(results: List[Union[RepositoryNotFound, RepositoryUpdated]]):
         # This should eventually be moved to an event listener
-        log.info('Updating: {}, Missing: {}'.format(len(updated), len(missing)))
-        self._handle_updates(updated)
-        self._handle_missing(missing)
+        log.info('Updating: {}, Missing: {}'.format(
+            sum(isinstance(r, RepositoryUpdated) for r in results),
+            sum(isinstance(r, RepositoryNotFound) for r in results)))
+        merge_repositories(results)
+
+
+def merge_repositories(results: List[Union[RepositoryNotFound,
+                                           RepositoryUpdated]]):
+    """Apply API results to the repository table in one transaction.
+
+    Results are copied into a temporary table and merged by
+    ``update_repositories.sql``, which also records a task for each
+    repository & recalculates the totals of their owners.
+    """
+    if not len(results):
+        return
+
+    query = open("deploy/etl/sql/update_repositories.sql").read() + \
+        open("deploy/etl/sql/update_owners.sql").read()
+    with transaction(db.engine) as cursor:
+        cursor.execute(REPOS_TMP_TABLE)
+        copy_from_rows(cursor, 'repos_tmp', REPOS_TMP_COLUMNS,
+                       map(merge_row, results))
+        cursor.execute(query)
+
+
+def merge_row(result: Union[RepositoryNotFound, RepositoryUpdated]) -> tuple:
+    """Values of :data:`REPOS_TMP_COLUMNS` for a single result."""
+    if isinstance(result, RepositoryNotFound):
+        return (result.name, False) + (None,) * 6
+    return (result.name, True, result.description, result.homepage,
+            result.language, result.num_stars, result.num_forks,
+            result.num_watchers)
+
+
+class GraphQLError(Exception):
+    """GitHub returned errors other than missing repositories."""
+    def __init__(self, errors):
+        super().__init__('GraphQL query failed: {}'.format(errors))
+        self.errors = errors
+
+
+class APIError(Exception):
+    """GitHub returned an error, such as an exceeded rate limit, rather than
+    the resource requested."""
+    def __init__(self, message):
+        super().__init__('GitHub API request failed: {}'.format(message))
+        self.message = message
+
+
+#: Results of a batch of API requests, merged by update_repositories.sql
+REPOS_TMP_TABLE = """CREATE TEMP TABLE repos_tmp (
+    name varchar(256) NOT NULL,
+    found boolean NOT NULL,
+    description varchar(2048),
+    homepage varchar(256),
+    language varchar(32),
+    num_stars integer,
+    num_forks integer,
+    num_watchers integer
+)"""
+
+#: Columns of :data:`REPOS_TMP_TABLE` in the order they are copied
+REPOS_TMP_COLUMNS = ['name', 'found', 'description', 'homepage', 'language',
+                     'num_stars', 'num_forks', 'num_watchers']
+
+#: Seconds before a task fetching a batch of repositories is revoked. Longer
+#: than a rate limit window, which a task may have to wait for.
+TASK_TIMEOUT = 3900
 
-    def _handle_updates(self, updates: List[RepositoryUpdated]):
-        if not len(updates):
-            return
+#: Temporary user agent
+USER_AGENT = "Growser/0.1 (+https://github.com/tomdean/growser)"
 
-        # Use pandas to insert data into a temporary table
-        pd.DataFrame([r.__dict__ for r in updates]).to_sql(
-            name='repos_tmp', con=db.engine, index=False, if_exists='replace')
+#: Root of the GitHub API
+API_URL = "https://api.github.com/"
 
-        # But merge data manually
-        query = open("deploy/etl/sql/update_repositories.sql").read()
-        db.engine.execute(text(query))
+#: Maximum number of repositories fetched by a single GraphQL query
+GRAPHQL_BATCH_SIZE = 100
 
-    def _handle_missing(self, missing: List[RepositoryNotFound]):
-        if not len(missing):
-            return
-        query = "UPDATE repository SET status=2 WHERE name = :name"
-        for result in missing:
-            db.engine.execute(text(query), name=result.name)
+#: Error types returned for repositories that are missing, rather than for a
+#: failed query
+GRAPHQL_MISSING = ('NOT_FOUND', 'FORBIDDEN')
 
-#: Temporary user agent
-USER_AGENT = "Growser/0.1 (+https://github.com/tomdean/growser)"
+#: Fields of each repository, matching those of :class:`RepositoryUpdated`
+GRAPHQL_FRAGMENT = """fragment repo on Repository {
+  description
+  homepageUrl
+  isDisabled
+  primaryLanguage { name }
+  stargazerCount
+  forkCount
+  watchers { totalCount }
+}"""
 
 
 class GitHubAPIWrapper:
     """Wrap requests to the GitHub API through :mod:`.httpcache`."""
-    def __init__(self, credentials: tuple, expires: int):
+    def __init__(self, credentials: tuple, expires: int, url: str=API_URL,
+                 limiter=None):
+        self.url = url
+        self.credentials = credentials
+        self.limiter = limiter
         self._request = partial(httpcache.get,
                                 expires=expires, auth=credentials,
-                                headers={'User-Agent': USER_AGENT})
+                                headers={'User-Agent': USER_AGENT},
+                                limiter=limiter)
 
     def request(self, path: list, params: dict = None):
-        url = 'https://api.github.com/' + '/'.join(path)
+        url = self.url + '/'.join(path)
         return json.loads(self._request(url=url, params=params))
 
+    def graphql(self, query: str, variables: dict=None) -> dict:
+        """Run a GraphQL query. Queries are POSTed and so are not cached."""
+        if self.limiter:
+            self.limiter.acquire('graphql')
+        rsp = httpcache.session().post(
+            self.url + 'graphql', headers={
+                'Authorization': 'bearer ' + self.credentials[1],
+                'User-Agent': USER_AGENT},
+            data=json.dumps({'query': query, 'variables': variables or {}}),
+            timeout=httpcache.TIMEOUT)
+        if self.limiter:
+            self.limiter.update(rsp.headers, 'graphql')
+        rsp.raise_for_status()
+        return json.loads(rsp.content)
+
     def repository(self, name):
         return self.request(['repos', name])
 
-    def releases(self, name):
-        return self.request(['repos', name, 'releases'])
+    def releases(self, name, page: int=1, per_page: int=30):
+        return self.request(['repos', name, 'releases'],
+                            {'page': page, 'per_page': per_page})
 
     def languages(self, name):
         return self.request(['repos', name, 'languages'])
 
     def rate_limit(self):
         return self.request(['rate_limit'])
-
-
-def get_repositories(limit: int, task_days: int, rating_days: int, min_events: int):
-    # Exclude recently updated repositories @todo: Move to query
-    tasks = and_(
-        RepositoryTask.name == 'github.api.repos',
-        RepositoryTask.repo_id == Rating.repo_id,
-        RepositoryTask.created_at >= func.now() - timedelta(days=task_days)
-    )
-
-    # Only update repositories that have recent activity
-    query = db.session.query(Rating.repo_id, func.count(1).label('num_events')) \
-        .filter(~exists().where(tasks)) \
-        .filter(Rating.created_at >= date.today() - timedelta(days=rating_days)) \
-        .group_by(Rating.repo_id) \
-        .having(func.count(1) >= min_events) \
-        .order_by(func.count(1).desc())
-
-    # Return (name, num_events)
-    popular = query.subquery()
-    candidates = db.session.query(Repository.name, popular.columns.num_events) \
-        .filter(Repository.status == 1) \
-        .join(popular, popular.columns.repo_id == Repository.repo_id)
-
-    return candidates.limit(limit).all()
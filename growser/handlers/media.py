@@ -8,7 +8,6 @@ from PIL import Image
 import subprocess
 from typing import List, Union
 
-from celery import group
 import numpy as np
 import pandas as pd
 from skimage.filters import sobel_h, sobel_v
@@ -26,8 +25,9 @@ from growser.commands.media import (
     UpdateRepositoryMedia,
     UpdateRepositoryScreenshot,
 )
-from growser.models import Rating, Repository, RepositoryTask
-from growser.tasks import run_command
+from growser.models import RepositoryTask, TaskQueue
+from growser.taskqueue import SCREENSHOT, next_repositories
+from growser.tasks import execute_many, run_command
 
 
 #: Command to execute PhantomJS for rendering screenshots
@@ -68,6 +68,15 @@ class ImageComplexityScoresCalculated(DomainEvent):
         self.destination = destination
 
 
+#: Seconds before the GitHub page of a repository is downloaded again
+README_EXPIRES = 86400 * 14
+
+#: Seconds after that a stale page is still used while it is downloaded again
+README_STALE = 86400 * 7
+
+#: Seconds before a task scoring a single image is revoked
+SCORE_TIMEOUT = 120
+
 #: Regex to find a README in projects root folder
 readme_re = \
     re.compile('href="(/[^/]+/[^/]+/blob/[^/]+/([^/]+/)?readme(\.[^"]*)?)"',
@@ -133,9 +142,10 @@ class UpdateRepositoryMediaHandler(Handles[UpdateRepositoryMedia]):
             yield OptimizeImage(repo.name, path)
 
     @staticmethod
-    def _find_readme_url(name: str, age: int=86400*14) -> str:
+    def _find_readme_url(name: str, age: int=README_EXPIRES) -> str:
         """Find the URL of the projects README."""
-        content = httpcache.get('https://github.com/' + name, expires=age)
+        content = httpcache.get('https://github.com/' + name, expires=age,
+                                stale=README_STALE)
 
         # Some repos have multiple README* files (such as php/php-src).
         links = readme_re.findall(content.decode('utf-8'))
@@ -159,14 +169,20 @@ class UpdateRepositoryScreenshotHandler(Handles[UpdateRepositoryScreenshot]):
 
         # @todo Move this to an event listener
         RepositoryTask.add(cmd.repo_id, 'screenshot.hp')
+        TaskQueue.refreshed(SCREENSHOT, cmd.repo_id)
 
         cls = ImageUpdated if updated else ImageCreated
         return cls(cmd.name, cmd.destination)
 
     def batch(self, cmd: BatchUpdateRepositoryScreenshots):
         """Convenience handler to batch update repository screenshots."""
-        repos = get_repositories(cmd.limit, cmd.task_window,
-                                 cmd.rating_window, cmd.min_events)
+        repos = next_repositories(SCREENSHOT, cmd.limit, cmd.task_window,
+                                  cmd.min_events)
+
+        # Prefetch the pages searched for a README by each task
+        httpcache.get_many(['https://github.com/' + repo.name
+                            for repo in repos], README_EXPIRES)
+
         for repo in repos:
             run_command.delay(UpdateRepositoryMedia(repo.repo_id, repo.name))
 
@@ -258,14 +274,9 @@ class CalculateImageComplexityHandler(Handles[CalculateImageComplexityScores]):
         """Use Celery to calculate the image complexity scores concurrently."""
         filenames = self._get_filenames(cmd.path, cmd.pattern)
 
-        rv = []
-
-        batch_size = 100
         log.info("Processing {} images".format(len(filenames)))
-        for batch in batched(filenames, batch_size):
-            jobs = map(run_command.s, map(CalculateImageComplexityScore, batch))
-            result = group(jobs).apply_async()
-            rv += result.get(interval=1)
+        tasks = map(CalculateImageComplexityScore, filenames)
+        rv = [row for _, row in execute_many(tasks, SCORE_TIMEOUT)]
         self._to_csv(cmd.destination, rv)
 
         return ImageComplexityScoresCalculated(cmd.destination)
@@ -288,43 +299,6 @@ class CalculateImageComplexityHandler(Handles[CalculateImageComplexityScores]):
         pd.DataFrame(images, columns=columns).to_csv(destination, index=False)
 
 
-def get_repositories(limit: int, task_days: int,
-                     rating_days: int, min_events: int):
-    from datetime import date, timedelta
-    from sqlalchemy import and_, func, exists
-
-    from growser.app import db
-
-    tasks = and_(
-        RepositoryTask.name.like('screenshot.%'),
-        RepositoryTask.repo_id == Rating.repo_id,
-        RepositoryTask.created_at >= func.now() - timedelta(days=task_days)
-    )
-
-    # Only update repositories that have recent activity
-    query = db.session.query(Rating.repo_id, func.count(1).label('num_events')) \
-        .filter(~exists().where(tasks)) \
-        .filter(Rating.created_at >= date.today() - timedelta(days=rating_days)) \
-        .group_by(Rating.repo_id) \
-        .having(func.count(1) >= min_events) \
-        .order_by(func.count(1).desc())
-
-    # Return (repo_id, name, num_events)
-    popular = query.subquery()
-    candidates = db.session.query(Repository.repo_id,
-                                  Repository.name,
-                                  popular.columns.num_events) \
-        .filter(Repository.status == 1) \
-        .join(popular, popular.columns.repo_id == Repository.repo_id)
-
-    return candidates.limit(limit).all()
-
-
-def batched(l, n):
-    for i in range(0, len(l), n):
-        yield l[i:i+n]
-
-
 def get_compressed_size(image: Image, quality) -> float:
     """Find the size of an image after JPEG compression.
 
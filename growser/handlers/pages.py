@@ -0,0 +1,134 @@
+from datetime import date, timedelta
+import gzip
+from itertools import product
+import os
+from os.path import dirname, join
+import tempfile
+from urllib.parse import quote
+
+import brotli
+
+from growser.app import app, log
+from growser.cmdr import Handles
+from growser.commands.pages import RenderRankingPages
+from growser.commands.rankings import RankingPeriod
+from growser.models import Language, Ranking
+from growser.pagination import PER_PAGE, encode_cursor
+
+#: Value of the ``p`` argument on /browse for each ranking period.
+PERIODS = {
+    RankingPeriod.AllTime: 'a',
+    RankingPeriod.Month: 'm',
+    RankingPeriod.Week: 'w',
+    RankingPeriod.Recent: None
+}
+
+#: Snapshot directory used when the ``p`` argument is missing.
+DEFAULT_PERIOD = 'recent'
+
+#: Snapshot name of the first page, which has no ``after`` cursor.
+FIRST_PAGE = 'index'
+
+
+class RenderRankingPagesHandler(Handles[RenderRankingPages]):
+    def handle(self, cmd: RenderRankingPages):
+        """Render the current /browse pages through the application and save
+        them, with gzip & brotli variants, so that nginx can serve them
+        without reaching Python.
+
+        Snapshots are saved as ``<language>/<p>/<after>.html`` under
+        ``SNAPSHOT_PATH``. Pages that are no longer part of the rankings are
+        removed so that an old cursor falls through to the dynamic route.
+        """
+        languages = cmd.languages or \
+            ["All"] + [lang.name for lang in Language.top()]
+        periods = [p for p in cmd.periods or PERIODS if p in PERIODS]
+        num_pages = cmd.num_pages or app.config.get('SNAPSHOT_PAGES')
+        end_date = date.today() - timedelta(days=1)
+
+        # The pages are rendered by the routes of the web application, which
+        # Celery workers do not otherwise import
+        import growser.web  # noqa: F401
+
+        client = app.test_client()
+        for language, period in product(languages, periods):
+            if '/' in language:
+                continue
+
+            path = snapshot_path(language, period)
+            cursors = page_cursors(language, period, end_date, num_pages)
+
+            rendered = set()
+            for after in [None] + cursors:
+                rsp = client.get('/browse/' + quote(language), query_string={
+                    'p': PERIODS[period], 'after': after})
+                if rsp.status_code != 200:
+                    log.warning('Failed to render %s: %d',
+                                language, rsp.status_code)
+                    continue
+                filename = (after or FIRST_PAGE) + '.html'
+                write_snapshot(join(path, filename), rsp.get_data())
+                rendered.add(filename)
+
+            remove_stale_snapshots(path, rendered)
+            log.info('Rendered %d pages for %s (period=%d)',
+                     len(rendered), language, period)
+
+
+def snapshot_path(language: str, period: int) -> str:
+    """Directory containing the pages of a single language & period."""
+    return join(app.config.get('SNAPSHOT_PATH'), 'browse', language,
+                PERIODS[period] or DEFAULT_PERIOD)
+
+
+def page_cursors(language: str, period: int, end_date: date,
+                 num_pages: int) -> list:
+    """Return the ``after`` cursor of each page following the first.
+
+    Mirrors the keyset pagination of the /browse view: a page links to the
+    next one when it is full.
+    """
+    keys = Ranking.query \
+        .with_entities(Ranking.rank, Ranking.repo_id) \
+        .filter(Ranking.end_date == end_date) \
+        .filter(Ranking.language == language) \
+        .filter(Ranking.period == period) \
+        .order_by(Ranking.rank, Ranking.repo_id) \
+        .limit(PER_PAGE * (num_pages - 1)).all()
+
+    return [encode_cursor(*keys[idx - 1])
+            for idx in range(PER_PAGE, len(keys) + 1, PER_PAGE)]
+
+
+def write_snapshot(path: str, data: bytes):
+    """Save `data` along with pre-compressed ``.gz`` & ``.br`` variants.
+
+    Each file is written to a temporary file and renamed into place. The
+    uncompressed file is replaced last since it is the one nginx checks
+    for before serving a variant.
+    """
+    os.makedirs(dirname(path), exist_ok=True)
+    variants = [
+        (path + '.gz', gzip.compress(data, 9)),
+        (path + '.br', brotli.compress(data)),
+        (path, data)
+    ]
+    for filename, content in variants:
+        fd, tmp = tempfile.mkstemp(dir=dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, filename)
+
+
+def remove_stale_snapshots(path: str, keep: set):
+    """Remove pages (and their variants) in `path` that are not in `keep`."""
+    if not os.path.isdir(path):
+        return
+    for filename in os.listdir(path):
+        name = filename
+        for ext in ('.gz', '.br'):
+            if name.endswith(ext):
+                name = name[:-len(ext)]
+        if name not in keep:
+            os.remove(join(path, filename))
@@ -1,20 +1,109 @@
+from collections import namedtuple
 from datetime import date, timedelta
 from typing import List
 
+from sqlalchemy import func, text
+
+from growser.app import db
 from growser.cmdr import handles
-from growser.models import Ranking, Recommendation, Repository
+from growser.models import (Language, Ranking, RankingPeriod, Recommendation,
+                            Release, Repository)
 from growser.queries import (
     FindCurrentRankings,
     FindProject,
-    FindRecommendations
+    FindProjects,
+    FindRecommendations,
+    FindRecommendationsBatch,
+    FindRelease,
+    FindReleases,
+    FindRepositoryPage,
+    FindTopLanguages
 )
 
+#: Repository columns returned by lightweight queries.
+REPOSITORY_FIELDS = ['repo_id', 'name', 'owner', 'homepage', 'language',
+                     'description', 'num_events', 'last_release_at']
+
+
+class RepositoryRow(namedtuple('RepositoryRow', REPOSITORY_FIELDS)):
+    """Read-only repository with the same helpers as :class:`Repository`."""
+    __slots__ = ()
+
+    short_name = property(Repository.short_name.fget)
+    github_url = property(Repository.github_url.fget)
+    hashid = property(Repository.hashid.fget)
+
+
+RankRow = namedtuple('RankRow', ['rank'])
+ReleaseRow = namedtuple('ReleaseRow', ['release_id', 'name', 'tag', 'url',
+                                       'published_at', 'created_at'])
+RecommendationRow = namedtuple('RecommendationRow', ['score', 'repository'])
+RepositoryPage = namedtuple('RepositoryPage', ['repo', 'ranks', 'releases',
+                                               'recommendations'])
+
+#: Repository, latest ranks, releases & recommendations in one statement.
+REPOSITORY_PAGE_SQL = text("""
+    SELECT
+        r.repo_id, r.name, r.owner, r.homepage, r.language, r.description,
+        r.num_events, r.last_release_at,
+        rank_all.rank AS rank_all,
+        rank_language.rank AS rank_language,
+        (
+            SELECT json_agg(rel ORDER BY rel.created_at)
+            FROM (
+                SELECT release_id, name, tag, url, published_at, created_at
+                FROM release
+                WHERE repo_id = r.repo_id
+            ) AS rel
+        ) AS releases,
+        (
+            SELECT json_agg(rec ORDER BY rec.score DESC)
+            FROM (
+                SELECT rr.repo_id, rr.name, rr.owner, rr.homepage,
+                    rr.language, rr.description, rr.num_events,
+                    rr.last_release_at, rc.score
+                FROM recommendation AS rc
+                JOIN repository AS rr ON rr.repo_id = rc.recommended_repo_id
+                WHERE rc.model_id = :model
+                    AND rc.repo_id = r.repo_id
+                ORDER BY rc.score DESC
+                LIMIT :limit
+            ) AS rec
+        ) AS recommendations
+    FROM repository AS r
+    LEFT JOIN LATERAL (
+        SELECT rank
+        FROM ranking
+        WHERE repo_id = r.repo_id
+            AND period = :period
+            AND language = 'All'
+        ORDER BY start_date DESC
+        LIMIT 1
+    ) AS rank_all ON true
+    LEFT JOIN LATERAL (
+        SELECT rank
+        FROM ranking
+        WHERE repo_id = r.repo_id
+            AND period = :period
+            AND language = r.language
+        ORDER BY start_date DESC
+        LIMIT 1
+    ) AS rank_language ON true
+    WHERE r.name = :name
+    LIMIT 1
+""")
+
 
 @handles(FindProject)
 def find_project(query: FindProject) -> Repository:
     return Repository.query.filter_by(name=query.name).first()
 
 
+@handles(FindProjects)
+def find_projects(query: FindProjects) -> List[Repository]:
+    return Repository.query.filter(Repository.name.in_(query.names)).all()
+
+
 @handles(FindCurrentRankings)
 def find_rankings(query: FindCurrentRankings) -> List[Ranking]:
     end_date = date.today() - timedelta(days=1)
@@ -22,12 +111,7 @@ def find_rankings(query: FindCurrentRankings) -> List[Ranking]:
         .filter(Ranking.repo_id == query.repo_id) \
         .filter(Ranking.end_date == end_date)
 
-    rv = []
-    for r in query.all():
-        print(r.period, r.end_date, r.language)
-        rv.append(r)
-
-    return rv
+    return query.all()
 
 
 @handles(FindRecommendations)
@@ -35,3 +119,76 @@ def find_recommendations(query: FindRecommendations) -> List[Recommendation]:
     query = Recommendation.find_by_repository(
         query.model, query.repo_id, query.limit)
     return query
+
+
+@handles(FindRecommendationsBatch)
+def find_recommendations_batch(query: FindRecommendationsBatch) -> List[tuple]:
+    """Return `(repo_id, recommended_repo_id, score)` for the top `limit`
+    recommendations of every repository in a single query."""
+    position = func.row_number().over(
+        partition_by=Recommendation.repo_id,
+        order_by=Recommendation.score.desc()).label('position')
+
+    ranked = db.session.query(Recommendation.repo_id,
+                              Recommendation.recommended_repo_id,
+                              Recommendation.score,
+                              position) \
+        .filter(Recommendation.model_id == query.model) \
+        .filter(Recommendation.repo_id.in_(query.repo_ids)) \
+        .subquery()
+
+    return db.session.query(ranked.c.repo_id,
+                            ranked.c.recommended_repo_id,
+                            ranked.c.score) \
+        .filter(ranked.c.position <= query.limit) \
+        .order_by(ranked.c.repo_id, ranked.c.position) \
+        .all()
+
+
+@handles(FindTopLanguages)
+def find_top_languages(query: FindTopLanguages) -> List[Language]:
+    return Language.top(query.limit)
+
+
+@handles(FindRelease)
+def find_release(query: FindRelease) -> Release:
+    return Release.query.get(query.release_id)
+
+
+@handles(FindReleases)
+def find_releases(query: FindReleases) -> List[Release]:
+    return Release.query \
+        .filter(Release.repo_id == query.repo_id) \
+        .order_by(Release.created_at.desc()) \
+        .limit(query.limit) \
+        .offset(query.offset) \
+        .all()
+
+
+@handles(FindRepositoryPage)
+def find_repository_page(query: FindRepositoryPage) -> RepositoryPage:
+    row = db.engine.execute(REPOSITORY_PAGE_SQL,
+                            name=query.name,
+                            model=query.model,
+                            limit=query.limit,
+                            period=RankingPeriod.Recent).first()
+    if not row:
+        return None
+
+    def rank(value):
+        return RankRow(value) if value is not None else None
+
+    def to_repository(values):
+        return RepositoryRow(*[values[f] for f in REPOSITORY_FIELDS])
+
+    releases = [ReleaseRow(*[r[f] for f in ReleaseRow._fields])
+                for r in row['releases'] or []]
+    recommendations = [RecommendationRow(r['score'], to_repository(r))
+                       for r in row['recommendations'] or []]
+
+    return RepositoryPage(
+        repo=to_repository(row),
+        ranks={'all': rank(row['rank_all']),
+               'language': rank(row['rank_language'])},
+        releases=releases,
+        recommendations=recommendations)
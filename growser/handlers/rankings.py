@@ -1,20 +1,46 @@
 from datetime import date, timedelta
+from itertools import chain
+from os.path import join
 
 import numpy as np
 import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import case, func, text
 
-from growser.app import db
+from growser.app import db, log
 from growser.cmdr import Handles, DomainEvent
 from growser.commands.rankings import (
+    BackfillRankings,
+    RankingPeriod,
     UpdateRankings,
+    UpdateRankingsBatch,
     UpdateAllTimeRankings,
     UpdateWeeklyRankings,
     UpdateMonthlyRankings,
     UpdateRecentRankings
 )
-from growser.db import from_sqlalchemy_table
-from growser.models import Ranking, Rating, Repository
+from growser.db import copy_from_rows, from_sqlalchemy_table, transaction
+from growser.models import (Language, Ranking, RankingWindow,
+                            RankingWindowEvents, Rating, Repository,
+                            RepositoryDailyEvents)
+
+SQL_PATH = "deploy/etl/sql"
+
+#: Earliest date included in the all-time rankings.
+ALL_TIME_START = date(2012, 1, 1)
+
+#: Length, in days, of each rolling-window ranking period.
+WINDOWS = {
+    RankingPeriod.Week: 7,
+    RankingPeriod.Month: 30,
+    RankingPeriod.Recent: 90
+}
+
+#: Days of daily rollups loaded at once when backfilling rankings.
+BACKFILL_BLOCK_DAYS = 30
+
+#: Columns of :class:`Ranking` in the order they are loaded.
+RANKING_COLUMNS = ['language', 'period', 'repo_id', 'start_date', 'end_date',
+                   'rank', 'num_events']
 
 
 class RankingsUpdated(DomainEvent):
@@ -30,27 +56,27 @@ class UpdateRankingsHandler(Handles[UpdateRankings]):
         """Set the time window for the rankings to the prior week."""
         if not cmd.end_date:
             cmd.end_date = date.today() - timedelta(days=1)
-        cmd.start_date = cmd.end_date - timedelta(days=7)
+        cmd.start_date = cmd.end_date - timedelta(days=WINDOWS[cmd.period])
         return self.handle(cmd)
 
     def monthly(self, cmd: UpdateMonthlyRankings):
         """Set the time window for the rankings to the prior month."""
         if not cmd.end_date:
             cmd.end_date = date.today() - timedelta(days=1)
-        cmd.start_date = cmd.end_date - timedelta(days=30)
+        cmd.start_date = cmd.end_date - timedelta(days=WINDOWS[cmd.period])
         return self.handle(cmd)
 
     def recent(self, cmd: UpdateRecentRankings):
         """Set the time window for the rankings to the prior 90 days."""
         if not cmd.end_date:
             cmd.end_date = date.today() - timedelta(days=1)
-        cmd.start_date = cmd.end_date - timedelta(days=90)
+        cmd.start_date = cmd.end_date - timedelta(days=WINDOWS[cmd.period])
         return self.handle(cmd)
 
     def alltime(self, cmd: UpdateAllTimeRankings):
         if not cmd.end_date:
             cmd.end_date = date.today() - timedelta(days=1)
-        cmd.start_date = date(2012, 1, 1)
+        cmd.start_date = ALL_TIME_START
         return self.handle(cmd)
 
     def handle(self, cmd: UpdateRankings) -> RankingsUpdated:
@@ -60,7 +86,10 @@ class UpdateRankingsHandler(Handles[UpdateRankings]):
         if cmd.start_date and cmd.start_date > cmd.end_date:
             raise ValueError("Invalid dates")
 
-        rankings = self._query_database_num_ratings(cmd)
+        if cmd.period in WINDOWS:
+            rankings = self._query_window_num_events(cmd)
+        else:
+            rankings = self._query_database_num_ratings(cmd)
 
         # Use pandas to perform the ranking
         df = pd.DataFrame(rankings)
@@ -82,6 +111,8 @@ class UpdateRankingsHandler(Handles[UpdateRankings]):
         batch = from_sqlalchemy_table(Ranking.__table__, data, list(df.columns))
         batch.execute(db.engine.raw_connection)
 
+        update_trends(cmd.end_date, cmd.end_date, [cmd.period], [cmd.language])
+
         yield RankingsUpdated(
             cmd.period, cmd.start_date, cmd.end_date, cmd.language)
 
@@ -102,3 +133,367 @@ class UpdateRankingsHandler(Handles[UpdateRankings]):
             query = query.filter(Rating.created_at < cmd.end_date)
 
         return query.limit(cmd.limit).all()
+
+    @staticmethod
+    def _query_window_num_events(cmd: UpdateRankings):
+        """Top repositories from the incrementally maintained rolling window.
+
+        Rankings prior to the current window are summed from the daily
+        rollups instead of moving the window backwards.
+        """
+        window = RankingWindow.query.get(cmd.period)
+        if window and window.end_date > cmd.end_date:
+            return UpdateRankingsHandler._query_daily_num_events(
+                cmd.language, cmd.limit, cmd.start_date, cmd.end_date)
+
+        update_window(cmd.period, cmd.end_date,
+                      window.end_date if window else None)
+
+        count = RankingWindowEvents.num_events
+        query = db.session.query(RankingWindowEvents.repo_id, count) \
+            .join(Repository,
+                  Repository.repo_id == RankingWindowEvents.repo_id) \
+            .filter(RankingWindowEvents.period == cmd.period) \
+            .order_by(count.desc())
+
+        if cmd.language != "All":
+            query = query.filter(Repository.language == cmd.language)
+
+        return query.limit(cmd.limit).all()
+
+    @staticmethod
+    def _query_daily_num_events(language: str, limit: int,
+                                start_date: date, end_date: date):
+        """Number of events per repository summed from the daily rollups."""
+        count = func.SUM(RepositoryDailyEvents.num_events)
+        query = db.session.query(RepositoryDailyEvents.repo_id,
+                                 count.label("num_events")) \
+            .join(Repository,
+                  Repository.repo_id == RepositoryDailyEvents.repo_id) \
+            .filter(RepositoryDailyEvents.date >= start_date) \
+            .filter(RepositoryDailyEvents.date < end_date) \
+            .group_by(RepositoryDailyEvents.repo_id) \
+            .order_by(count.desc())
+
+        if language != "All":
+            query = query.filter(Repository.language == language)
+
+        return query.limit(limit).all()
+
+
+def update_trends(start_date: date, end_date: date, periods, languages):
+    """Store the rank delta, velocity & acceleration of every ranking
+    between `start_date` and `end_date` relative to the prior day.
+
+    :param start_date: First end date to update (inclusive).
+    :param end_date: Last end date to update (inclusive).
+    :param periods: Ranking periods to update.
+    :param languages: Languages to update.
+    """
+    query = open(join(SQL_PATH, 'update_ranking_trends.sql')).read()
+    db.engine.execute(text(query),
+                      scan_date=start_date - timedelta(days=2),
+                      start_date=start_date,
+                      end_date=end_date,
+                      periods=tuple(periods),
+                      languages=tuple(languages))
+
+
+def update_window(period: int, end_date: date, prev_end_date: date=None):
+    """Move the rolling window of `period` so that it ends on `end_date`.
+
+    When the window is moved forward by less than its length only the days
+    entering and leaving it are read from the daily rollups, so the cost
+    scales with the number of active repositories rather than with the
+    length of the window. Otherwise the window is rebuilt.
+
+    The window is shared by every language, so the delta is only applied if
+    it still ends on `prev_end_date` once its lock is held; a concurrent
+    update that already moved it leaves nothing to do.
+
+    :param period: Rolling-window period, see :data:`WINDOWS`.
+    :param end_date: Date the window should end on (exclusive).
+    :param prev_end_date: Date the window currently ends on, if any.
+    """
+    if prev_end_date == end_date:
+        return
+
+    days = timedelta(days=WINDOWS[period])
+    params = {'period': period,
+              'start_date': end_date - days,
+              'end_date': end_date}
+
+    if prev_end_date and prev_end_date < end_date < prev_end_date + days:
+        filename = 'advance_ranking_window.sql'
+        params['prev_start_date'] = prev_end_date - days
+        params['prev_end_date'] = prev_end_date
+    else:
+        filename = 'rebuild_ranking_window.sql'
+
+    log.info("Updating %s window to %s", period, end_date)
+    query = open(join(SQL_PATH, filename)).read()
+    db.engine.execute(text(query), **params)
+
+
+class UpdateRankingsBatchHandler(Handles[UpdateRankingsBatch]):
+    def handle(self, cmd: UpdateRankingsBatch):
+        """Rank every (language, period) combination from a single scan of
+        the ratings table, replacing the existing rankings in one transaction.
+        """
+        if not cmd.end_date:
+            cmd.end_date = date.today() - timedelta(days=1)
+        if not cmd.languages:
+            cmd.languages = ["All"] + [lang.name for lang in Language.top()]
+
+        windows = period_windows(cmd.end_date)
+
+        log.info("Counting ratings for %d windows", len(windows))
+        counts = pd.DataFrame(
+            self._query_window_counts(windows, cmd.end_date),
+            columns=['repo_id', 'language'] + [str(p) for p in windows])
+
+        df = rank_windows(counts, windows, cmd.languages, cmd.limit)
+        df['end_date'] = cmd.end_date
+
+        log.info("Loading %d rankings", len(df))
+        with transaction(db.engine) as cursor:
+            cursor.execute(
+                "DELETE FROM ranking WHERE end_date = %s "
+                "AND period IN %s AND language IN %s",
+                [cmd.end_date, tuple(windows), tuple(cmd.languages)])
+            copy_from_rows(cursor, Ranking.__tablename__, RANKING_COLUMNS,
+                           df[RANKING_COLUMNS].itertuples(index=False))
+
+        update_trends(cmd.end_date, cmd.end_date, windows, cmd.languages)
+
+        for period, start_date in windows.items():
+            for language in cmd.languages:
+                yield RankingsUpdated(
+                    period, start_date, cmd.end_date, language)
+
+    @staticmethod
+    def _query_window_counts(windows: dict, end_date: date):
+        """Number of ratings per repository within each window, using one
+        conditional sum per window."""
+        columns = [
+            func.sum(case([(Rating.created_at >= start_date, 1)],
+                          else_=0)).label(str(period))
+            for period, start_date in windows.items()
+        ]
+
+        query = db.session.query(Rating.repo_id, Repository.language,
+                                 *columns) \
+            .join(Repository, Repository.repo_id == Rating.repo_id) \
+            .filter(Rating.created_at >= min(windows.values())) \
+            .filter(Rating.created_at < end_date) \
+            .group_by(Rating.repo_id, Repository.language)
+
+        return query.all()
+
+
+def period_windows(end_date: date) -> dict:
+    """Return the start date (inclusive) of each ranking period."""
+    rv = {p: end_date - timedelta(days=d) for p, d in WINDOWS.items()}
+    rv[RankingPeriod.AllTime] = ALL_TIME_START
+    return rv
+
+
+def rank_windows(counts: pd.DataFrame, windows: dict, languages: list,
+                 limit: int) -> pd.DataFrame:
+    """Rank repositories per (language, period) from per-window counts.
+
+    :param counts: One row per repository with a ``repo_id`` & ``language``
+                   column and a column of counts per period.
+    :param windows: Mapping of period to start date.
+    :param languages: Languages to rank, "All" ranks every repository.
+    :param limit: Number of repositories to keep per ranking.
+    """
+    frames = []
+    for period, start_date in windows.items():
+        df = counts[['repo_id', 'language', str(period)]] \
+            .rename(columns={str(period): 'num_events'})
+        df = df[df['num_events'] > 0]
+
+        if "All" in languages:
+            frames.append(df.assign(language="All", period=period,
+                                    start_date=start_date))
+        df = df[df['language'].isin(languages)]
+        frames.append(df.assign(period=period, start_date=start_date))
+
+    df = pd.concat(frames, ignore_index=True)
+    grouped = df.groupby(['language', 'period'])['num_events']
+
+    # Ties share the lowest rank, but only `limit` repositories are kept
+    df['rank'] = grouped.rank(method='min', ascending=False).astype(np.int64)
+    df = df[grouped.rank(method='first', ascending=False) <= limit]
+    df['num_events'] = df['num_events'].astype(np.int64)
+
+    return df.sort_values(['language', 'period', 'rank'])
+
+
+class BackfillRankingsHandler(Handles[BackfillRankings]):
+    def handle(self, cmd: BackfillRankings):
+        """Regenerate historical rankings from a single pass over the daily
+        rollups.
+
+        A running total of every period is kept for each repository and
+        moved forward a day at a time, adding the day that enters each
+        window and subtracting the day that leaves it. Each end date is
+        ranked from the totals before its own events are added. Only the
+        rollups of :data:`BACKFILL_BLOCK_DAYS` days, and of the days still
+        in a window, are held at once.
+        """
+        if cmd.start_date > cmd.end_date:
+            raise ValueError("Invalid dates")
+        if not cmd.languages:
+            cmd.languages = ["All"] + [lang.name for lang in Language.top()]
+
+        first = cmd.start_date - timedelta(days=max(WINDOWS.values()))
+        repos, languages, base = self._load_repositories(
+            first, cmd.end_date, cmd.min_events)
+        subsets = {language: slice(None) if language == "All"
+                   else np.flatnonzero(languages == language)
+                   for language in cmd.languages}
+
+        totals = {period: np.zeros(len(repos), np.int64) for period in WINDOWS}
+        totals[RankingPeriod.AllTime] = base
+        periods = dict(WINDOWS)
+        periods[RankingPeriod.AllTime] = None
+
+        log.info("Loading rankings for %d days",
+                 (cmd.end_date - cmd.start_date).days + 1)
+        with transaction(db.engine) as cursor:
+            cursor.execute(
+                "DELETE FROM ranking WHERE end_date BETWEEN %s AND %s "
+                "AND period IN %s AND language IN %s",
+                [cmd.start_date, cmd.end_date,
+                 tuple(period_windows(cmd.end_date)), tuple(cmd.languages)])
+
+            recent = {}
+            for day, rows, num_events in self._daily_events(
+                    repos, first, cmd.end_date):
+                if day >= cmd.start_date:
+                    rankings = chain.from_iterable(
+                        ranking_rows(repos[subset], sums[subset][:, None],
+                                     [day], language, period, periods[period],
+                                     cmd.limit)
+                        for language, subset in subsets.items()
+                        for period, sums in totals.items())
+                    copy_from_rows(cursor, Ranking.__tablename__,
+                                   RANKING_COLUMNS, rankings)
+
+                # Move every window forward to end after `day`
+                for sums in totals.values():
+                    sums[rows] += num_events
+                recent[day] = (rows, num_events)
+                for period, days in WINDOWS.items():
+                    expired = recent.get(day - timedelta(days=days))
+                    if expired:
+                        totals[period][expired[0]] -= expired[1]
+                recent.pop(day - timedelta(days=max(WINDOWS.values())), None)
+
+        update_trends(cmd.start_date, cmd.end_date,
+                      period_windows(cmd.end_date), cmd.languages)
+
+        for end_date in (cmd.start_date, cmd.end_date):
+            for period, start_date in period_windows(end_date).items():
+                for language in cmd.languages:
+                    yield RankingsUpdated(
+                        period, start_date, end_date, language)
+
+    @staticmethod
+    def _load_repositories(first: date, end_date: date, min_events: int):
+        """Return the IDs & languages of the repositories with at least
+        `min_events` all-time events before `end_date`, along with their
+        number of all-time events before `first`."""
+        events = RepositoryDailyEvents
+        before = func.SUM(case([(events.date < first, events.num_events)],
+                               else_=0))
+        query = db.session.query(events.repo_id, Repository.language,
+                                 before.label("num_events")) \
+            .outerjoin(Repository, Repository.repo_id == events.repo_id) \
+            .filter(events.date >= ALL_TIME_START) \
+            .filter(events.date < end_date) \
+            .group_by(events.repo_id, Repository.language) \
+            .having(func.SUM(events.num_events) >= min_events)
+        df = pd.read_sql(query.statement, db.engine)
+
+        log.info("Ranking %d repositories", len(df))
+        return (df['repo_id'].values,
+                df['language'].astype('category').values,
+                df['num_events'].values.astype(np.int64))
+
+    @staticmethod
+    def _daily_events(repos: np.ndarray, first: date, end_date: date):
+        """Yield `(day, rows, num_events)` for each day from `first` to
+        `end_date` (inclusive), where `rows` are the indexes in `repos` of
+        the repositories with events before `end_date` on that day."""
+        index = pd.Index(repos)
+        block_start = first
+        while block_start <= end_date:
+            block_end = min(block_start + timedelta(days=BACKFILL_BLOCK_DAYS),
+                            end_date + timedelta(days=1))
+            daily = db.session.query(RepositoryDailyEvents.repo_id,
+                                     RepositoryDailyEvents.date,
+                                     RepositoryDailyEvents.num_events) \
+                .filter(RepositoryDailyEvents.date >= block_start) \
+                .filter(RepositoryDailyEvents.date < block_end) \
+                .filter(RepositoryDailyEvents.date < end_date)
+            daily = pd.read_sql(daily.statement, db.engine)
+
+            rows = index.get_indexer(daily['repo_id'])
+            offsets = (pd.to_datetime(daily['date']) -
+                       pd.Timestamp(block_start)).dt.days.values
+            num_events = daily['num_events'].values.astype(np.int64)
+            keep = rows >= 0
+            rows, offsets, num_events = \
+                rows[keep], offsets[keep], num_events[keep]
+
+            order = np.argsort(offsets, kind='mergesort')
+            days = (block_end - block_start).days
+            bounds = np.searchsorted(offsets[order], np.arange(days + 1))
+            for offset in range(days):
+                day = order[bounds[offset]:bounds[offset + 1]]
+                yield (block_start + timedelta(days=offset),
+                       rows[day], num_events[day])
+            block_start = block_end
+
+
+def rank_columns(matrix: np.ndarray, limit: int) -> tuple:
+    """Rank the rows of every column of `matrix` in descending order.
+
+    Returns the row indexes, ranks & values of the top `limit` rows of each
+    column as ``limit x columns`` matrices. Ties share the lowest rank.
+    """
+    limit = min(limit, matrix.shape[0])
+    if not limit:
+        return (np.empty((0, matrix.shape[1]), np.int64),) * 3
+
+    cols = np.arange(matrix.shape[1])
+    top = np.argpartition(-matrix, limit - 1, axis=0)[:limit]
+    values = matrix[top, cols]
+
+    order = np.argsort(-values, axis=0, kind='mergesort')
+    top = top[order, cols]
+    values = values[order, cols]
+
+    positions = np.arange(1, limit + 1)[:, None]
+    changed = np.ones(values.shape, bool)
+    changed[1:] = values[1:] != values[:-1]
+    ranks = np.maximum.accumulate(np.where(changed, positions, 0), axis=0)
+
+    return top, ranks, values
+
+
+def ranking_rows(repos: np.ndarray, sums: np.ndarray, end_dates: list,
+                 language: str, period: int, days: int, limit: int):
+    """Yield :data:`RANKING_COLUMNS` rows for each end date (column)."""
+    top, ranks, values = rank_columns(sums, limit)
+    for col, end_date in enumerate(end_dates):
+        start_date = end_date - timedelta(days=days) if days \
+            else ALL_TIME_START
+        for row in range(top.shape[0]):
+            if values[row, col] <= 0:
+                break
+            yield (language, period, int(repos[top[row, col]]), start_date,
+                   end_date, int(ranks[row, col]), int(values[row, col]))
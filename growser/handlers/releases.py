@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import RequestException
+from sqlalchemy import func
+
+from growser import httpcache
+from growser.app import app, db, log, ratelimit
+from growser.cmdr import DomainEvent, Handles
+from growser.commands.releases import UpdateReleases
+from growser.db import copy_from_rows, transaction
+from growser.handlers.github import APIError, GitHubAPIWrapper
+from growser.models import Release, Repository
+
+#: Seconds before a page of releases is revalidated. Revalidation uses the
+#: ETag of the cached page, and GitHub does not count a 304 against the limit.
+RELEASES_EXPIRES = 3600
+
+#: Releases requested per page
+RELEASES_PER_PAGE = 100
+
+#: Pages fetched for a repository with no releases stored yet
+MAX_PAGES = 10
+
+#: Releases fetched from the API, merged by merge_releases.sql
+RELEASE_TMP_TABLE = """CREATE TEMP TABLE release_tmp (
+    release_id integer NOT NULL,
+    repo varchar(256) NOT NULL,
+    login varchar(64),
+    author_id integer NOT NULL,
+    url varchar(256) NOT NULL,
+    name varchar(256) NOT NULL,
+    tag varchar(64) NOT NULL,
+    body text NOT NULL,
+    published_at timestamp NOT NULL,
+    created_at timestamp NOT NULL
+)"""
+
+#: Columns of :data:`RELEASE_TMP_TABLE` in the order they are copied
+RELEASE_TMP_COLUMNS = ['release_id', 'repo', 'login', 'author_id', 'url',
+                       'name', 'tag', 'body', 'published_at', 'created_at']
+
+
+class ReleasesUpdated(DomainEvent):
+    def __init__(self, num_releases: int):
+        self.num_releases = num_releases
+
+
+class UpdateReleasesHandler(Handles[UpdateReleases]):
+    def handle(self, cmd: UpdateReleases):
+        """Fetch the releases not already stored for each repository
+        concurrently, then merge them in one transaction."""
+        repos = stored_releases(cmd.min_events, cmd.limit)
+        api = GitHubAPIWrapper(app.config.get('GITHUB_OAUTH'),
+                               RELEASES_EXPIRES, limiter=ratelimit)
+
+        def fetch(repo):
+            # Nothing is merged for a failed repository, so its releases
+            # are checked again by the next update
+            try:
+                return fetch_releases(api, *repo)
+            except (APIError, RequestException, ValueError) as e:
+                log.warning('Releases of %s not fetched: %s', repo.name, e)
+                return []
+
+        log.info('Checking releases of %d repositories', len(repos))
+        with ThreadPoolExecutor(httpcache.MAX_WORKERS) as pool:
+            fetched = pool.map(fetch, repos)
+            rows = [release_row(repo.name, release)
+                    for repo, releases in zip(repos, fetched)
+                    for release in releases]
+
+        log.info('Merging %d new releases', len(rows))
+        merge_releases(rows)
+
+        if rows:
+            return ReleasesUpdated(len(rows))
+
+
+def stored_releases(min_events: int, limit: int=None) -> list:
+    """Return `(name, release_ids)` of active repositories with the IDs of
+    the releases already stored, or `None`."""
+    stored = db.session.query(
+        Release.repo_id,
+        func.array_agg(Release.release_id).label('release_ids')) \
+        .group_by(Release.repo_id).subquery()
+
+    query = db.session.query(Repository.name, stored.columns.release_ids) \
+        .outerjoin(stored, stored.columns.repo_id == Repository.repo_id) \
+        .filter(Repository.status == 1) \
+        .filter(Repository.num_events >= min_events) \
+        .order_by(Repository.num_events.desc())
+
+    return query.limit(limit).all()
+
+
+def fetch_releases(api: GitHubAPIWrapper, name: str,
+                   release_ids: list=None) -> list:
+    """Return releases of `name` that are not in `release_ids`.
+
+    Releases are listed by the date they were created rather than by ID, so
+    a new release can follow ones already stored. Paging stops at the first
+    page without any new release. Drafts have not been published and are
+    skipped.
+
+    :param release_ids: IDs of the releases already stored.
+    :raises APIError: GitHub returned an error other than ``Not Found``.
+    """
+    known = set(release_ids or ())
+    rv = []
+    for page in range(1, MAX_PAGES + 1):
+        releases = api.releases(name, page, RELEASES_PER_PAGE)
+
+        if not isinstance(releases, list):
+            # Repository missing or renamed: {"message": "Not Found", ...}
+            if releases.get('message') == 'Not Found':
+                break
+            raise APIError(releases.get('message'))
+
+        new = [release for release in releases
+               if release['id'] not in known and not release.get('draft')
+               and release.get('published_at')]
+        rv += new
+
+        if not new or len(releases) < RELEASES_PER_PAGE:
+            break
+    return rv
+
+
+def release_row(name: str, release: dict) -> tuple:
+    """Values of :data:`RELEASE_TMP_COLUMNS` for a release from the API."""
+    author = release.get('author') or {}
+    return (release['id'], name, author.get('login'), author.get('id') or 0,
+            release['html_url'][:256],
+            (release.get('name') or release['tag_name'])[:256],
+            release['tag_name'][:64], release.get('body') or '',
+            release['published_at'], release['created_at'])
+
+
+def merge_releases(rows: list):
+    """Copy `rows` into a temporary table and merge them into release."""
+    if not len(rows):
+        return
+    with transaction(db.engine) as cursor:
+        cursor.execute(RELEASE_TMP_TABLE)
+        copy_from_rows(cursor, 'release_tmp', RELEASE_TMP_COLUMNS, rows)
+        cursor.execute(open("deploy/etl/sql/merge_releases.sql").read())
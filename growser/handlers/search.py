@@ -0,0 +1,19 @@
+from growser.app import app, log
+from growser.cmdr import DomainEvent, Handles
+from growser.commands.search import BuildSearchIndex
+from growser.search import SearchIndex, index_rows
+
+
+class SearchIndexBuilt(DomainEvent):
+    def __init__(self, num_repos: int):
+        self.num_repos = num_repos
+
+
+class BuildSearchIndexHandler(Handles[BuildSearchIndex]):
+    def handle(self, cmd: BuildSearchIndex) -> SearchIndexBuilt:
+        """Build the index outside of the web processes, which only map the
+        saved arrays, so that no request waits for it to be built."""
+        index = SearchIndex(index_rows())
+        index.save(app.config.get('SEARCH_INDEX_PATH'))
+        log.info('Built search index of %d repositories', len(index.repo_ids))
+        return SearchIndexBuilt(len(index.repo_ids))
@@ -1,41 +1,511 @@
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import fcntl
 import hashlib
-import gzip
 import os
+import sqlite3
+import threading
 import time
-from urllib.parse import urlparse
+import zlib
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
 #: Default expiration of 14 days
 DEFAULT_EXPIRES = 86400 * 14
 
+#: Default location of the cache database
+DEFAULT_PATH = "data/httpcache.sqlite"
 
-def get(url: str, params: dict=None, expires: int=DEFAULT_EXPIRES, **kwargs) -> bytes:
-    """Wrapper around requests.get"""
-    path = _url_to_path(url, params)
-    if os.path.exists(path) and expires > time.time() - os.path.getctime(path):
-        return gzip.open(path, 'rb').read()
+#: Default byte budget of 10 GB
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
 
-    name = os.path.dirname(path)
-    if not os.path.exists(name):
-        os.makedirs(name)
+#: Fraction of the byte budget to evict down to once it is exceeded
+LOW_WATER = 0.9
 
-    content = requests.get(url, params, **kwargs).content
-    gzip.open(path, 'wb').write(content)
+#: Seconds between writes of the time an entry was last used
+ACCESS_INTERVAL = 3600
 
-    return content
+#: Seconds between writes of the hits & misses counted by a process
+FLUSH_INTERVAL = 60
 
+#: Maximum number of concurrent requests made by :func:`get_many`
+MAX_WORKERS = 16
 
-def _url_to_path(url: str, params: dict=None) -> str:
-    """Returns a filesystem-friendly string from a URL."""
-    parts = urlparse(url)
-    domain = parts.netloc
-    if domain[0:4] == 'www.':
-        domain = domain[4:]
-    filename = parts.path
-    if filename[0] == '/':
-        filename = filename[1:]
+#: Seconds to wait to connect and between bytes of a response before a
+#: request fails, so that a stalled connection cannot hang a worker
+TIMEOUT = 30
+
+#: Retries of failed connections & server errors, waiting 0.5s, 1s, 2s...
+RETRY = Retry(total=3, backoff_factor=0.5,
+              status_forcelist=(500, 502, 503, 504))
+
+#: Incremented whenever the schema changes. The cache is discarded, rather
+#: than migrated, when it was created by an older version.
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entry (
+    key         TEXT PRIMARY KEY,
+    body        BLOB NOT NULL,
+    etag        TEXT,
+    modified    TEXT,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_entry_accessed_at ON entry (accessed_at);
+CREATE TABLE IF NOT EXISTS stats (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES
+    ('hits', 0), ('misses', 0), ('not_modified', 0), ('bytes', 0);
+"""
+
+#: A cached response body, the time it was fetched or last revalidated and
+#: the ``ETag`` & ``Last-Modified`` headers of the response
+Entry = namedtuple('Entry', ['body', 'created_at', 'etag', 'modified'])
+
+
+class SQLiteStore:
+    def __init__(self, path: str=DEFAULT_PATH,
+                 max_bytes: int=DEFAULT_MAX_BYTES, max_age: int=None,
+                 access_interval: int=ACCESS_INTERVAL):
+        """Cache of response bodies in a single SQLite database.
+
+        Bodies are compressed with zlib. Once the compressed bodies exceed
+        `max_bytes`, the least recently used are evicted along with any
+        older than `max_age`.
+
+        Example::
+
+            store = SQLiteStore("data/httpcache.sqlite", 1024 ** 3)
+            store.set("https://github.com/pydata/pandas", b"...")
+            store.get("https://github.com/pydata/pandas").body
+
+        :param path: Path of the database file.
+        :param max_bytes: Byte budget of the compressed bodies.
+        :param max_age: Seconds before an entry is evicted, regardless of
+                        whether it is still being used.
+        :param access_interval: Seconds between updates of the time an entry
+                                was last used, bounding the precision of the
+                                least recently used eviction.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.access_interval = access_interval
+        self.lock = KeyLock(path + '.lock')
+        self._local = threading.local()
+        self._counts = (os.getpid(), Counter())
+        self._counts_lock = threading.Lock()
+        self._flushed_at = time.time()
+
+    def get(self, key: str, expires: int=None, record: bool=True) -> Entry:
+        """Return the entry for `key` or `None`.
+
+        Entries older than `expires` seconds are still returned, but are
+        counted as a miss rather than a hit.
+
+        Lookups only read the database. Hits & misses are counted in memory
+        until they are flushed, and the access time used for eviction is
+        only written once it is older than `access_interval`.
+
+        :param record: Count the lookup as a hit or miss.
+        """
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT body, created_at, etag, modified, accessed_at '
+            'FROM entry WHERE key = ?', (key,)).fetchone()
+        fresh = row is not None and (expires is None or expires > now - row[1])
+        if record:
+            self._record('hits' if fresh else 'misses')
+        if row is None:
+            return None
+        if now - row[4] > self.access_interval:
+            self._connection().execute(
+                'UPDATE entry SET accessed_at = ? WHERE key = ?', (now, key))
+        return Entry(zlib.decompress(row[0]), *row[1:4])
+
+    def set(self, key: str, body: bytes, etag: str=None,
+            modified: str=None):
+        """Cache `body` along with the validators of the response.
+
+        :param etag: Value of the ``ETag`` header.
+        :param modified: Value of the ``Last-Modified`` header.
+        """
+        data = zlib.compress(body)
+        now = time.time()
+        with self._transaction() as conn:
+            self._delete(conn, key)
+            conn.execute('INSERT INTO entry VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (key, data, etag, modified, len(data), now, now))
+            self._incr(conn, 'bytes', len(data))
+            self._flush(conn)
+            if self._value(conn, 'bytes') > self.max_bytes:
+                self._evict(conn)
+
+    def revalidated(self, key: str):
+        """Mark a stale entry as fresh after a ``304 Not Modified``."""
+        with self._transaction() as conn:
+            conn.execute('UPDATE entry SET created_at = ? WHERE key = ?',
+                         (time.time(), key))
+            self._incr(conn, 'not_modified')
+            self._flush(conn)
+
+    def delete(self, key: str):
+        with self._transaction() as conn:
+            self._delete(conn, key)
+
+    def stats(self) -> dict:
+        """Return the number of hits, misses, entries & compressed bytes.
+
+        ``not_modified`` is the number of stale entries revalidated with a
+        conditional request instead of being downloaded again.
+        """
+        self.flush()
+        conn = self._connection()
+        rv = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+        rv['entries'] = conn.execute(
+            'SELECT COUNT(1) FROM entry').fetchone()[0]
+        return rv
+
+    def flush(self):
+        """Write the hits & misses counted by this process."""
+        with self._transaction() as conn:
+            self._flush(conn)
+
+    def evict(self):
+        """Remove expired entries and enforce the byte budget."""
+        with self._transaction() as conn:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        if self.max_age:
+            expired = conn.execute('SELECT key FROM entry WHERE '
+                                   'created_at < ?',
+                                   (time.time() - self.max_age,)).fetchall()
+            for key, in expired:
+                self._delete(conn, key)
+
+        excess = self._value(conn, 'bytes') - self.max_bytes * LOW_WATER
+        if excess <= 0:
+            return
+        rows = conn.execute('SELECT key, size FROM entry '
+                            'ORDER BY accessed_at')
+        keys = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append(key)
+            excess -= size
+        for key in keys:
+            self._delete(conn, key)
+
+    def _delete(self, conn, key: str):
+        row = conn.execute('SELECT size FROM entry WHERE key = ?',
+                           (key,)).fetchone()
+        if row:
+            conn.execute('DELETE FROM entry WHERE key = ?', (key,))
+            self._incr(conn, 'bytes', -row[0])
+
+    def _record(self, name: str):
+        """Count a hit or miss, flushing the counts every
+        :data:`FLUSH_INTERVAL` seconds."""
+        with self._counts_lock:
+            pid, counts = self._counts
+            if pid != os.getpid():
+                # Counts of the parent process are flushed by the parent
+                counts = Counter()
+                self._counts = (os.getpid(), counts)
+            counts[name] += 1
+        if time.time() - self._flushed_at > FLUSH_INTERVAL:
+            self.flush()
+
+    def _flush(self, conn):
+        with self._counts_lock:
+            pid, counts = self._counts
+            self._counts = (os.getpid(), Counter())
+            self._flushed_at = time.time()
+        if pid == os.getpid():
+            for name, value in counts.items():
+                self._incr(conn, name, value)
+
+    @staticmethod
+    def _incr(conn, name: str, value: int=1):
+        conn.execute('UPDATE stats SET value = value + ? WHERE name = ?',
+                     (value, name))
+
+    @staticmethod
+    def _value(conn, name: str) -> int:
+        return conn.execute('SELECT value FROM stats WHERE name = ?',
+                            (name,)).fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction, taking the database lock up front so that
+        concurrent writers wait rather than fail when upgrading a read."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for the current thread & process."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != \
+                    SCHEMA_VERSION:
+                conn.executescript('DROP TABLE IF EXISTS entry;'
+                                   'DROP TABLE IF EXISTS stats;')
+                conn.execute('PRAGMA user_version = {}'.format(
+                    SCHEMA_VERSION))
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+class KeyLock:
+    def __init__(self, path: str):
+        """Lock a key against other threads & processes on this host.
+
+        Processes lock a single byte of `path`, at an offset derived from the
+        key, so that any number of keys can be locked with a single file.
+        POSIX record locks are owned by the process, so threads also take a
+        lock of their own for the key, which is discarded once no thread
+        holds or waits for it.
+
+        Example::
+
+            lock = KeyLock("data/httpcache.sqlite.lock")
+            with lock("https://github.com/pydata/pandas") as acquired:
+                pass
+
+        :param path: File to hold the record locks.
+        """
+        self.path = path
+        self._locks = {}
+        self._mutex = threading.Lock()
+        self._fd = (None, None)
+
+    @contextmanager
+    def __call__(self, key: str, blocking: bool=True):
+        """Hold the lock for `key`, yielding whether it was acquired.
+
+        :param blocking: Wait for the lock rather than yielding `False`.
+        """
+        offset = int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16)
+        with self._mutex:
+            lock, users = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, users + 1)
+        try:
+            if not lock.acquire(blocking):
+                yield False
+                return
+            try:
+                fd = self._file()
+                try:
+                    flags = fcntl.LOCK_EX if blocking else \
+                        fcntl.LOCK_EX | fcntl.LOCK_NB
+                    fcntl.lockf(fd, flags, 1, offset)
+                except (BlockingIOError, PermissionError):
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+            finally:
+                lock.release()
+        finally:
+            with self._mutex:
+                lock, users = self._locks[key]
+                if users == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
+
+    def _file(self) -> int:
+        """File descriptor of :attr:`path`, opened once per process."""
+        fd, pid = self._fd
+        if fd is None or pid != os.getpid():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd = (fd, os.getpid())
+        return fd
+
+
+#: Store used by :func:`get`, replaced by :func:`configure`
+_store = SQLiteStore()
+
+#: Session shared by every thread, with the ID of the process that created it
+_session = (None, None)
+_session_lock = threading.Lock()
+
+
+def configure(store):
+    """Use `store` for caching responses.
+
+    Stores implement ``get(key, expires, record)``, returning an
+    :class:`Entry`, ``set(key, body, etag, modified)``,
+    ``revalidated(key)``, ``delete(key)``, ``stats()`` and a ``lock``
+    such as :class:`KeyLock`, e.g. :class:`SQLiteStore`.
+    """
+    global _store
+    _store = store
+
+
+def stats() -> dict:
+    return _store.stats()
+
+
+def get(url: str, params: dict=None, expires: int=DEFAULT_EXPIRES,
+        stale: int=0, limiter=None, **kwargs) -> bytes:
+    """Wrapper around requests.get
+
+    Stale entries are revalidated with ``If-None-Match`` and
+    ``If-Modified-Since`` when the original response had an ``ETag`` or
+    ``Last-Modified`` header. GitHub does not count a ``304 Not Modified``
+    against the API rate limit.
+
+    Only successful responses are cached. The body of any other response
+    is returned when there is no cached entry, otherwise the stale entry
+    is returned in its place.
+
+    Only one thread or process fetches a URL at a time. Others wait and
+    then read the response it cached.
+
+    :param stale: Seconds after `expires` during which the stale response is
+                  returned immediately while it is revalidated in the
+                  background.
+    :param limiter: :class:`~growser.ratelimit.RateLimiter` to wait on before
+                    each request and update from each response.
+    """
+    kwargs['limiter'] = limiter
+    key = cache_key(url, params)
+    entry = _store.get(key, expires)
+    if entry:
+        age = time.time() - entry.created_at
+        if expires > age:
+            return entry.body
+        if expires + stale > age:
+            threading.Thread(target=_fetch, daemon=True, args=(
+                key, url, params, expires, False, kwargs)).start()
+            return entry.body
+
+    return _fetch(key, url, params, expires, True, kwargs)
+
+
+def _fetch(key: str, url: str, params: dict, expires: int, blocking: bool,
+           kwargs: dict) -> bytes:
+    """Fetch & cache `url` unless it is already being fetched.
+
+    :param blocking: Wait for a fetch in progress rather than returning
+                     `None`.
+    """
+    # Wait for the rate limit before taking the lock, so that other threads
+    # & processes fetching the same URL are not held up by the wait
+    kwargs = dict(kwargs)
+    limiter = kwargs.pop('limiter', None)
+    if limiter:
+        limiter.acquire()
+
+    with _store.lock(key, blocking) as acquired:
+        if not acquired:
+            return None
+
+        # Fetched by another thread or process while waiting for the lock
+        entry = _store.get(key, record=False)
+        if entry and expires > time.time() - entry.created_at:
+            return entry.body
+
+        headers = dict(kwargs.get('headers') or {})
+        if entry:
+            headers.update(conditional_headers(entry))
+
+        kwargs = dict(kwargs, headers=headers)
+        kwargs.setdefault('timeout', TIMEOUT)
+        rsp = session().get(url, params=params, **kwargs)
+        if limiter:
+            limiter.update(rsp.headers)
+        if entry and rsp.status_code == 304:
+            _store.revalidated(key)
+            return entry.body
+
+        # Errors, such as a 404 or an exceeded rate limit, are not cached so
+        # that the next request tries again. The stale entry is returned in
+        # place of the error when there is one.
+        if not 200 <= rsp.status_code < 300:
+            return entry.body if entry else rsp.content
+
+        _store.set(key, rsp.content, rsp.headers.get('ETag'),
+                   rsp.headers.get('Last-Modified'))
+
+        return rsp.content
+
+
+def get_many(urls: list, expires: int=DEFAULT_EXPIRES,
+             max_workers: int=MAX_WORKERS, **kwargs) -> list:
+    """Return the content of each URL, fetching misses concurrently.
+
+    Example::
+
+        pages = get_many(['https://github.com/' + n for n in names])
+
+    :param urls: URLs to fetch.
+    :param expires: Seconds before a cached response is stale.
+    :param max_workers: Maximum number of requests in flight.
+    """
+    with ThreadPoolExecutor(max_workers) as pool:
+        return list(pool.map(
+            lambda url: get(url, expires=expires, **kwargs), urls))
+
+
+def session() -> requests.Session:
+    """Session shared by the threads of this process, keeping connections
+    alive between requests to the same host.
+
+    A new session is created after a fork so that Celery workers do not
+    share sockets with their parent.
+    """
+    global _session
+    with _session_lock:
+        rv, pid = _session
+        if rv is None or pid != os.getpid():
+            adapter = HTTPAdapter(pool_connections=10,
+                                  pool_maxsize=MAX_WORKERS, max_retries=RETRY)
+            rv = requests.Session()
+            rv.mount('http://', adapter)
+            rv.mount('https://', adapter)
+            _session = (rv, os.getpid())
+    return rv
+
+
+def conditional_headers(entry: Entry) -> dict:
+    """Headers for revalidating `entry` with the server."""
+    rv = {}
+    if entry.etag:
+        rv['If-None-Match'] = entry.etag
+    if entry.modified:
+        rv['If-Modified-Since'] = entry.modified
+    return rv
+
+
+def cache_key(url: str, params: dict=None) -> str:
+    """Return a key unique to the URL & query string parameters."""
     if params:
         params_hash = repr(sorted(params.items())).encode('UTF-8')
-        filename += "." + hashlib.sha1(params_hash).hexdigest()
-    return os.path.join("data", "httpcache", domain, filename + ".gz")
+        url += "#" + hashlib.sha1(params_hash).hexdigest()
+    return url
@@ -1,8 +1,9 @@
 import datetime
 import hashlib
 
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
-from sqlalchemy import (Column, Date, DateTime, Float, Integer,
+from sqlalchemy import (Column, Date, DateTime, Float, Index, Integer,
                         SmallInteger, String, Text, or_)
 from growser.app import db
 
@@ -40,6 +41,23 @@ class Repository(db.Model):
                 self.repo_id, self.name, self.language)
 
 
+class Owner(db.Model):
+    """Totals for the active repositories of each user or organization,
+    maintained by the events ETL & GitHub API updates
+    (``update_owners.sql``)."""
+    owner = Column(String(256), primary_key=True)
+    num_repos = Column(Integer, nullable=False)
+    num_events = Column(Integer, nullable=False)
+    num_stars = Column(Integer, nullable=False)
+    num_forks = Column(Integer, nullable=False)
+    languages = Column(ARRAY(String(32)), nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_owner_num_events', 'num_events', 'owner'),
+    )
+
+
 class Login(db.Model):
     login_id = Column(Integer, primary_key=True)
     login = Column(String(64), nullable=False)
@@ -81,6 +99,16 @@ class Rating(db.Model):
     created_at = Column(DateTime, nullable=False)
 
 
+class RepositoryDailyEvents(db.Model):
+    """Number of new ratings per repository per day, maintained by the events
+    ETL (``process_events_batch.sql``)."""
+    repo_id = Column(Integer, primary_key=True)
+    date = Column(Date, primary_key=True)
+    num_events = Column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_repository_daily_events_date', 'date'),)
+
+
 class RecommendationModel(db.Model):
     model_id = Column(Integer, primary_key=True)
     name = Column(String(64), nullable=False)
@@ -120,6 +148,10 @@ class Recommendation(db.Model):
         return query.all()
 
 
+#: Languages included in :meth:`Language.top` regardless of rank
+FEATURED_LANGUAGES = ['Julia', 'Rust', 'Kotlin', 'Erlang', 'Hack']
+
+
 class Language(db.Model):
     language_id = Column(Integer, nullable=False, primary_key=True)
     name = Column(String(64), nullable=False)
@@ -130,7 +162,7 @@ class Language(db.Model):
     def top(limit=25):
         predicate = or_(
             Language.rank <= limit,
-            Language.name.in_(['Julia', 'Rust', 'Kotlin', 'Erlang', 'Hack']))
+            Language.name.in_(FEATURED_LANGUAGES))
         return Language.query.filter(predicate).order_by(Language.name).all()
 
 
@@ -139,7 +171,7 @@ class Ranking(db.Model):
     period = Column(Integer, nullable=False, primary_key=True)
     repo_id = Column(Integer, primary_key=True)
     start_date = Column(Date)
-    end_date = Column(Date)
+    end_date = Column(Date, primary_key=True)
     rank = Column(Integer, nullable=False)
     num_events = Column(Integer, nullable=False)
 
@@ -152,6 +184,38 @@ class Ranking(db.Model):
     )
 
 
+class RankingTrend(db.Model):
+    """Movement of a :class:`Ranking` since the prior day's ranking.
+
+    ``rank_delta`` is positive when a repository moves up, ``velocity`` is
+    the change in the number of events within the window and
+    ``acceleration`` the change in velocity. All three are ``NULL`` when
+    the repository was not ranked the day before.
+    """
+    language = Column(String(32), nullable=False, primary_key=True)
+    period = Column(Integer, nullable=False, primary_key=True)
+    repo_id = Column(Integer, primary_key=True)
+    end_date = Column(Date, primary_key=True)
+    rank = Column(Integer, nullable=False)
+    num_events = Column(Integer, nullable=False)
+    rank_delta = Column(Integer)
+    velocity = Column(Integer)
+    acceleration = Column(Integer)
+
+    __table_args__ = (
+        Index('ix_ranking_trend_rank_delta',
+              'language', 'period', 'end_date', 'rank_delta'),
+    )
+
+    repository = relationship(
+        Repository,
+        foreign_keys=Repository.repo_id,
+        primaryjoin='RankingTrend.repo_id == Repository.repo_id',
+        uselist=False,
+        lazy="joined"
+    )
+
+
 class RankingPeriod:
     AllTime = 1
     Monthly = 2
@@ -163,6 +227,26 @@ class RankingPeriod:
     Year = 5
 
 
+class RankingWindow(db.Model):
+    """The dates that :class:`RankingWindowEvents` covers, ``[start_date,
+    end_date)``, for each rolling-window period."""
+    period = Column(Integer, primary_key=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+
+
+class RankingWindowEvents(db.Model):
+    """Number of events per repository within the current rolling window,
+    covering ``[start_date, end_date)`` of :class:`RankingWindow`."""
+    period = Column(Integer, primary_key=True)
+    repo_id = Column(Integer, primary_key=True)
+    num_events = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_ranking_window_events_period', 'period', 'num_events'),
+    )
+
+
 class RepositoryTask(db.Model):
     def __init__(self, repo_id, name):
         self.repo_id = repo_id
@@ -181,6 +265,32 @@ class RepositoryTask(db.Model):
         db.session.commit()
 
 
+class TaskQueue(db.Model):
+    """Repositories to refresh for each task type, by the number of events
+    within :class:`TaskQueueWindow`. Maintained by the events ETL
+    (``process_events_batch.sql``) and the task handlers."""
+    task = Column(String(32), primary_key=True)
+    repo_id = Column(Integer, primary_key=True)
+    num_events = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_task_queue_num_events', 'task', 'num_events'),
+    )
+
+    @staticmethod
+    def refreshed(task, repo_id):
+        TaskQueue.query \
+            .filter(TaskQueue.task == task, TaskQueue.repo_id == repo_id) \
+            .update({TaskQueue.refreshed_at: datetime.datetime.now()})
+        db.session.commit()
+
+
+class TaskQueueWindow(db.Model):
+    """The date from which events are counted by :class:`TaskQueue`."""
+    start_date = Column(Date, primary_key=True)
+
+
 class RepositoryRedirect(db.Model):
     name_previous = Column(String(256), nullable=False, primary_key=True)
     name_updated = Column(String(256), nullable=False, primary_key=True)
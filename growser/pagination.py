@@ -0,0 +1,53 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+import ujson as json
+
+from dateutil import parser
+
+#: Number of rows per page on /browse & /releases
+PER_PAGE = 100
+
+
+def encode_cursor(*values) -> str:
+    """Return an opaque token for the sort key of the last row on a page.
+
+    Example::
+
+        token = encode_cursor(release.created_at, release.release_id)
+        created_at, release_id = decode_cursor(token, datetime, int)
+
+    :param values: Values of the columns the page is ordered by.
+    """
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v
+              for v in values]
+    data = urlsafe_b64encode(json.dumps(values).encode('utf-8'))
+    return data.decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, *types) -> tuple:
+    """Return the values of a token created by :func:`encode_cursor`.
+
+    :param token: Token from the query string.
+    :param types: Expected type of each value.
+    :raises ValueError: The token is malformed.
+    """
+    try:
+        data = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data.decode('utf-8'))
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('Invalid cursor')
+
+    def cast(python_type, value):
+        if python_type is datetime:
+            return parser.parse(value)
+        if python_type is date:
+            return parser.parse(value).date()
+        return python_type(value)
+
+    try:
+        return tuple(cast(t, v) for t, v in zip(types, values))
+    except (OverflowError, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
@@ -7,6 +7,20 @@ class FindProject(Query):
         self.name = name
 
 
+class FindProjects(Query):
+    """Return multiple repositories by name."""
+    def __init__(self, names: list):
+        self.names = names
+
+
+class FindRepositoryPage(Query):
+    """Everything displayed on a repository page in a single round trip."""
+    def __init__(self, name: str, model: int=3, limit: int=100):
+        self.name = name
+        self.model = model
+        self.limit = limit
+
+
 class FindRecommendations(Query):
     """Return recommendations based on a given repository & model."""
     def __init__(self, repo_id: int, model: int, limit: int):
@@ -15,6 +29,14 @@ class FindRecommendations(Query):
         self.limit = limit
 
 
+class FindRecommendationsBatch(Query):
+    """Return the top recommendations for each of several repositories."""
+    def __init__(self, repo_ids: list, model: int, limit: int):
+        self.repo_ids = repo_ids
+        self.model = model
+        self.limit = limit
+
+
 class FindCurrentRankings(Query):
     """Current rankings, across all time dimensions, for a single repository."""
     def __init__(self, repo_id):
@@ -33,3 +55,9 @@ class FindReleases(Query):
         self.repo_id = repo_id
         self.limit = limit
         self.offset = offset
+
+
+class FindRelease(Query):
+    """Return a single release."""
+    def __init__(self, release_id: int):
+        self.release_id = release_id
@@ -0,0 +1,197 @@
+import threading
+import time
+
+#: Seconds in a GitHub rate limit window, assumed until a response includes
+#: an ``X-RateLimit-Reset`` header
+WINDOW = 3600
+
+#: Default number of requests allowed per window
+DEFAULT_LIMIT = 5000
+
+#: Longest single sleep, so that waiting workers notice a new window early
+MAX_SLEEP = 60
+
+#: Atomically take a token from a bucket, mirroring :func:`take`
+TAKE_SCRIPT = """
+local s = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'remaining',
+                     'reset', 'limit')
+local now, burst, reserve = tonumber(ARGV[1]), tonumber(ARGV[3]),
+                            tonumber(ARGV[4])
+local window = tonumber(ARGV[5])
+local limit = tonumber(s[5]) or tonumber(ARGV[2])
+local tokens = tonumber(s[1]) or burst
+local updated_at = tonumber(s[2]) or now
+local remaining = tonumber(s[3]) or limit
+local reset = tonumber(s[4]) or now + window
+if now >= reset then
+    remaining, reset = limit, now + window
+end
+local wait = 0
+local available = remaining - reserve
+if available <= 0 then
+    wait = reset - now
+else
+    local rate = available / (reset - now)
+    tokens = math.min(burst, tokens + (now - updated_at) * rate)
+    updated_at = now
+    if tokens < 1 then
+        wait = (1 - tokens) / rate
+    else
+        tokens, remaining = tokens - 1, remaining - 1
+    end
+end
+redis.call('HMSET', KEYS[1], 'tokens', tokens, 'updated_at', updated_at,
+           'remaining', remaining, 'reset', reset, 'limit', limit)
+redis.call('EXPIREAT', KEYS[1], math.ceil(reset + window))
+return tostring(wait)
+"""
+
+#: Atomically apply rate limit headers to a bucket, mirroring :func:`observe`
+OBSERVE_SCRIPT = """
+local s = redis.call('HMGET', KEYS[1], 'remaining', 'reset')
+local limit, remaining, reset = tonumber(ARGV[1]), tonumber(ARGV[2]),
+                                tonumber(ARGV[3])
+if tonumber(s[2]) ~= reset or remaining < (tonumber(s[1]) or limit) then
+    redis.call('HMSET', KEYS[1], 'limit', limit, 'remaining', remaining,
+               'reset', reset)
+    redis.call('EXPIREAT', KEYS[1], math.ceil(reset + tonumber(ARGV[4])))
+end
+return 1
+"""
+
+
+def take(state: dict, now: float, limit: int, burst: int, reserve: int) \
+        -> float:
+    """Take a token from the bucket `state`, returning the seconds to wait
+    before trying again or 0 if the request can be made now.
+
+    Tokens refill at the rate that spreads the requests remaining in the
+    current window evenly until it resets, up to `burst` tokens. Only
+    `reserve` requests are left for anything else using the same
+    credentials.
+    """
+    limit = state.setdefault('limit', limit)
+    state.setdefault('tokens', burst)
+    state.setdefault('updated_at', now)
+    state.setdefault('remaining', limit)
+    state.setdefault('reset', now + WINDOW)
+    if now >= state['reset']:
+        state['remaining'], state['reset'] = limit, now + WINDOW
+
+    available = state['remaining'] - reserve
+    if available <= 0:
+        return state['reset'] - now
+
+    rate = available / (state['reset'] - now)
+    state['tokens'] = min(burst, state['tokens'] +
+                          (now - state['updated_at']) * rate)
+    state['updated_at'] = now
+    if state['tokens'] < 1:
+        return (1 - state['tokens']) / rate
+
+    state['tokens'] -= 1
+    state['remaining'] -= 1
+    return 0
+
+
+def observe(state: dict, limit: int, remaining: int, reset: int):
+    """Replace the local estimate of `state` with the one from GitHub.
+
+    Responses can arrive out of order, so the estimate is only replaced by a
+    new window or by fewer remaining requests.
+    """
+    if state.get('reset') != reset or \
+            remaining < state.get('remaining', limit):
+        state.update(limit=limit, remaining=remaining, reset=reset)
+
+
+class MemoryBuckets:
+    def __init__(self):
+        """Buckets shared by the threads of a single process."""
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def take(self, name: str, now: float, limit: int, burst: int,
+             reserve: int) -> float:
+        with self._lock:
+            return take(self._state.setdefault(name, {}),
+                        now, limit, burst, reserve)
+
+    def observe(self, name: str, limit: int, remaining: int, reset: int):
+        with self._lock:
+            observe(self._state.setdefault(name, {}), limit, remaining, reset)
+
+
+class RedisBuckets:
+    def __init__(self, client, prefix: str='growser:ratelimit:'):
+        """Buckets shared by every worker using Redis.
+
+        :param client: A :class:`redis.StrictRedis` instance.
+        :param prefix: Prefix for every key.
+        """
+        self.prefix = prefix
+        self._take = client.register_script(TAKE_SCRIPT)
+        self._observe = client.register_script(OBSERVE_SCRIPT)
+
+    def take(self, name: str, now: float, limit: int, burst: int,
+             reserve: int) -> float:
+        return float(self._take(keys=[self.prefix + name],
+                                args=[now, limit, burst, reserve, WINDOW]))
+
+    def observe(self, name: str, limit: int, remaining: int, reset: int):
+        self._observe(keys=[self.prefix + name],
+                      args=[limit, remaining, reset, WINDOW])
+
+
+class RateLimiter:
+    def __init__(self, backend, burst: int=10, reserve: int=0,
+                 limit: int=DEFAULT_LIMIT, sleep=time.sleep):
+        """Pace requests to the GitHub API across threads & workers.
+
+        Each rate limit resource (``core``, ``graphql``, ...) is a token
+        bucket. Requests wait for a token, and the ``X-RateLimit-*``
+        headers of every response correct the shared estimate of what is
+        left. Once the limit is used up, workers sleep until the window
+        resets rather than failing.
+
+        Example::
+
+            limiter = RateLimiter(MemoryBuckets())
+            limiter.acquire('core')
+            rsp = requests.get('https://api.github.com/repos/pydata/pandas')
+            limiter.update(rsp.headers)
+
+        :param backend: :class:`MemoryBuckets` or :class:`RedisBuckets`.
+        :param burst: Requests that can be made at once after a pause.
+        :param reserve: Requests left in each window for other clients.
+        :param limit: Requests per window until GitHub reports the limit.
+        :param sleep: Function used to wait for a token.
+        """
+        self.backend = backend
+        self.burst = burst
+        self.reserve = reserve
+        self.limit = limit
+        self.sleep = sleep
+
+    def acquire(self, resource: str='core') -> float:
+        """Wait until a request can be made, returning the seconds waited."""
+        waited = 0
+        while True:
+            wait = self.backend.take(resource, time.time(), self.limit,
+                                     self.burst, self.reserve)
+            if wait <= 0:
+                return waited
+            wait = min(wait, MAX_SLEEP)
+            self.sleep(wait)
+            waited += wait
+
+    def update(self, headers, resource: str='core'):
+        """Update the bucket of `resource` from the headers of a response."""
+        try:
+            limit = int(headers['X-RateLimit-Limit'])
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset = int(headers['X-RateLimit-Reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        resource = headers.get('X-RateLimit-Resource') or resource
+        self.backend.observe(resource, limit, remaining, reset)
@@ -71,6 +71,15 @@ def _recommendations(model_id, num_interactions, repos, coo, result, name):
     :param result: Function taking two repository IDs and returns a score.
     :param name: Name of CSV file to save recommendation results to.
     """
+    results = score_recommendations(
+        model_id, num_interactions, repos, coo, result)
+    save_csv(name, results)
+
+
+def score_recommendations(model_id, num_interactions, repos, coo, result):
+    """Score every pair of repositories that co-occur at least 5 times,
+    returning the top 100 `[model_id, id1, id2, score]` rows per repository.
+    """
     results = []
     for idx, id1 in enumerate(repos):
         scores = coo[id1][coo[id1] >= 5].index.map(
@@ -80,7 +89,7 @@ def _recommendations(model_id, num_interactions, repos, coo, result, name):
         results += scores[1:101]
         if idx > 0 and idx % 100 == 0:
             log.debug("Finished {}".format(idx))
-    save_csv(name, results)
+    return results
 
 
 def save_csv(filename, results):
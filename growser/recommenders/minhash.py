@@ -0,0 +1,203 @@
+from collections import defaultdict
+import time
+
+import numpy as np
+import pandas as pd
+
+from growser.app import log
+from growser.recommenders.cooccurrence import (
+    fetch_ratings,
+    save_csv,
+    score_jaccard,
+    score_recommendations
+)
+
+#: Mersenne prime used by the universal hash family ``(a * x + b) % p``.
+#: Kept below 2^31 so that ``a * x`` never overflows an int64.
+PRIME = (1 << 31) - 1
+
+#: Number of hash functions (permutations) per signature.
+NUM_PERM = 128
+
+#: Minimum number of logins two repositories must share to be recommended.
+#: Matches the ``coo[id1] >= 5`` filter used by the exact models.
+MIN_COOCCURRENCE = 5
+
+#: Number of recommendations to keep per repository.
+TOP_N = 100
+
+
+def run_recommendations(ratings: str, output: str, num_repos: int,
+                        recall: float=0.95, threshold: float=0.1,
+                        num_perm: int=NUM_PERM):
+    """Approximate Jaccard recommendations (model 7) using MinHash/LSH.
+
+    :param ratings: Path to the ratings CSV.
+    :param output: Name of the CSV file to save results to.
+    :param num_repos: Number of repositories to generate recommendations for.
+    :param recall: Target probability that a pair with a Jaccard similarity
+                   of `threshold` becomes a candidate.
+    :param threshold: Jaccard similarity the recall target applies to.
+    :param num_perm: Number of hash functions per signature.
+    """
+    ratings = fetch_ratings(ratings, num_repos)
+    index = MinHashLSH(ratings, num_perm, recall, threshold)
+    save_csv(output, index.recommendations(7))
+
+
+class MinHashLSH:
+    def __init__(self, ratings: pd.DataFrame, num_perm: int=NUM_PERM,
+                 recall: float=0.95, threshold: float=0.1, seed: int=1):
+        """Generate candidate pairs of repositories from the MinHash
+        signatures of their login sets, then rescore the candidates exactly.
+
+        Example::
+
+            ratings = fetch_ratings('data/ratings/120.csv', 5000)
+            index = MinHashLSH(ratings, recall=0.95, threshold=0.1)
+            results = index.recommendations(7)
+
+        :param ratings: Repository x login matrix from
+                        :func:`~growser.recommenders.cooccurrence.fetch_ratings`.
+        :param num_perm: Number of hash functions per signature.
+        :param recall: Target candidate probability at `threshold`.
+        :param threshold: Jaccard similarity the recall target applies to.
+        :param seed: Seed for generating the hash functions.
+        """
+        self.repos = ratings.index
+        self.matrix = (ratings.values > 0).astype(np.float64)
+        self.sizes = self.matrix.sum(axis=1)
+        self.bands, self.rows = lsh_params(num_perm, threshold, recall)
+
+        log.info("MinHash signatures (bands=%d, rows=%d)",
+                 self.bands, self.rows)
+        self.signatures = minhash_signatures(
+            self.matrix, self.bands * self.rows, seed)
+
+    def candidates(self) -> dict:
+        """Return the set of candidate repository indexes for each repository.
+
+        Two repositories become candidates when every row of at least one
+        band of their signatures is identical.
+        """
+        rv = defaultdict(set)
+        for band in range(self.bands):
+            cols = self.signatures[:, band*self.rows:(band+1)*self.rows]
+            buckets = defaultdict(list)
+            for idx, key in enumerate(map(bytes, cols)):
+                buckets[key].append(idx)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                for idx in members:
+                    rv[idx].update(members)
+        for idx in rv:
+            rv[idx].discard(idx)
+        return rv
+
+    def recommendations(self, model_id: int, limit: int=TOP_N) -> list:
+        """Rescore the candidates with the exact Jaccard coefficient.
+
+        :param model_id: Model ID to prefix each result with.
+        :param limit: Number of recommendations per repository.
+        """
+        results = []
+        for idx, others in self.candidates().items():
+            others = np.fromiter(others, dtype=np.int64, count=len(others))
+            both = self.matrix[others].dot(self.matrix[idx])
+
+            keep = both >= MIN_COOCCURRENCE
+            others, both = others[keep], both[keep]
+
+            scores = both / (self.sizes[idx] + self.sizes[others] - both)
+            top = np.argsort(-scores, kind='mergesort')[:limit]
+
+            id1 = self.repos[idx]
+            for pos in top:
+                results.append([model_id, id1, self.repos[others[pos]],
+                                float(scores[pos])])
+        return results
+
+
+def lsh_params(num_perm: int, threshold: float, recall: float) -> tuple:
+    """Return the `(bands, rows)` with the most rows per band such that a
+    pair with a Jaccard similarity of `threshold` has at least a `recall`
+    probability of sharing a bucket: :math:`1 - (1 - s^r)^b`.
+
+    More rows per band means fewer false positive candidates to rescore.
+    """
+    if not 0 < threshold <= 1 or not 0 < recall < 1:
+        raise ValueError('threshold and recall must be between 0 and 1')
+
+    rv = (num_perm, 1)
+    for rows in range(2, num_perm + 1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands < recall:
+            break
+        rv = (bands, rows)
+    return rv
+
+
+def minhash_signatures(matrix: np.ndarray, num_perm: int,
+                       seed: int=1) -> np.ndarray:
+    """Return a `(repos, num_perm)` matrix of MinHash values.
+
+    :param matrix: Binary repository x login matrix.
+    :param num_perm: Number of hash functions.
+    :param seed: Seed for generating the hash functions.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, PRIME, num_perm).astype(np.int64)
+    b = rng.randint(0, PRIME, num_perm).astype(np.int64)
+
+    rv = np.full((matrix.shape[0], num_perm), PRIME, dtype=np.int64)
+    for idx, row in enumerate(matrix):
+        logins = np.flatnonzero(row).astype(np.int64)
+        if not len(logins):
+            continue
+        hashes = (np.outer(a, logins) + b[:, None]) % PRIME
+        rv[idx] = hashes.min(axis=1)
+    return rv
+
+
+def recall_at_k(exact: list, approx: list, k: int=TOP_N) -> float:
+    """Mean fraction of each repository's exact top-`k` recommendations that
+    also appear in the approximate top-`k`."""
+    def top_k(results):
+        rv = defaultdict(list)
+        for _, id1, id2, _ in results:
+            if len(rv[id1]) < k:
+                rv[id1].append(id2)
+        return rv
+
+    exact, approx = top_k(exact), top_k(approx)
+    recalls = [len(set(recs) & set(approx.get(repo_id, []))) / len(recs)
+               for repo_id, recs in exact.items() if len(recs)]
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+def benchmark(ratings: pd.DataFrame, recall: float=0.95,
+              threshold: float=0.1, num_perm: int=NUM_PERM) -> dict:
+    """Compare MinHash/LSH against the exact Jaccard model (model 6).
+
+    :param ratings: Repository x login matrix.
+    """
+    start = time.time()
+    coo = ratings.dot(ratings.T)
+    exact = score_recommendations(
+        6, ratings.shape[1], ratings.index, coo, score_jaccard)
+    exact_time = time.time() - start
+
+    start = time.time()
+    index = MinHashLSH(ratings, num_perm, recall, threshold)
+    approx = index.recommendations(6)
+    approx_time = time.time() - start
+
+    return {
+        'bands': index.bands,
+        'rows': index.rows,
+        'recall@{}'.format(TOP_N): recall_at_k(exact, approx),
+        'exact_seconds': exact_time,
+        'minhash_seconds': approx_time,
+        'speedup': exact_time / approx_time if approx_time else float('inf')
+    }
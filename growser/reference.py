@@ -0,0 +1,88 @@
+import threading
+import time
+from types import MappingProxyType
+
+from growser.app import cache, db
+from growser.emojis import EmojiFilter, load_emojis
+from growser.models import FEATURED_LANGUAGES, Language
+
+#: Seconds between checks of the ``reference`` version
+CHECK_INTERVAL = 60
+
+
+class ReferenceData:
+    def __init__(self, loaders: dict, version, interval: int=CHECK_INTERVAL):
+        """Small, rarely changing lookups loaded once per process.
+
+        Everything is reloaded on first use and whenever `version` changes,
+        which is checked at most every `interval` seconds. Dictionaries are
+        exposed as read-only mappings so that they can be shared between
+        requests & threads.
+
+        Example::
+
+            reference = ReferenceData({'languages': load_languages},
+                                      lambda: cache.version('reference'))
+            reference.get('languages')['Python']
+
+        :param loaders: Mapping of name to callable returning the data.
+        :param version: Callable returning the current version of the data.
+        :param interval: Seconds between checks of `version`.
+        """
+        self.loaders = loaders
+        self.version = version
+        self.interval = interval
+        self._data = None
+        self._version = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        """Return the data loaded by the loader registered as `name`."""
+        self._refresh()
+        return self._data[name]
+
+    def load(self):
+        """Load every dataset, replacing the current data at once."""
+        version = self.version()
+        data = {}
+        for name, loader in self.loaders.items():
+            value = loader()
+            data[name] = MappingProxyType(value) \
+                if isinstance(value, dict) else value
+        self._data, self._version = data, version
+        self._checked_at = time.time()
+
+    def _refresh(self):
+        if self._data is not None and \
+                time.time() - self._checked_at < self.interval:
+            return
+        # Keep serving the current data while another thread reloads it
+        if not self._lock.acquire(blocking=self._data is None):
+            return
+        try:
+            if self._data is None or self.version() != self._version:
+                self.load()
+            self._checked_at = time.time()
+        finally:
+            self._lock.release()
+
+
+def load_languages() -> dict:
+    """Rank of every language, by name."""
+    return dict(db.session.query(Language.name, Language.rank))
+
+
+def top_languages(limit: int=25) -> tuple:
+    """Names of the languages returned by :meth:`Language.top`, without
+    querying the database."""
+    return tuple(sorted(
+        name for name, rank in reference.get('languages').items()
+        if rank <= limit or name in FEATURED_LANGUAGES))
+
+
+#: Languages & emojis shared by every request in this process
+reference = ReferenceData({
+    'emoji_filter': lambda: EmojiFilter(load_emojis()),
+    'languages': load_languages
+}, lambda: cache.version('reference'))
@@ -0,0 +1,218 @@
+from glob import glob
+import os
+from os.path import basename, dirname, join
+import re
+import shutil
+import time
+
+import numpy as np
+
+from growser.app import app, cache, db, log
+from growser.models import Repository
+from growser.reference import ReferenceData
+
+#: Bytes of each term that are indexed. Longer terms are truncated.
+TERM_LENGTH = 24
+
+#: Words of each description that are indexed.
+MAX_DESCRIPTION_TERMS = 10
+
+#: Prefixes matching more terms than this have their top repositories
+#: computed when the index is built, rather than for each request.
+SCAN_LIMIT = 10000
+
+#: Number of repositories kept for each of those prefixes.
+HOT_SIZE = 100
+
+#: Words in a description, e.g. "node.js" or "c++"
+WORD_PATTERN = re.compile(r"\w[\w.+#-]{2,}")
+
+#: Arrays written by :meth:`SearchIndex.save`, one ``.npy`` file each
+ARRAYS = ('repo_ids', 'scores', 'terms', 'postings', 'name_data',
+          'name_offsets', 'hot_keys', 'hot_values')
+
+
+class SearchIndex:
+    def __init__(self, rows):
+        """Prefix index over repository names, owners & descriptions.
+
+        Terms are kept in a sorted, fixed-width byte array alongside the
+        repository each term belongs to. A prefix matches a contiguous range
+        of the array that is found with two binary searches, and the range is
+        ranked by the score of each repository.
+
+        Example::
+
+            index = SearchIndex([(1, 'pydata/pandas', 'Flexible...', 5000)])
+            index.suggest('pan')
+
+        :param rows: Iterable of `(repo_id, name, description, score)`.
+        """
+        repo_ids, names, scores = [], [], []
+        terms, postings = [], []
+        for idx, (repo_id, name, description, score) in enumerate(rows):
+            repo_ids.append(repo_id)
+            names.append(name)
+            scores.append(score)
+            for term in repository_terms(name, description):
+                terms.append(term)
+                postings.append(idx)
+
+        self.repo_ids = np.array(repo_ids, dtype=np.int64)
+        self.scores = np.array(scores, dtype=np.int64)
+
+        # Names are concatenated so that they can be memory-mapped as well
+        names = [name.encode('utf-8') for name in names]
+        self.name_data = np.frombuffer(b''.join(names), dtype=np.uint8)
+        self.name_offsets = np.cumsum([0] + [len(n) for n in names],
+                                      dtype=np.int64)
+
+        terms = np.array(terms, dtype='S{}'.format(TERM_LENGTH))
+        order = np.argsort(terms, kind='mergesort')
+        self.terms = terms[order]
+        self.postings = np.array(postings, dtype=np.int32)[order]
+        self.hot = self._hot_prefixes()
+
+    @classmethod
+    def load(cls, path: str) -> 'SearchIndex':
+        """Memory-map the index saved at `path` by :meth:`save`.
+
+        Pages of the arrays are shared by every process on the host and are
+        only read from disk as they are used, so loading does not depend on
+        the size of the index.
+        """
+        path = os.path.realpath(path)
+        rv = cls.__new__(cls)
+        for name in ARRAYS:
+            setattr(rv, name, np.load(join(path, name + '.npy'),
+                                      mmap_mode='r'))
+        rv.hot = {bytes(key): values[values >= 0] for key, values
+                  in zip(rv.hot_keys, rv.hot_values)}
+        return rv
+
+    def save(self, path: str):
+        """Save the index to be loaded with :meth:`load`.
+
+        The arrays are written to a new directory and `path` is then
+        switched to it with a symlink, so that processes never load an index
+        that is only partly written. Processes that still map an older
+        index keep reading it after its directory has been removed.
+        """
+        version = '{}.{}'.format(basename(path), int(time.time() * 1000))
+        target = join(dirname(path), version)
+        os.makedirs(target)
+
+        keys = sorted(self.hot)
+        self.hot_keys = np.array(keys, dtype='S{}'.format(TERM_LENGTH))
+        self.hot_values = np.full((len(keys), HOT_SIZE), -1, dtype=np.int32)
+        for idx, key in enumerate(keys):
+            self.hot_values[idx, :len(self.hot[key])] = self.hot[key]
+        for name in ARRAYS:
+            np.save(join(target, name + '.npy'), getattr(self, name))
+
+        link = path + '.tmp'
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(version, link)
+        os.replace(link, path)
+
+        for old in glob(path + '.*'):
+            if old != target and os.path.isdir(old):
+                shutil.rmtree(old)
+
+    def suggest(self, query: str, limit: int=10) -> list:
+        """Return `(repo_id, name)` of the highest scoring repositories with
+        a term starting with the longest word in `query`."""
+        words = query.lower().split()
+        if not words:
+            return []
+        prefix = max(words, key=len).encode('utf-8')[:TERM_LENGTH - 1]
+
+        if prefix in self.hot:
+            candidates = self.hot[prefix]
+        else:
+            lo = np.searchsorted(self.terms, prefix, 'left')
+            hi = np.searchsorted(self.terms, prefix + b'\xff', 'left')
+            candidates = self._top(lo, hi, limit * 4)
+
+        # Repositories can match more than one term
+        rv, seen = [], set()
+        for idx in candidates:
+            if idx in seen:
+                continue
+            seen.add(idx)
+            rv.append((int(self.repo_ids[idx]), self.name(idx)))
+            if len(rv) == limit:
+                break
+        return rv
+
+    def name(self, idx: int) -> str:
+        """Name of the repository at `idx`."""
+        start, end = self.name_offsets[idx], self.name_offsets[idx + 1]
+        return self.name_data[start:end].tobytes().decode('utf-8')
+
+    def _top(self, lo: int, hi: int, limit: int) -> np.ndarray:
+        """Repository indexes of the terms in `[lo, hi)` by highest score."""
+        candidates = self.postings[lo:hi]
+        scores = self.scores[candidates]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        return candidates[np.argsort(-scores, kind='mergesort')]
+
+    def _hot_prefixes(self) -> dict:
+        """Rank every prefix that matches more than :data:`SCAN_LIMIT`
+        terms."""
+        rv = {}
+        for length in range(1, TERM_LENGTH):
+            prefixes = self.terms.astype('S{}'.format(length))
+            keys, starts, counts = np.unique(
+                prefixes, return_index=True, return_counts=True)
+            hot = np.flatnonzero(counts > SCAN_LIMIT)
+            if not len(hot):
+                break
+            for pos in hot:
+                # Shorter terms are grouped under their full length
+                key = bytes(keys[pos])
+                if len(key) == length:
+                    rv[key] = self._top(
+                        starts[pos], starts[pos] + counts[pos], HOT_SIZE)
+        return rv
+
+
+def repository_terms(name: str, description: str) -> set:
+    """Terms a repository can be found by: its full name, owner, short name
+    and the first words of its description."""
+    name = name.lower()
+    terms = {name} | set(name.split('/'))
+    words = WORD_PATTERN.findall((description or '').lower())
+    terms.update(words[:MAX_DESCRIPTION_TERMS])
+    return {term.encode('utf-8')[:TERM_LENGTH] for term in terms if term}
+
+
+def index_rows():
+    """Every active repository with enough events, as the rows of a
+    :class:`SearchIndex`."""
+    query = db.session.query(Repository.repo_id, Repository.name,
+                             Repository.description,
+                             Repository.num_events + Repository.num_stars) \
+        .filter(Repository.status == 1) \
+        .filter(Repository.num_events >= app.config.get('SEARCH_MIN_EVENTS'))
+    return query.yield_per(10000)
+
+
+def load_index() -> SearchIndex:
+    """Map the index saved by
+    :class:`~growser.commands.search.BuildSearchIndex`, which is empty until
+    the first one is built."""
+    path = app.config.get('SEARCH_INDEX_PATH')
+    if not os.path.exists(path):
+        log.warning('Search index %s has not been built', path)
+        return SearchIndex([])
+    return SearchIndex.load(path)
+
+
+#: Mapped once per process and again when a new index is built, which bumps
+#: the ``search`` version
+search = ReferenceData({'index': load_index},
+                       lambda: cache.version('search'))
@@ -4,6 +4,11 @@ import ujson as json
 
 from celery import Celery
 from flask_sqlalchemy import BaseQuery
+from redis import StrictRedis
+
+from growser.cache import LRUCache, RedisCache, ResponseCache
+from growser import httpcache as http
+from growser.ratelimit import MemoryBuckets, RateLimiter, RedisBuckets
 
 from growser.db import SQLAlchemyAutoCommit, to_dict_model, to_dict_query
 from growser.cmdr import Registry, LocalCommandBus
@@ -29,6 +34,33 @@ def __google_service(app, klass):
     return klass(project_id, account, private_key)
 
 
+def cache(app):
+    url = app.config.get('CACHE_REDIS_URL')
+    if url:
+        backend = RedisCache(StrictRedis.from_url(url))
+    else:
+        backend = LRUCache(app.config.get('CACHE_LRU_SIZE'))
+    return ResponseCache(backend, app.config.get('CACHE_TIMEOUT'))
+
+
+def httpcache(app):
+    store = http.SQLiteStore(app.config.get('HTTPCACHE_PATH'),
+                             app.config.get('HTTPCACHE_MAX_BYTES'),
+                             app.config.get('HTTPCACHE_MAX_AGE'))
+    http.configure(store)
+    return store
+
+
+def ratelimit(app):
+    url = app.config.get('RATELIMIT_REDIS_URL')
+    if url:
+        backend = RedisBuckets(StrictRedis.from_url(url))
+    else:
+        backend = MemoryBuckets()
+    return RateLimiter(backend, app.config.get('RATELIMIT_BURST'),
+                       app.config.get('RATELIMIT_RESERVE'))
+
+
 def celery(app):
     rv = Celery('tasks')
     rv.conf.update(app.config)
@@ -49,6 +81,13 @@ def commands(app):
     return LocalCommandBus(handlers)
 
 
+def queries(app):
+    handlers = Registry()
+    for module in app.config.get('CMDR_QUERIES'):
+        handlers.scan(importlib.import_module(module))
+    return LocalCommandBus(handlers)
+
+
 def sqlalchemy(app):
     db = SQLAlchemyAutoCommit(app)
     db.Model.to_dict = to_dict_model
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from os.path import join
+
+from sqlalchemy import or_, text
+
+from growser.app import db, log
+from growser.models import Repository, TaskQueue, TaskQueueWindow
+
+#: Days of events counted by the queue
+WINDOW = 90
+
+#: Queue of GitHub API updates, see :class:`BatchUpdateFromGitHubAPI`
+GITHUB_API = 'github.api.repos'
+
+#: Queue of screenshots, see :class:`BatchUpdateRepositoryScreenshots`
+SCREENSHOT = 'screenshot'
+
+#: Directory containing the queue SQL, which also lists the task types
+SQL_PATH = 'deploy/etl/sql'
+
+
+def next_repositories(task: str, limit: int, task_days: int,
+                      min_events: int) -> list:
+    """Return `(repo_id, name, num_events)` of the active repositories with
+    the most recent events that have not been refreshed within `task_days`.
+
+    Reads the top of the ``ix_task_queue_num_events`` index rather than
+    counting ratings.
+    """
+    cutoff = date.today() - timedelta(days=task_days)
+    query = db.session.query(Repository.repo_id, Repository.name,
+                             TaskQueue.num_events) \
+        .join(Repository, Repository.repo_id == TaskQueue.repo_id) \
+        .filter(TaskQueue.task == task) \
+        .filter(Repository.status == 1) \
+        .filter(TaskQueue.num_events >= min_events) \
+        .filter(or_(TaskQueue.refreshed_at.is_(None),
+                    TaskQueue.refreshed_at < cutoff)) \
+        .order_by(TaskQueue.num_events.desc())
+
+    return query.limit(limit).all()
+
+
+def advance_window(today: date=None):
+    """Move the start of the queue window to :data:`WINDOW` days before
+    `today`.
+
+    Only the days leaving the window are subtracted, as with the ranking
+    windows. The queue is rebuilt from the daily rollups & task history
+    when it does not exist yet or is more than a window behind.
+    """
+    start_date = (today or date.today()) - timedelta(days=WINDOW)
+    window = TaskQueueWindow.query.first()
+    if window and window.start_date >= start_date:
+        return
+
+    params = {'start_date': start_date}
+    if window and start_date < window.start_date + timedelta(days=WINDOW):
+        filename = 'advance_task_queue.sql'
+        params['prev_start_date'] = window.start_date
+    else:
+        filename = 'rebuild_task_queue.sql'
+
+    log.info("Moving task queue window to %s", start_date)
+    query = open(join(SQL_PATH, filename)).read()
+    db.engine.execute(text(query), **params)
@@ -1,4 +1,5 @@
 from growser.app import app, celery, log
+from growser.executor import SlidingWindow
 from growser.services import commands
 
 
@@ -7,3 +8,16 @@ def run_command(command):
     log.info("Executing command: {}".format(command))
     bus = commands(app)
     return bus.execute(command)
+
+
+def execute_many(commands, timeout: float=None, window: int=None):
+    """Execute `commands` with Celery, yielding `(command, result)` as each
+    completes.
+
+    :param commands: Iterable of commands.
+    :param timeout: Seconds after which a task is revoked and skipped.
+    :param window: Tasks kept in flight, defaulting to ``TASK_WINDOW``.
+    """
+    window = SlidingWindow(run_command.delay,
+                           window or app.config.get('TASK_WINDOW'), timeout)
+    return window.map(commands)
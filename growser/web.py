@@ -1,11 +1,18 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 import locale
-import re
 
-from flask import render_template, request
+from flask import abort, render_template, request
+from sqlalchemy import tuple_
 
-from growser.app import app
-from growser.models import Language, Ranking, RankingPeriod, Release, Repository
+from growser.api import api, bus
+from growser.app import app, cache
+from growser.pagination import PER_PAGE, decode_cursor, encode_cursor
+from growser.queries import FindRepositoryPage
+from growser.reference import reference, top_languages
+from growser.models import (Owner, Ranking, RankingTrend, Release,
+                            Repository)
+
+app.register_blueprint(api)
 
 
 @app.route("/")
@@ -15,38 +22,18 @@ def index():
 
 
 @app.route("/r/<path:name>")
+@cache.page('rankings', 'recommendations', 'releases')
 def repository(name: str):
     """Recommendations and other trends for a repository."""
-    repo = Repository.query.filter(Repository.name == name).first_or_404()
-
-    ranks = {'all': None, 'language': None}
-    ranks['all'] = Ranking.query \
-        .filter(Ranking.period == RankingPeriod.Recent) \
-        .filter(Ranking.repo_id == repo.repo_id) \
-        .filter(Ranking.language == "All") \
-        .order_by(Ranking.start_date.desc()).first()
-
-    if repo.language:
-        ranks['language'] = Ranking.query \
-            .filter(Ranking.period == RankingPeriod.Recent) \
-            .filter(Ranking.repo_id == repo.repo_id) \
-            .filter(Ranking.language == repo.language) \
-            .order_by(Ranking.start_date.desc()).first()
-
-    releases = Release.query \
-        .filter(Release.repo_id == repo.repo_id) \
-        .order_by(Release.created_at) \
-        .all()
-
-    from growser.models import Recommendation
-
-    recommendations = Recommendation.find_by_repository(3, repo.repo_id, 100)
+    page = bus.execute(FindRepositoryPage(name))
+    if not page:
+        abort(404)
 
     return render("repository.html",
-                  repo=repo,
-                  releases=releases,
-                  recommendations=recommendations,
-                  ranks=ranks)
+                  repo=page.repo,
+                  releases=page.releases,
+                  recommendations=page.recommendations,
+                  ranks=page.ranks)
 
 
 @app.route("/r/<path:name>/rankings")
@@ -73,29 +60,58 @@ def developer(name: str):
 
 @app.route("/o/<name>")
 def organization(name: str):
-    results = Repository.query.filter(Repository.owner == name) \
-        .order_by(Repository.num_unique.desc()).all()
-    return render_template("organization.html", results=results, org=name)
+    owner = Owner.query.get(name)
+    if not owner:
+        abort(404)
+
+    query = Repository.query \
+        .filter(Repository.owner == name) \
+        .filter(Repository.status == 1) \
+        .order_by(Repository.num_events.desc(), Repository.repo_id.desc())
+
+    # Keyset pagination: continue after (num_events, repo_id)
+    after = cursor(int, int)
+    if after:
+        query = query.filter(
+            tuple_(Repository.num_events, Repository.repo_id) < after)
+
+    results = query.limit(PER_PAGE).all()
+    next_page = None
+    if len(results) == PER_PAGE:
+        next_page = encode_cursor(results[-1].num_events,
+                                  results[-1].repo_id)
+
+    return render("organization.html", owner=owner, repos=results,
+                  next_page=next_page)
 
 
 @app.route("/o/")
 def organizations():
-    return render_template("organizations.html")
+    query = Owner.query.order_by(Owner.num_events.desc(), Owner.owner.desc())
+
+    # Keyset pagination: continue after (num_events, owner)
+    after = cursor(int, str)
+    if after:
+        query = query.filter(tuple_(Owner.num_events, Owner.owner) < after)
+
+    results = query.limit(PER_PAGE).all()
+    next_page = None
+    if len(results) == PER_PAGE:
+        next_page = encode_cursor(results[-1].num_events, results[-1].owner)
+
+    return render("organizations.html", owners=results, next_page=next_page)
 
 
 @app.route("/browse/")
 @app.route("/browse/<language>")
+@cache.page('rankings')
 def browse(language: str=None):
-    page = int(request.args.get('pp', 1))
     period = request.args.get('p', None)
     for_date = request.args.get('d', None)
     language = language or "All"
 
     period_id = {None: 4, 'm': 2, 'w': 3, 'a': 1}.get(period)
 
-    per_page = 100
-    offset = 0 if page == 1 else (page-1) * per_page
-
     if not for_date:
         for_date = date.today() - timedelta(days=1)
 
@@ -103,44 +119,87 @@ def browse(language: str=None):
         .filter(Ranking.end_date == for_date) \
         .filter(Ranking.language == language) \
         .filter(Ranking.period == period_id) \
-        .order_by(Ranking.rank)
+        .order_by(Ranking.rank, Ranking.repo_id)
+
+    # Keyset pagination: continue after the (rank, repo_id) of the last row
+    after = cursor(int, int)
+    if after:
+        query = query.filter(tuple_(Ranking.rank, Ranking.repo_id) > after)
+
+    result = query.limit(PER_PAGE).all()
+    next_page = None
+    if len(result) == PER_PAGE:
+        next_page = encode_cursor(result[-1].rank, result[-1].repo_id)
 
-    result = query.limit(per_page).offset(offset).all()
     return render("language.html", rankings=result, language=language,
-                  period=period)
+                  period=period, next_page=next_page)
 
 
 @app.route('/releases')
 @app.route('/releases/<string:language>')
+@cache.page('releases')
 def releases(language: str=None):
-    per_page = 100
-    page = int(request.args.get('p', 1))
-    offset = (page-1) * per_page
-
-    languages = Language.top(15).all()
-    results = Release.query.order_by(Release.created_at.desc())
+    languages = top_languages(15)
+    results = Release.query \
+        .order_by(Release.created_at.desc(), Release.release_id.desc())
     if language:
         results = results.filter(Release.repository.has(language=language))
 
-    results = results.offset(offset).limit(per_page).all()
+    # Keyset pagination: continue after (created_at, release_id)
+    after = cursor(datetime, int)
+    if after:
+        results = results.filter(
+            tuple_(Release.created_at, Release.release_id) < after)
+
+    results = results.limit(PER_PAGE).all()
+    next_page = None
+    if len(results) == PER_PAGE:
+        next_page = encode_cursor(results[-1].created_at,
+                                  results[-1].release_id)
 
-    return render("releases2.html",
+    return render("releases.html",
                   language=language,
                   languages=languages,
                   releases=results,
-                  page=page)
+                  next_page=next_page)
 
 
 @app.route('/trending')
 @app.route('/trending/<string:language>')
+@cache.page('rankings')
 def trending(language: str=None):
-    return render("trending.html", language=language)
+    """Repositories climbing the rankings the fastest since yesterday."""
+    period = request.args.get('p', None)
+    period_id = {None: 4, 'm': 2, 'w': 3, 'a': 1}.get(period)
+    for_date = date.today() - timedelta(days=1)
+
+    results = RankingTrend.query \
+        .filter(RankingTrend.end_date == for_date) \
+        .filter(RankingTrend.language == (language or "All")) \
+        .filter(RankingTrend.period == period_id) \
+        .filter(RankingTrend.rank_delta > 0) \
+        .order_by(RankingTrend.rank_delta.desc()) \
+        .limit(100).all()
+
+    return render("trending.html", language=language, period=period,
+                  trends=results)
 
 
 def render(template, **kwargs):
     return render_template(template, ctx=kwargs)
 
 
+def cursor(*types) -> tuple:
+    """Decode the ``after`` pagination cursor from the query string."""
+    token = request.args.get('after')
+    if not token:
+        return None
+    try:
+        return decode_cursor(token, *types)
+    except ValueError:
+        abort(400)
+
+
 @app.template_filter()
 def ordinal(num):
     suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(num % 10, 'th')
@@ -156,26 +215,7 @@ def th(num):
 
 @app.template_filter()
 def emojis_to_img(txt):
-    emojis = get_emojis()
-    for emoji in re.findall(":([^:]+):", txt):
-        if emoji not in emojis:
-            continue
-        txt = txt.replace(":{}:".format(emoji), '<img src="/static/{}" class="emoji" width="20" height="20" />'.format(emojis[emoji]))
-    return txt
-
-
-def get_colors():
-    if 'colors' not in app.config:
-        colors = open("data/github/languages.csv").readlines()
-        app.config['colors'] = dict([l.strip().split(",") for l in colors])
-    return app.config['colors']
-
-
-def get_emojis():
-    if 'emojis' not in app.config:
-        emojis = open("data/github/emojis.csv").readlines()
-        app.config['emojis'] = dict([l.strip().split(",") for l in emojis])
-    return app.config['emojis']
+    return reference.get('emoji_filter')(txt)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+from datetime import date
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+from growser import api
+from growser.app import cache
+from growser.cache import LRUCache
+from growser.queries import (
+    FindCurrentRankings,
+    FindProject,
+    FindProjects,
+    FindRecommendations,
+    FindRecommendationsBatch,
+    FindRelease,
+    FindReleases,
+    FindTopLanguages
+)
+from growser.web import app
+
+
+class Row:
+    def __init__(self, **kwargs):
+        self.values = kwargs
+
+    def to_dict(self):
+        return dict(self.values)
+
+
+class APITests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.bus = Mock()
+        self.bus.execute.return_value = []
+        for patcher in [patch.object(api, 'bus', self.bus),
+                        patch.object(cache, 'backend', LRUCache())]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get(self, url, status_code=200):
+        rv = self.client.get('/api' + url)
+        assert rv.status_code == status_code
+        return json.loads(rv.data.decode('utf-8')) if status_code == 200 \
+            else None
+
+    @property
+    def query(self):
+        return self.bus.execute.call_args[0][0]
+
+    def test_repositories(self):
+        self.get('/repos?name=a/b&name=c/d,e/f')
+        assert isinstance(self.query, FindProjects)
+        assert self.query.names == ['a/b', 'c/d', 'e/f']
+
+        self.get('/repos', 400)
+        self.get('/repos?name=' + ','.join(['a/b'] * 101), 400)
+
+    def test_repository(self):
+        self.bus.execute.return_value = Row(repo_id=1, name='a/b')
+        assert self.get('/repos/a/b') == {'repo_id': 1, 'name': 'a/b'}
+        assert isinstance(self.query, FindProject)
+        assert self.query.name == 'a/b'
+
+        self.bus.execute.return_value = None
+        self.get('/repos/c/d', 404)
+
+    def test_rankings(self):
+        self.get('/rankings/1')
+        assert isinstance(self.query, FindCurrentRankings)
+        assert self.query.repo_id == 1
+
+    def test_recommendations(self):
+        self.get('/recommendations/1?model=2&limit=5')
+        assert isinstance(self.query, FindRecommendations)
+        assert (self.query.repo_id, self.query.model, self.query.limit) == \
+            (1, 2, 5)
+
+    def test_recommendations_batch(self):
+        self.bus.execute.return_value = [(1, 3, 0.5), (1, 4, 0.25)]
+        assert self.get('/recommendations?repo_id=1,2') == \
+            {'1': [[3, 0.5], [4, 0.25]], '2': []}
+        assert isinstance(self.query, FindRecommendationsBatch)
+        assert self.query.repo_ids == [1, 2]
+
+        self.get('/recommendations?repo_id=a', 400)
+
+    def test_releases(self):
+        self.get('/releases/1?limit=10&offset=20')
+        assert isinstance(self.query, FindReleases)
+        assert (self.query.repo_id, self.query.limit, self.query.offset) == \
+            (1, 10, 20)
+
+        self.get('/releases/1?offset=-1')
+        assert self.query.offset == 0
+
+    def test_release(self):
+        self.bus.execute.return_value = Mock(body='Notes')
+        with patch.object(api, 'render_release', lambda body, _: body), \
+                patch.object(api, 'reference', Mock()):
+            rv = self.client.get('/api/release/1')
+            assert rv.data == b'Notes'
+            assert isinstance(self.query, FindRelease)
+            assert self.query.release_id == 1
+
+            self.bus.execute.return_value = None
+            assert self.client.get('/api/release/2').status_code == 404
+
+    def test_suggest(self):
+        index = Mock()
+        index.suggest.return_value = [(1, 'pydata/pandas')]
+        with patch.object(api, 'search', Mock(get=lambda name: index)):
+            assert self.get('/suggest?q=pand') == \
+                [{'repo_id': 1, 'name': 'pydata/pandas'}]
+        index.suggest.assert_called_once_with('pand', 10)
+
+    def test_languages(self):
+        self.get('/languages')
+        assert isinstance(self.query, FindTopLanguages)
+        assert self.query.limit == 25
+
+    def test_limit(self):
+        for limit, expected in [(0, 1), (-1, 1), (50, 50), (1000, 100)]:
+            self.get('/languages?limit={}'.format(limit))
+            assert self.query.limit == expected
+
+    def test_fields(self):
+        self.bus.execute.return_value = [
+            Row(repo_id=1, name='a/b', created_at=date(2016, 1, 1))]
+        assert self.get('/repos?name=a/b') == \
+            [{'repo_id': 1, 'name': 'a/b', 'created_at': '2016-01-01'}]
+        assert self.get('/repos?name=a/b&fields=repo_id,created_at') == \
+            [{'repo_id': 1, 'created_at': '2016-01-01'}]
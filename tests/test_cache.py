@@ -0,0 +1,70 @@
+import unittest
+
+from flask import Flask
+
+from growser.cache import LRUCache, ResponseCache
+
+
+class LRUCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_expires(self):
+        cache = LRUCache()
+        cache.set('a', 1, timeout=-1)
+        assert cache.get('a') is None
+
+
+def create_app(cache, calls):
+    app = Flask(__name__)
+
+    @app.route('/page/<name>')
+    @cache.page('rankings')
+    def page(name):
+        calls.append(name)
+        return 'page {}'.format(name)
+
+    return app
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.cache = ResponseCache(LRUCache())
+        self.client = create_app(self.cache, self.calls).test_client()
+
+    def test_cached(self):
+        assert self.client.get('/page/a').data == b'page a'
+        assert self.client.get('/page/a').data == b'page a'
+        assert self.client.get('/page/b?p=2').data == b'page b'
+        assert self.calls == ['a', 'b']
+
+    def test_bump_invalidates(self):
+        self.client.get('/page/a')
+        self.cache.bump('rankings')
+        rv = self.client.get('/page/a')
+        assert self.calls == ['a', 'a']
+        assert rv.headers.get('Last-Modified')
+
+    def test_etag(self):
+        etag = self.client.get('/page/a').headers['ETag'].strip('"')
+        rv = self.client.get('/page/a', headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+
+        self.cache.bump('rankings')
+        rv = self.client.get('/page/a', headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
+    def test_fragment(self):
+        calls = []
+        func = lambda: calls.append(1) or 'fragment'
+        assert self.cache.get_or_set('key', func, 'rankings') == 'fragment'
+        assert self.cache.get_or_set('key', func, 'rankings') == 'fragment'
+        assert len(calls) == 1
@@ -203,3 +203,35 @@ class LocalCommandBusTests(unittest.TestCase):
         bus = LocalCommandBus(manager)
         with self.assertRaises(LookupError):
             bus.execute("test")
+
+    def test_publish(self):
+        published = []
+
+        def listener(event: FakeEvent):
+            published.append(event)
+
+        manager = Registry()
+        manager.scan(FakeCommandHandler)
+        manager.scan(listener)
+        bus = LocalCommandBus(manager)
+
+        event = bus.execute(FakeCommand())
+        assert published == [event]
+
+    def test_publish_executes_commands(self):
+        executed = []
+
+        def listener(event: FakeEvent):
+            yield FakeCommand2()
+
+        def handler(cmd: FakeCommand2):
+            executed.append(cmd)
+
+        manager = Registry()
+        manager.scan(FakeCommandHandler)
+        manager.scan(listener)
+        manager.scan(handler)
+        bus = LocalCommandBus(manager)
+
+        bus.execute(FakeCommand())
+        assert len(executed) == 1
@@ -12,8 +12,10 @@ from growser.db import (
     BulkInsertQuery,
     Column,
     ColumnCollection,
+    copy_from_rows,
     from_sqlalchemy_table,
-    as_columns
+    as_columns,
+    transaction
 )
 
 #: Columns for our take table
@@ -167,6 +169,46 @@ class BulkInsertFromIteratorTests(unittest.TestCase):
         assert len(batches) == batches_expected
 
 
+class CopyFromRowsTests(unittest.TestCase):
+    def test_copy(self):
+        mock_cursor = MagicMock(spec=cursor)
+        rows = get_fake_rows(5) + [[6, None, 'null name']]
+        assert copy_from_rows(mock_cursor, 'test', columns, rows) == 6
+
+        query, buffer = mock_cursor.copy_expert.call_args[0]
+        assert query == 'COPY test (id, name, description) FROM STDIN WITH CSV'
+        lines = buffer.getvalue().splitlines()
+        assert len(lines) == 6
+        assert lines[0] == "1,name '1',description 1"
+        assert lines[-1] == '6,,null name'
+
+
+class TransactionTests(unittest.TestCase):
+    def test_commit(self):
+        engine = MagicMock()
+        conn = engine.raw_connection.return_value
+        conn.connection.autocommit = True
+
+        with transaction(engine) as mock_cursor:
+            mock_cursor.execute('SELECT 1')
+            assert conn.connection.autocommit is False
+
+        conn.commit.assert_called_once_with()
+        conn.close.assert_called_once_with()
+        assert conn.connection.autocommit is True
+
+    def test_rollback(self):
+        engine = MagicMock()
+        conn = engine.raw_connection.return_value
+
+        with self.assertRaises(ValueError):
+            with transaction(engine):
+                raise ValueError()
+
+        conn.rollback.assert_called_once_with()
+        assert not conn.commit.called
+
+
 def test_as_columns_using_tuples():
     cols = [('id', int), ('name', str), ('description', str)]
     assert as_columns(cols) == columns_t
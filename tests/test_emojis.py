@@ -0,0 +1,22 @@
+import unittest
+
+from growser.emojis import EmojiFilter
+
+
+class EmojiFilterTests(unittest.TestCase):
+    def setUp(self):
+        self.emojis = EmojiFilter({'smile': 'smile.png', '+1': 'plus1.png'})
+
+    def test_replace(self):
+        rv = self.emojis(':smile: :+1: :smile:')
+        assert rv.count('<img src="/static/smile.png"') == 2
+        assert rv.count('<img src="/static/plus1.png"') == 1
+        assert ':' not in rv.replace('<img', '')
+
+    def test_unknown(self):
+        assert self.emojis(':unknown: text') == ':unknown: text'
+
+    def test_adjacent(self):
+        rv = self.emojis('at 10:30 :smile::smile:')
+        assert rv.startswith('at 10:30 <img')
+        assert rv.count('<img') == 2
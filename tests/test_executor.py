@@ -0,0 +1,76 @@
+import unittest
+
+from growser.executor import SlidingWindow
+
+
+class FakeResult:
+    def __init__(self, item, clock):
+        self.item = item
+        self.clock = clock
+        self.started_at = clock.now
+        self.revoked = False
+
+    def ready(self):
+        return self.clock.now - self.started_at >= self.item
+
+    def get(self):
+        if self.item < 0:
+            raise ValueError(self.item)
+        return self.item * 10
+
+
+class FakeClock:
+    """Items are task durations in ticks of `sleep`."""
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += 1
+
+
+class SlidingWindowTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.submitted = []
+
+    def window(self, size, timeout=None):
+        def submit(item):
+            self.submitted.append((item, self.clock.now))
+            return FakeResult(item, self.clock)
+        return SlidingWindow(submit, size, timeout, cancel=self.cancel,
+                             clock=self.clock, sleep=self.clock.sleep)
+
+    def cancel(self, result):
+        result.revoked = True
+
+    def test_completion_order(self):
+        window = self.window(2)
+        rv = list(window.map([5, 1, 1, 1]))
+        assert rv == [(1, 10), (1, 10), (1, 10), (5, 50)]
+
+    def test_window_size(self):
+        window = self.window(2)
+        list(window.map([3, 3, 3]))
+        assert [at for _, at in self.submitted] == [0, 0, 3]
+
+    def test_straggler_does_not_block(self):
+        window = self.window(2)
+        list(window.map([20, 1, 1, 1, 1]))
+        # Short tasks complete while the straggler is still running
+        assert max(at for item, at in self.submitted[1:]) < 10
+
+    def test_timeout(self):
+        window = self.window(2, timeout=5)
+        rv = list(window.map([100, 1]))
+        assert rv == [(1, 10)]
+        assert window.timed_out == [100]
+        assert self.clock.now < 10
+
+    def test_failed(self):
+        window = self.window(2)
+        rv = list(window.map([-1, 1]))
+        assert rv == [(1, 10)]
+        assert window.failed == [-1]
@@ -0,0 +1,152 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from growser import httpcache
+from growser.handlers.github import (
+    GitHubAPIWrapper,
+    GraphQLError,
+    RepositoryNotFound,
+    RepositoryUpdated,
+    REPOS_TMP_COLUMNS,
+    clean_homepage,
+    fetch_repositories,
+    merge_row,
+    repositories_query
+)
+
+#: Repositories known to the stub server, by owner & name
+REPOSITORIES = {
+    ('pydata', 'pandas'): {
+        'description': 'Flexible and powerful data analysis',
+        'homepageUrl': 'pandas.pydata.org',
+        'isDisabled': False,
+        'primaryLanguage': {'name': 'Python'},
+        'stargazerCount': 5000,
+        'forkCount': 2000,
+        'watchersCount': 500
+    },
+    ('php', 'disabled'): {
+        'description': None,
+        'homepageUrl': None,
+        'isDisabled': True,
+        'primaryLanguage': None,
+        'stargazerCount': 1,
+        'forkCount': 0,
+        'watchersCount': 0
+    }
+}
+
+
+class GraphQLStub(BaseHTTPRequestHandler):
+    """Answer repository queries the way the GitHub GraphQL API does."""
+    queries = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.queries.append(body)
+
+        variables = body['variables']
+        data, errors = {}, []
+        for idx in range(len(variables) // 2):
+            key = ('o{}'.format(idx), 'n{}'.format(idx))
+            repo = REPOSITORIES.get(tuple(variables[k] for k in key))
+            if repo is None:
+                errors.append({'type': 'NOT_FOUND', 'path': ['r{}'.format(idx)]})
+            elif repo['forkCount'] < 0:
+                errors.append({'type': 'RATE_LIMITED', 'path': []})
+            else:
+                repo = dict(repo, watchers={
+                    'totalCount': repo['watchersCount']})
+            data['r{}'.format(idx)] = repo
+
+        content = json.dumps({'data': data, 'errors': errors}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchRepositoriesTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), GraphQLStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api = GitHubAPIWrapper(('user', 'token'), 0, 'http://{}:{}/'.format(
+            *cls.server.server_address))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        GraphQLStub.queries = []
+
+    def test_fetch(self):
+        names = ['pydata/pandas', 'php/disabled', 'missing/repo']
+        rv = fetch_repositories(self.api, names)
+
+        assert [r.__class__ for r in rv] == \
+            [RepositoryUpdated, RepositoryNotFound, RepositoryNotFound]
+        assert [r.name for r in rv] == names
+        assert rv[0].homepage == 'http://pandas.pydata.org'
+        assert (rv[0].language, rv[0].num_stars, rv[0].num_forks,
+                rv[0].num_watchers) == ('Python', 5000, 2000, 500)
+        assert len(GraphQLStub.queries) == 1
+
+    def test_batches(self):
+        rv = fetch_repositories(self.api, ['pydata/pandas'] * 250)
+        assert len(rv) == 250
+        assert [len(q['variables']) // 2 for q in GraphQLStub.queries] == \
+            [100, 100, 50]
+
+    def test_errors(self):
+        REPOSITORIES[('rate', 'limited')] = {'forkCount': -1}
+        try:
+            with self.assertRaises(GraphQLError):
+                fetch_repositories(self.api, ['rate/limited'])
+        finally:
+            del REPOSITORIES[('rate', 'limited')]
+
+    def test_timeout(self):
+        with patch.object(httpcache, 'session') as session:
+            session.return_value.post.return_value = Mock(
+                content=b'{"data": {}}', headers={})
+            assert self.api.graphql('query { viewer { login } }') == \
+                {'data': {}}
+        assert session.return_value.post.call_args[1]['timeout'] == \
+            httpcache.TIMEOUT
+
+
+class RepositoriesQueryTests(unittest.TestCase):
+    def test_query(self):
+        query, variables = repositories_query(['pydata/pandas', 'a/b'])
+        assert variables == {'o0': 'pydata', 'n0': 'pandas',
+                             'o1': 'a', 'n1': 'b'}
+        assert 'r1: repository(owner: $o1, name: $n1) { ...repo }' in query
+        assert query.startswith('query($o0: String!, $n0: String!, ')
+
+    def test_clean_homepage(self):
+        assert clean_homepage(None) == ''
+        assert clean_homepage('pandas.pydata.org') == \
+            'http://pandas.pydata.org'
+        assert clean_homepage('https://x.org') == 'https://x.org'
+        assert clean_homepage('http://' + 'a' * 250) == ''
+
+
+class MergeRowTests(unittest.TestCase):
+    def test_merge_row(self):
+        updated = RepositoryUpdated('pydata/pandas', '', 'http://pandas.org',
+                                    'Python', 5000, 2000, 500)
+        missing = RepositoryNotFound('missing/repo')
+        for result in (updated, missing):
+            assert len(merge_row(result)) == len(REPOS_TMP_COLUMNS)
+        assert merge_row(updated)[:3] == ('pydata/pandas', True, '')
+        assert merge_row(missing)[:3] == ('missing/repo', False, None)
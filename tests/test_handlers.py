@@ -1,6 +1,17 @@
+from datetime import date, timedelta
+import gzip
+import os
+import tempfile
 import unittest
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
 
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from growser.app import app, db
+from growser.cmdr import Registry
 from growser.commands.media import (
     CreateResizedScreenshot,
     UpdateRepositoryScreenshot,
@@ -16,6 +27,29 @@ from growser.handlers.media import (
     Images,
     OptimizeImageHandler
 )
+from growser.commands.rankings import (
+    BackfillRankings,
+    RankingPeriod,
+    UpdateRankings
+)
+from growser.handlers import rankings
+from growser.handlers.pages import remove_stale_snapshots, write_snapshot
+from growser.handlers.rankings import (
+    WINDOWS,
+    BackfillRankingsHandler,
+    UpdateRankingsHandler,
+    period_windows,
+    rank_columns,
+    rank_windows,
+    update_window
+)
+from growser.models import (Ranking, RankingTrend, RankingWindow,
+                            RankingWindowEvents, Repository,
+                            RepositoryDailyEvents)
+from growser.services import commands
+
+#: Empty Postgres database for the ranking SQL, e.g. postgresql:///growser_test
+TEST_DATABASE_URI = os.environ.get('GROWSER_TEST_DATABASE_URI')
 
 
 class UpdateRepositoryScreenshotTests(unittest.TestCase):
@@ -91,3 +125,236 @@ class OptimizeImageHandlerTests(unittest.TestCase):
         handler = OptimizeImageHandler()
         with self.assertRaises(FileNotFoundError):
             handler.handle(cmd)
+
+
+class RankWindowsTests(unittest.TestCase):
+    def test_rank(self):
+        windows = period_windows(date(2016, 5, 1))
+        counts = pd.DataFrame(
+            [[1, 'Python', 1, 2, 3, 10],
+             [2, 'Python', 0, 2, 5, 10],
+             [3, 'Rust', 4, 4, 4, 4]],
+            columns=['repo_id', 'language'] + [str(p) for p in windows])
+
+        df = rank_windows(counts, windows, ['All', 'Python'], 2)
+        assert set(df['language']) == {'All', 'Python'}
+        assert (df.groupby(['language', 'period']).size() <= 2).all()
+
+        # Repositories without events in the window are not ranked
+        weekly = df[(df['language'] == 'Python') & (df['period'] == 3)]
+        assert weekly['repo_id'].tolist() == [1]
+
+        # Ties share the same rank
+        alltime = df[(df['language'] == 'All') & (df['period'] == 1)]
+        assert alltime['rank'].tolist() == [1, 1]
+
+
+class RankColumnsTests(unittest.TestCase):
+    def test_rank(self):
+        matrix = np.array([[1, 3], [4, 3], [5, 0], [4, 1]])
+        top, ranks, values = rank_columns(matrix, 3)
+
+        assert top[:, 0].tolist()[0] == 2
+        assert values[:, 0].tolist() == [5, 4, 4]
+        assert ranks[:, 0].tolist() == [1, 2, 2]
+        assert sorted(top[:2, 1].tolist()) == [0, 1]
+        assert ranks[:, 1].tolist() == [1, 1, 3]
+
+
+class SnapshotTests(unittest.TestCase):
+    def test_write_and_remove_stale(self):
+        with tempfile.TemporaryDirectory() as path:
+            write_snapshot(os.path.join(path, 'index.html'), b'<html>')
+            write_snapshot(os.path.join(path, 'old.html'), b'<html>')
+            with open(os.path.join(path, 'index.html.gz'), 'rb') as fh:
+                assert gzip.decompress(fh.read()) == b'<html>'
+
+            remove_stale_snapshots(path, {'index.html'})
+            assert sorted(os.listdir(path)) == \
+                ['index.html', 'index.html.br', 'index.html.gz']
+
+
+class CommandRegistryTests(unittest.TestCase):
+    def test_load_handlers(self):
+        """Every module in CMDR_HANDLERS loads without duplicate handlers."""
+        bus = commands(app)
+        assert isinstance(bus.registry, Registry)
+        handler = bus.registry.find(UpdateRankings)
+        assert handler.klass is UpdateRankingsHandler
+
+
+class UpdateWindowTests(unittest.TestCase):
+    end_date = date(2016, 6, 1)
+
+    def update(self, period, prev_end_date):
+        """Return the SQL file & parameters used to move the window."""
+        with patch.object(rankings, 'db') as db, \
+                patch.object(rankings, 'open', create=True) as fh:
+            fh.return_value.read.return_value = ''
+            update_window(period, self.end_date, prev_end_date)
+            if not db.engine.execute.called:
+                return None, None
+            return fh.call_args[0][0], db.engine.execute.call_args[1]
+
+    def test_current(self):
+        assert self.update(RankingPeriod.Week, self.end_date) == (None, None)
+
+    def test_advance(self):
+        days = timedelta(days=WINDOWS[RankingPeriod.Month])
+        prev = self.end_date - timedelta(days=1)
+        filename, params = self.update(RankingPeriod.Month, prev)
+        assert filename.endswith('advance_ranking_window.sql')
+        assert params == {'period': RankingPeriod.Month,
+                          'start_date': self.end_date - days,
+                          'end_date': self.end_date,
+                          'prev_start_date': prev - days,
+                          'prev_end_date': prev}
+
+    def test_rebuild(self):
+        days = timedelta(days=WINDOWS[RankingPeriod.Week])
+        for prev in (None, self.end_date - days, self.end_date + days):
+            filename, params = self.update(RankingPeriod.Week, prev)
+            assert filename.endswith('rebuild_ranking_window.sql')
+            assert params == {'period': RankingPeriod.Week,
+                              'start_date': self.end_date - days,
+                              'end_date': self.end_date}
+
+
+@unittest.skipUnless(TEST_DATABASE_URI, 'GROWSER_TEST_DATABASE_URI not set')
+class UpdateWindowSQLTests(unittest.TestCase):
+    schema = 'test_ranking_window'
+    end_date = date(2016, 6, 1)
+
+    def setUp(self):
+        engine = create_engine(TEST_DATABASE_URI, connect_args={
+            'options': '-csearch_path={}'.format(self.schema)},
+            isolation_level='AUTOCOMMIT')
+        self.addCleanup(engine.dispose)
+        self.addCleanup(engine.execute,
+                        'DROP SCHEMA {} CASCADE'.format(self.schema))
+        engine.execute('CREATE SCHEMA {}'.format(self.schema))
+        tables = [RepositoryDailyEvents, RankingWindow, RankingWindowEvents]
+        db.metadata.create_all(engine, [t.__table__ for t in tables])
+
+        patcher = patch.object(rankings, 'db', Mock(engine=engine))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = engine
+
+        self.events = [(1, self.end_date - timedelta(days=d), d)
+                       for d in range(1, 10)]
+        self.events += [(2, self.end_date - timedelta(days=7), 3)]
+        engine.execute(RepositoryDailyEvents.__table__.insert(), [
+            {'repo_id': r, 'date': d, 'num_events': n}
+            for r, d, n in self.events])
+
+    def window(self, period) -> dict:
+        return dict(self.engine.execute(
+            'SELECT repo_id, num_events FROM ranking_window_events '
+            'WHERE period = %s', period).fetchall())
+
+    def expected(self, end_date) -> dict:
+        start_date = end_date - timedelta(days=WINDOWS[RankingPeriod.Week])
+        rv = {}
+        for repo_id, day, num_events in self.events:
+            if start_date <= day < end_date:
+                rv[repo_id] = rv.get(repo_id, 0) + num_events
+        return rv
+
+    def test_advance(self):
+        prev = self.end_date - timedelta(days=1)
+        update_window(RankingPeriod.Week, prev)
+        assert self.window(RankingPeriod.Week) == self.expected(prev)
+
+        # A second update from the same end date has nothing left to apply
+        for _ in range(2):
+            update_window(RankingPeriod.Week, self.end_date, prev)
+            assert self.window(RankingPeriod.Week) == \
+                self.expected(self.end_date)
+
+        window = RankingWindow.__table__
+        assert self.engine.execute(window.select()).fetchall() == \
+            [(RankingPeriod.Week, date(2016, 5, 25), self.end_date)]
+
+
+@unittest.skipUnless(TEST_DATABASE_URI, 'GROWSER_TEST_DATABASE_URI not set')
+class BackfillRankingsHandlerTests(unittest.TestCase):
+    """Backfill rankings in a schema that is dropped afterwards, as the
+    handler commits its own transactions."""
+    schema = 'test_backfill_rankings'
+
+    def setUp(self):
+        # AUTOCOMMIT, as configured by SQLAlchemyAutoCommit for the app
+        engine = create_engine(TEST_DATABASE_URI, connect_args={
+            'options': '-csearch_path={}'.format(self.schema)},
+            isolation_level='AUTOCOMMIT')
+        self.addCleanup(engine.dispose)
+        self.addCleanup(engine.execute,
+                        'DROP SCHEMA {} CASCADE'.format(self.schema))
+        engine.execute('CREATE SCHEMA {}'.format(self.schema))
+        tables = [Repository, RepositoryDailyEvents, Ranking, RankingTrend]
+        db.metadata.create_all(engine, [t.__table__ for t in tables])
+
+        session = Session(engine)
+        self.addCleanup(session.close)
+        patcher = patch.object(rankings, 'db', Mock(engine=engine,
+                                                    session=session))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = engine
+
+        # 1 has an event every day, 2 a burst last week and 3 a single event
+        events = [(1, date(2016, 1, 1) + timedelta(days=d), 1)
+                  for d in range(130)]
+        events += [(2, date(2016, 4, 30), 5), (3, date(2016, 4, 20), 1)]
+        for repo_id, language in [(1, 'Python'), (2, 'Rust'), (3, 'Python')]:
+            engine.execute(Repository.__table__.insert().values(
+                repo_id=repo_id, name='a/{}'.format(repo_id), owner='a',
+                homepage='', language=language, description='',
+                num_events=0, num_stars=0, num_forks=0, num_watchers=0,
+                created_at=date(2016, 1, 1), updated_at=date(2016, 1, 1)))
+        engine.execute(RepositoryDailyEvents.__table__.insert(), [
+            {'repo_id': r, 'date': d, 'num_events': n} for r, d, n in events])
+
+    def rankings(self, model, language, period, end_date) -> list:
+        return self.engine.execute(
+            'SELECT * FROM {} WHERE language = %s AND period = %s '
+            'AND end_date = %s ORDER BY rank, repo_id'.format(
+                model.__tablename__), language, period, end_date).fetchall()
+
+    def ranks(self, language, period, end_date) -> list:
+        return [(r.repo_id, r.rank, r.num_events) for r in
+                self.rankings(Ranking, language, period, end_date)]
+
+    def test_handle(self):
+        cmd = BackfillRankings(date(2016, 5, 1), date(2016, 5, 2), 10,
+                               ['All', 'Python'])
+        # Blocks of a week, the last of which has no events before the end
+        with patch.object(rankings, 'BACKFILL_BLOCK_DAYS', 7):
+            events = list(BackfillRankingsHandler().handle(cmd))
+        assert len(events) == 2 * 4 * 2
+
+        # Events on the end date itself are not counted
+        end_date = date(2016, 5, 2)
+        assert self.ranks('All', RankingPeriod.Week, end_date) == \
+            [(1, 1, 7), (2, 2, 5)]
+
+        # 3 is ranked with a single event, as in the daily rankings
+        assert self.ranks('All', RankingPeriod.Month, end_date) == \
+            [(1, 1, 30), (2, 2, 5), (3, 3, 1)]
+        assert self.ranks('Python', RankingPeriod.Month, end_date) == \
+            [(1, 1, 30), (3, 2, 1)]
+        assert self.ranks('Python', RankingPeriod.AllTime, end_date) == \
+            [(1, 1, 122), (3, 2, 1)]
+        assert self.ranks('All', RankingPeriod.Recent, end_date) == \
+            [(1, 1, 90), (2, 2, 5), (3, 3, 1)]
+        assert self.ranks('All', RankingPeriod.Week, date(2016, 5, 1)) == \
+            [(1, 1, 7), (2, 2, 5)]
+        assert [r.start_date for r in self.rankings(
+            Ranking, 'All', RankingPeriod.Week, end_date)] == \
+            [date(2016, 4, 25)] * 2
+
+        trends = self.rankings(RankingTrend, 'All', RankingPeriod.Week,
+                               end_date)
+        assert [(t.repo_id, t.rank_delta, t.velocity) for t in trends] == \
+            [(1, 0, 0), (2, 0, 0)]
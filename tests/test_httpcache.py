@@ -0,0 +1,263 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import responses
+
+from growser import httpcache
+from growser.httpcache import KeyLock, SQLiteStore
+from growser.ratelimit import MemoryBuckets, RateLimiter
+
+
+class SQLiteStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_set(self):
+        store = SQLiteStore(self.path)
+        assert store.get('a') is None
+
+        store.set('a', b'content')
+        store.set('a', b'updated')
+        assert store.get('a').body == b'updated'
+
+        stats = store.stats()
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+        assert stats['bytes'] > 0
+
+    def test_expired_counts_as_miss(self):
+        store = SQLiteStore(self.path)
+        store.set('a', b'content')
+        assert store.get('a', expires=0).body == b'content'
+        assert store.stats()['misses'] == 1
+
+    def test_lru_eviction(self):
+        body = os.urandom(1000)
+        store = SQLiteStore(self.path, max_bytes=3500, access_interval=0)
+        for key in 'abc':
+            store.set(key, body)
+            time.sleep(0.01)
+        store.get('a')
+        store.set('d', body)
+
+        assert store.get('b') is None
+        assert store.get('a') is not None
+        assert store.stats()['bytes'] <= 3500
+
+    def test_get_is_read_only(self):
+        store = SQLiteStore(self.path)
+        store.set('a', b'content')
+        other = SQLiteStore(self.path)
+        with other._transaction():
+            # Lookups do not wait for a writer in another process
+            assert store.get('a').body == b'content'
+            assert store.get('b') is None
+
+        # Hits & misses are written when flushed
+        assert other.stats()['hits'] == 0
+        with patch.object(httpcache, 'FLUSH_INTERVAL', -1):
+            store.get('a')
+        assert other.stats()['hits'] == 2
+
+    def test_max_age(self):
+        store = SQLiteStore(self.path, max_age=-1)
+        store.set('a', b'content')
+        store.evict()
+        assert store.get('a') is None
+        assert store.stats()['bytes'] == 0
+
+
+class ConditionalRequestTests(unittest.TestCase):
+    url = 'https://api.github.com/repos/pydata/pandas'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.tmp.name, 'cache.sqlite'))
+        httpcache.configure(self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @responses.activate
+    def test_not_modified(self):
+        responses.add(responses.GET, self.url, body=b'{}',
+                      adding_headers={'ETag': '"abc"'})
+        responses.add(responses.GET, self.url, status=304)
+
+        assert httpcache.get(self.url) == b'{}'
+        assert httpcache.get(self.url, expires=0) == b'{}'
+        assert responses.calls[1].request.headers['If-None-Match'] == '"abc"'
+        assert self.store.stats()['not_modified'] == 1
+        assert httpcache.get(self.url) == b'{}'
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_limiter(self):
+        limiter = RateLimiter(MemoryBuckets())
+        responses.add(responses.GET, self.url, body=b'{}', adding_headers={
+            'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '42',
+            'X-RateLimit-Reset': '2000000000'})
+
+        assert httpcache.get(self.url, limiter=limiter) == b'{}'
+        assert httpcache.get(self.url, limiter=limiter) == b'{}'
+        assert limiter.backend._state['core']['remaining'] == 42
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_limiter_outside_lock(self):
+        responses.add(responses.GET, self.url, body=b'{}')
+
+        def acquire():
+            # Other fetches of the URL are not held up by the wait
+            key = httpcache.cache_key(self.url)
+            with self.store.lock(key, False) as acquired:
+                assert acquired
+        limiter = Mock(acquire=Mock(side_effect=acquire))
+
+        assert httpcache.get(self.url, limiter=limiter) == b'{}'
+        assert limiter.acquire.called
+
+    @responses.activate
+    def test_errors_not_cached(self):
+        responses.add(responses.GET, self.url, status=404,
+                      body=b'{"message": "Not Found"}')
+        responses.add(responses.GET, self.url, body=b'{}',
+                      adding_headers={'ETag': '"abc"'})
+        responses.add(responses.GET, self.url, status=403,
+                      body=b'{"message": "API rate limit exceeded"}')
+
+        assert httpcache.get(self.url) == b'{"message": "Not Found"}'
+        assert self.store.get(httpcache.cache_key(self.url)) is None
+        assert httpcache.get(self.url) == b'{}'
+        # The stale entry is returned in place of the error
+        assert httpcache.get(self.url, expires=0) == b'{}'
+        assert self.store.get(httpcache.cache_key(self.url)).body == b'{}'
+        assert len(responses.calls) == 3
+
+    def test_timeout(self):
+        with patch.object(httpcache, 'session') as session:
+            session.return_value.get.return_value = Mock(
+                status_code=200, content=b'{}', headers={})
+            httpcache.get(self.url)
+            httpcache.get(self.url + '/releases', timeout=5)
+
+        timeouts = [kwargs['timeout'] for _, kwargs in
+                    session.return_value.get.call_args_list]
+        assert timeouts == [httpcache.TIMEOUT, 5]
+
+    @responses.activate
+    def test_modified(self):
+        modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        responses.add(responses.GET, self.url, body=b'old',
+                      adding_headers={'Last-Modified': modified})
+        responses.add(responses.GET, self.url, body=b'new')
+
+        assert httpcache.get(self.url) == b'old'
+        assert httpcache.get(self.url, expires=0) == b'new'
+        assert responses.calls[1].request.headers['If-Modified-Since'] == \
+            modified
+        assert self.store.get(httpcache.cache_key(self.url)).modified is None
+
+
+class GetManyTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.tmp.name, 'cache.sqlite'))
+        httpcache.configure(self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @responses.activate
+    def test_get_many(self):
+        urls = ['https://github.com/repo/{}'.format(i) for i in range(10)]
+        for url in urls:
+            responses.add(responses.GET, url, body=url.encode('utf-8'))
+
+        assert httpcache.get_many(urls, max_workers=4) == \
+            [url.encode('utf-8') for url in urls]
+        assert httpcache.get_many(urls[:5], max_workers=4) == \
+            [url.encode('utf-8') for url in urls[:5]]
+        assert len(responses.calls) == 10
+        assert self.store.stats()['hits'] == 5
+
+    def test_session(self):
+        assert httpcache.session() is httpcache.session()
+
+
+class SingleFlightTests(unittest.TestCase):
+    url = 'https://github.com/pydata/pandas'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SQLiteStore(os.path.join(self.tmp.name, 'cache.sqlite'))
+        httpcache.configure(self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_lock(self):
+        lock = KeyLock(os.path.join(self.tmp.name, 'cache.lock'))
+        with lock('a') as acquired:
+            assert acquired
+            rv = []
+            thread = threading.Thread(
+                target=lambda: rv.append(lock('a', False).__enter__()))
+            thread.start()
+            thread.join()
+            assert rv == [False]
+        with lock('a', False) as acquired:
+            assert acquired
+        assert lock._locks == {}
+
+    def test_key_lock_per_key(self):
+        lock = KeyLock(os.path.join(self.tmp.name, 'cache.lock'))
+        keys = ['https://github.com/repo/{}'.format(i) for i in range(100)]
+        with lock(keys[0]):
+            rv = []
+            thread = threading.Thread(target=lambda: rv.extend(
+                lock(key, False).__enter__() for key in keys[1:]))
+            thread.start()
+            thread.join()
+            assert rv == [True] * 99
+
+    @responses.activate
+    def test_single_flight(self):
+        def slow(request):
+            time.sleep(0.1)
+            return 200, {}, b'content'
+        responses.add_callback(responses.GET, self.url, callback=slow)
+
+        rv = []
+        threads = [threading.Thread(
+            target=lambda: rv.append(httpcache.get(self.url)))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert rv == [b'content'] * 8
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_stale_while_revalidate(self):
+        responses.add(responses.GET, self.url, body=b'old')
+        responses.add(responses.GET, self.url, body=b'new')
+
+        assert httpcache.get(self.url) == b'old'
+        time.sleep(0.01)
+        assert httpcache.get(self.url, expires=0, stale=60) == b'old'
+        for _ in range(50):
+            if len(responses.calls) == 2:
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+        assert self.store.get(httpcache.cache_key(self.url)).body == b'new'
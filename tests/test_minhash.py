@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from growser.recommenders.minhash import (
+    MinHashLSH,
+    lsh_params,
+    minhash_signatures,
+    recall_at_k
+)
+
+
+def fake_ratings():
+    """Repositories 1 & 2 share all 10 logins, 3 shares half of them and 4
+    shares none."""
+    logins = list(range(20))
+    df = pd.DataFrame(0, index=[1, 2, 3, 4], columns=logins)
+    df.loc[1, 0:9] = 1
+    df.loc[2, 0:9] = 1
+    df.loc[3, 5:14] = 1
+    df.loc[4, 15:19] = 1
+    return df
+
+
+class LSHParamsTests(unittest.TestCase):
+    def test_meets_recall(self):
+        bands, rows = lsh_params(128, 0.5, 0.95)
+        assert bands * rows <= 128
+        assert 1 - (1 - 0.5 ** rows) ** bands >= 0.95
+
+    def test_prefers_more_rows(self):
+        loose = lsh_params(128, 0.5, 0.5)
+        strict = lsh_params(128, 0.5, 0.99)
+        assert loose[1] >= strict[1]
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            lsh_params(128, 0, 0.95)
+        with self.assertRaises(ValueError):
+            lsh_params(128, 0.5, 1)
+
+
+class MinHashTests(unittest.TestCase):
+    def test_identical_sets(self):
+        matrix = fake_ratings().values
+        sigs = minhash_signatures(matrix, 64)
+        assert sigs.shape == (4, 64)
+        assert (sigs[0] == sigs[1]).all()
+        assert not (sigs[0] == sigs[3]).any()
+
+    def test_recommendations(self):
+        index = MinHashLSH(fake_ratings(), 64, 0.95, 0.3)
+        results = index.recommendations(7)
+        pairs = {(r[1], r[2]): r[3] for r in results}
+
+        assert pairs[(1, 2)] == 1.0
+        assert pairs[(1, 3)] == 5 / 15
+        assert (1, 4) not in pairs
+        assert all(r[0] == 7 for r in results)
+
+    def test_recall_at_k(self):
+        exact = [[6, 1, 2, 0.9], [6, 1, 3, 0.5]]
+        assert recall_at_k(exact, exact) == 1.0
+        assert recall_at_k(exact, [[6, 1, 2, 0.9]]) == 0.5
+        assert np.isclose(recall_at_k(exact, []), 0)
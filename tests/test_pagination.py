@@ -0,0 +1,33 @@
+from datetime import date, datetime
+import unittest
+
+from growser.pagination import decode_cursor, encode_cursor
+
+
+class CursorTests(unittest.TestCase):
+    def test_round_trip(self):
+        created_at = datetime(2016, 5, 1, 12, 30, 15, 250)
+        token = encode_cursor(created_at, 1234)
+        assert decode_cursor(token, datetime, int) == (created_at, 1234)
+
+        token = encode_cursor(date(2016, 5, 1), 'All')
+        assert decode_cursor(token, date, str) == (date(2016, 5, 1), 'All')
+
+    def test_opaque(self):
+        token = encode_cursor(10, 20)
+        assert '=' not in token
+        assert '10' not in token
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor', int)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor(1, 2), int)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor('abc'), int)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor(None), int)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor([1]), datetime)
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor('9' * 20), date)
@@ -0,0 +1,76 @@
+import unittest
+
+from growser.ratelimit import (
+    WINDOW,
+    MemoryBuckets,
+    RateLimiter,
+    observe,
+    take
+)
+
+
+class TakeTests(unittest.TestCase):
+    def test_burst(self):
+        state = {}
+        waits = [take(state, 1000, 3600, 5, 0) for _ in range(6)]
+        assert waits[:5] == [0] * 5
+        # 3,595 remaining requests over the rest of the hour, one per second
+        assert waits[5] == 3600 / 3595 and state['remaining'] == 3595
+
+    def test_refill(self):
+        state = {}
+        for _ in range(5):
+            take(state, 1000, 3600, 5, 0)
+        assert take(state, 1002, 3600, 5, 0) == 0
+        assert state['tokens'] < 2
+
+    def test_reserve(self):
+        state = {'remaining': 10, 'reset': 1060}
+        assert take(state, 1000, 5000, 10, 10) == 60
+        assert take(state, 1060, 5000, 10, 10) == 0
+        assert state['remaining'] == 4999
+        assert state['reset'] == 1060 + WINDOW
+
+    def test_observe(self):
+        state = {}
+        observe(state, 5000, 100, 2000)
+        observe(state, 5000, 200, 2000)
+        assert state['remaining'] == 100
+        observe(state, 5000, 4999, 5600)
+        assert (state['remaining'], state['reset']) == (4999, 5600)
+
+
+class RateLimiterTests(unittest.TestCase):
+    def test_new_window(self):
+        slept = []
+        limiter = RateLimiter(MemoryBuckets(), sleep=slept.append)
+        limiter.update({'X-RateLimit-Limit': '60', 'X-RateLimit-Remaining': '0',
+                        'X-RateLimit-Reset': '0'})
+        assert limiter.acquire() == 0
+        assert not slept
+
+    def test_update_resource(self):
+        backend = MemoryBuckets()
+        limiter = RateLimiter(backend)
+        limiter.update({'X-RateLimit-Limit': '5000',
+                        'X-RateLimit-Remaining': '10',
+                        'X-RateLimit-Reset': '2000000000',
+                        'X-RateLimit-Resource': 'graphql'})
+        limiter.update({})
+        assert backend._state['graphql']['remaining'] == 10
+        assert 'core' not in backend._state
+
+    def test_sleep_is_capped(self):
+        slept = []
+        backend = MemoryBuckets()
+        limiter = RateLimiter(backend, reserve=10, sleep=slept.append)
+        limiter.update({'X-RateLimit-Limit': '5000',
+                        'X-RateLimit-Remaining': '10',
+                        'X-RateLimit-Reset': '9999999999'})
+
+        def sleep(seconds):
+            slept.append(seconds)
+            backend._state['core']['remaining'] = 5000
+        limiter.sleep = sleep
+        assert limiter.acquire() == 60
+        assert slept == [60]
@@ -0,0 +1,32 @@
+import unittest
+
+from growser.reference import ReferenceData
+
+
+class ReferenceDataTests(unittest.TestCase):
+    def setUp(self):
+        self.loaded = []
+        self.version = 1
+
+        def colors():
+            self.loaded.append(True)
+            return {'Python': '#3572A5'}
+
+        self.reference = ReferenceData(
+            {'colors': colors, 'count': lambda: len(self.loaded)},
+            lambda: self.version, interval=0)
+
+    def test_loads_once(self):
+        assert self.reference.get('colors')['Python'] == '#3572A5'
+        assert self.reference.get('count') == 1
+        assert len(self.loaded) == 1
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.reference.get('colors')['Rust'] = '#DEA584'
+
+    def test_version_change(self):
+        self.reference.get('colors')
+        self.version = 2
+        self.reference.get('colors')
+        assert len(self.loaded) == 2
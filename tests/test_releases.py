@@ -0,0 +1,102 @@
+from collections import namedtuple
+import unittest
+from unittest.mock import patch
+
+from growser.commands.releases import UpdateReleases
+from growser.handlers import releases
+from growser.handlers.github import APIError
+from growser.handlers.releases import (
+    RELEASE_TMP_COLUMNS,
+    UpdateReleasesHandler,
+    fetch_releases,
+    release_row
+)
+
+StoredReleases = namedtuple('StoredReleases', ['name', 'release_ids'])
+
+
+def release(release_id, **kwargs):
+    return dict({
+        'id': release_id,
+        'html_url': 'https://github.com/a/b/releases/tag/v{}'.format(
+            release_id),
+        'name': None,
+        'tag_name': 'v{}'.format(release_id),
+        'body': None,
+        'draft': False,
+        'author': {'login': 'octocat', 'id': 583231},
+        'published_at': '2016-01-01T00:00:00Z',
+        'created_at': '2016-01-01T00:00:00Z'
+    }, **kwargs)
+
+
+class FakeAPI:
+    def __init__(self, releases):
+        self.releases_ = releases
+        self.pages = []
+
+    def releases(self, name, page, per_page):
+        self.pages.append(page)
+        return self.releases_[(page - 1) * per_page:page * per_page]
+
+
+class FetchReleasesTests(unittest.TestCase):
+    def test_stops_at_known_releases(self):
+        api = FakeAPI([release(i) for i in range(300, 0, -1)])
+        rv = fetch_releases(api, 'a/b', list(range(1, 296)))
+        assert [r['id'] for r in rv] == [300, 299, 298, 297, 296]
+        assert api.pages == [1, 2]
+
+    def test_out_of_order(self):
+        # Listed by creation date, so new releases can follow stored ones
+        ids = [9, 20, 7, 21, 5] + list(range(100, 295))
+        api = FakeAPI([release(i) for i in ids])
+        rv = fetch_releases(api, 'a/b', [9, 7, 5] + list(range(100, 295)))
+        assert [r['id'] for r in rv] == [20, 21]
+        assert api.pages == [1, 2]
+
+    def test_pages_until_exhausted(self):
+        api = FakeAPI([release(i) for i in range(150, 0, -1)])
+        rv = fetch_releases(api, 'a/b')
+        assert len(rv) == 150
+        assert api.pages == [1, 2]
+
+    def test_skips_drafts_and_missing(self):
+        api = FakeAPI([release(2, draft=True, published_at=None), release(1)])
+        assert [r['id'] for r in fetch_releases(api, 'a/b')] == [1]
+
+        api.releases = lambda *args: {'message': 'Not Found'}
+        assert fetch_releases(api, 'a/b') == []
+
+    def test_errors(self):
+        api = FakeAPI([])
+        api.releases = lambda *args: {'message': 'API rate limit exceeded'}
+        with self.assertRaises(APIError):
+            fetch_releases(api, 'a/b')
+
+
+class UpdateReleasesHandlerTests(unittest.TestCase):
+    def test_failed_repositories_skipped(self):
+        api = FakeAPI([release(2), release(1)])
+        fake_releases = api.releases
+        api.releases = lambda name, *args: fake_releases(name, *args) \
+            if name == 'a/b' else {'message': 'API rate limit exceeded'}
+
+        repos = [StoredReleases('a/b', [1]), StoredReleases('c/d', None)]
+        with patch.object(releases, 'stored_releases', return_value=repos), \
+                patch.object(releases, 'GitHubAPIWrapper', return_value=api), \
+                patch.object(releases, 'merge_releases') as merge, \
+                patch.object(releases, 'log') as log:
+            rv = UpdateReleasesHandler().handle(UpdateReleases())
+
+        assert rv.num_releases == 1
+        assert [row[:2] for row in merge.call_args[0][0]] == [(2, 'a/b')]
+        assert 'c/d' in log.warning.call_args[0]
+
+
+class ReleaseRowTests(unittest.TestCase):
+    def test_release_row(self):
+        row = release_row('a/b', release(1, author=None))
+        assert len(row) == len(RELEASE_TMP_COLUMNS)
+        assert row[:4] == (1, 'a/b', None, 0)
+        assert row[5:8] == ('v1', 'v1', '')
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from growser.search import SearchIndex, repository_terms
+
+ROWS = [
+    (1, 'pydata/pandas', 'Flexible and powerful data analysis', 5000),
+    (2, 'panda/panda', 'A data catalog', 100),
+    (3, 'rust-lang/rust', 'A safe, concurrent, practical language', 8000),
+    (4, 'pallets/flask', 'A microframework based on Werkzeug', 6000)
+]
+
+
+class SearchIndexTests(unittest.TestCase):
+    def test_terms(self):
+        terms = repository_terms('PyData/Pandas', 'Data analysis (in Python)')
+        assert {b'pydata/pandas', b'pydata', b'pandas', b'python'} <= terms
+        assert b'in' not in terms
+
+    def test_suggest(self):
+        index = SearchIndex(ROWS)
+        assert index.suggest('pan') == [(1, 'pydata/pandas'),
+                                         (2, 'panda/panda')]
+        assert index.suggest('pydata/') == [(1, 'pydata/pandas')]
+        assert index.suggest('PANDA', limit=1) == [(1, 'pydata/pandas')]
+        assert index.suggest('  ') == []
+        assert index.suggest('zzz') == []
+
+    def test_description(self):
+        index = SearchIndex(ROWS)
+        assert [r[0] for r in index.suggest('data')] == [1, 2]
+
+    def test_hot_prefixes(self):
+        with patch('growser.search.SCAN_LIMIT', 1):
+            index = SearchIndex(ROWS)
+        assert b'p' in index.hot
+        assert index.suggest('p') == [(3, 'rust-lang/rust'),
+                                       (4, 'pallets/flask'),
+                                       (1, 'pydata/pandas'),
+                                       (2, 'panda/panda')]
+
+
+class SaveLoadTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'search', 'index')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        with patch('growser.search.SCAN_LIMIT', 1):
+            SearchIndex(ROWS).save(self.path)
+        index = SearchIndex.load(self.path)
+        assert b'p' in index.hot
+        assert index.suggest('p', limit=2) == [(3, 'rust-lang/rust'),
+                                                (4, 'pallets/flask')]
+        assert index.suggest('pan') == [(1, 'pydata/pandas'),
+                                         (2, 'panda/panda')]
+
+    def test_replace(self):
+        SearchIndex(ROWS).save(self.path)
+        index = SearchIndex.load(self.path)
+        SearchIndex(ROWS[2:]).save(self.path)
+
+        # The previous version stays readable once it has been removed
+        assert len(os.listdir(os.path.dirname(self.path))) == 2
+        assert index.suggest('pan') == [(1, 'pydata/pandas'),
+                                         (2, 'panda/panda')]
+        assert SearchIndex.load(self.path).suggest('pan') == []
+
+    def test_empty(self):
+        SearchIndex([]).save(self.path)
+        assert SearchIndex.load(self.path).suggest('pan') == []
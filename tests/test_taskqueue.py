@@ -0,0 +1,173 @@
+from datetime import date, datetime, timedelta
+import os
+from os.path import join
+import unittest
+from unittest.mock import Mock, patch
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from growser import taskqueue
+from growser.app import db
+from growser.models import (Repository, RepositoryDailyEvents,
+                            RepositoryTask, TaskQueue, TaskQueueWindow)
+from growser.taskqueue import (GITHUB_API, SCREENSHOT, SQL_PATH, WINDOW,
+                               advance_window, next_repositories)
+
+#: Empty Postgres database for the queue SQL, e.g. postgresql:///growser_test
+TEST_DATABASE_URI = os.environ.get('GROWSER_TEST_DATABASE_URI')
+
+
+class NextRepositoriesTests(unittest.TestCase):
+    def test_query(self):
+        session = Mock()
+        query = Mock(side_effect=lambda *entities: Query(entities, session))
+        with patch.object(taskqueue, 'db', Mock(session=Mock(query=query))):
+            next_repositories(SCREENSHOT, 50, 7, 10)
+
+        compiled = session.execute.call_args[0][0].compile(
+            dialect=postgresql.dialect())
+        sql = ' '.join(str(compiled).split())
+        assert 'FROM task_queue JOIN repository ' \
+               'ON repository.repo_id = task_queue.repo_id' in sql
+        assert 'task_queue.task = %(task_1)s' in sql
+        assert 'repository.status = %(status_1)s' in sql
+        assert 'task_queue.num_events >= %(num_events_1)s' in sql
+        assert '(task_queue.refreshed_at IS NULL OR ' \
+               'task_queue.refreshed_at < %(refreshed_at_1)s)' in sql
+        assert sql.endswith('ORDER BY task_queue.num_events DESC '
+                            'LIMIT %(param_1)s')
+        assert compiled.params == {
+            'task_1': SCREENSHOT,
+            'status_1': 1,
+            'num_events_1': 10,
+            'refreshed_at_1': date.today() - timedelta(days=7),
+            'param_1': 50
+        }
+
+
+class AdvanceWindowTests(unittest.TestCase):
+    today = date(2016, 6, 1)
+    start_date = today - timedelta(days=WINDOW)
+
+    def advance(self, window):
+        with patch.object(taskqueue, 'TaskQueueWindow') as model, \
+                patch.object(taskqueue, 'db') as db, \
+                patch.object(taskqueue, 'open', create=True) as fh:
+            model.query.first.return_value = window
+            fh.return_value.read.return_value = ''
+            advance_window(self.today)
+            if not db.engine.execute.called:
+                return None, None
+            return fh.call_args[0][0], db.engine.execute.call_args[1]
+
+    def test_rebuild(self):
+        filename, params = self.advance(None)
+        assert filename.endswith('rebuild_task_queue.sql')
+        assert params == {'start_date': self.start_date}
+
+        old = Mock(start_date=self.start_date - timedelta(days=WINDOW))
+        filename, _ = self.advance(old)
+        assert filename.endswith('rebuild_task_queue.sql')
+
+    def test_advance(self):
+        prev = self.start_date - timedelta(days=1)
+        filename, params = self.advance(Mock(start_date=prev))
+        assert filename.endswith('advance_task_queue.sql')
+        assert params == {'start_date': self.start_date,
+                          'prev_start_date': prev}
+
+    def test_current(self):
+        assert self.advance(Mock(start_date=self.start_date)) == (None, None)
+
+
+@unittest.skipUnless(TEST_DATABASE_URI, 'GROWSER_TEST_DATABASE_URI not set')
+class TaskQueueSQLTests(unittest.TestCase):
+    """Run the queue SQL against Postgres in a transaction that is rolled
+    back, so the database is left empty."""
+    start_date = date(2016, 3, 1)
+
+    def setUp(self):
+        self.conn = create_engine(TEST_DATABASE_URI).connect()
+        self.addCleanup(self.conn.close)
+        self.addCleanup(self.conn.begin().rollback)
+        self.conn.execute('CREATE SCHEMA test_task_queue')
+        self.conn.execute('SET LOCAL search_path TO test_task_queue')
+        tables = [Repository, RepositoryDailyEvents, RepositoryTask,
+                  TaskQueue, TaskQueueWindow]
+        db.metadata.create_all(self.conn, [t.__table__ for t in tables])
+
+        # 1 & 2 are active, 3 is disabled & 4 has no events in the window
+        for repo_id, status in [(1, 1), (2, 1), (3, 0), (4, 1)]:
+            self.insert(Repository, repo_id=repo_id, status=status,
+                        name='a/{}'.format(repo_id), owner='a', homepage='',
+                        language='Python', description='', num_events=0,
+                        num_stars=0, num_forks=0, num_watchers=0,
+                        created_at=datetime(2016, 1, 1),
+                        updated_at=datetime(2016, 1, 1))
+        for days in range(WINDOW + 10):
+            for_date = self.start_date + timedelta(days=days)
+            self.insert(RepositoryDailyEvents, repo_id=1, date=for_date,
+                        num_events=1)
+            self.insert(RepositoryDailyEvents, repo_id=2, date=for_date,
+                        num_events=days % 3)
+            self.insert(RepositoryDailyEvents, repo_id=3, date=for_date,
+                        num_events=5)
+        self.insert(RepositoryDailyEvents, repo_id=4, num_events=10,
+                    date=self.start_date - timedelta(days=1))
+        self.insert(RepositoryTask, repo_id=1, name='screenshot.homepage',
+                    created_at=datetime(2016, 4, 1))
+        self.insert(RepositoryTask, repo_id=2, name=GITHUB_API,
+                    created_at=datetime(2016, 4, 2))
+
+    def insert(self, model, **values):
+        self.conn.execute(model.__table__.insert(), **values)
+
+    def execute(self, filename, **params):
+        query = open(join(SQL_PATH, filename)).read()
+        self.conn.execute(text(query), **params)
+
+    def queue(self) -> set:
+        return {tuple(row) for row in self.conn.execute(
+            'SELECT task, repo_id, num_events, refreshed_at FROM task_queue '
+            'WHERE num_events > 0')}
+
+    def window(self) -> date:
+        return self.conn.execute(
+            'SELECT start_date FROM task_queue_window').scalar()
+
+    def test_rebuild(self):
+        self.execute('rebuild_task_queue.sql', start_date=self.start_date)
+        assert self.window() == self.start_date
+        assert self.queue() == {
+            (GITHUB_API, 1, WINDOW + 10, None),
+            (GITHUB_API, 2, WINDOW + 10 - 1, datetime(2016, 4, 2)),
+            (SCREENSHOT, 1, WINDOW + 10, datetime(2016, 4, 1)),
+            (SCREENSHOT, 2, WINDOW + 10 - 1, None)
+        }
+
+    def test_advance_matches_rebuild(self):
+        self.execute('rebuild_task_queue.sql', start_date=self.start_date)
+        for days in [1, 2, 7]:
+            start_date = self.start_date + timedelta(days=days)
+            self.execute('advance_task_queue.sql', start_date=start_date,
+                         prev_start_date=self.window())
+            advanced = self.queue()
+
+            self.execute('rebuild_task_queue.sql', start_date=start_date)
+            assert self.window() == start_date
+            assert advanced == self.queue()
+
+    def test_advance_twice(self):
+        self.execute('rebuild_task_queue.sql', start_date=self.start_date)
+        start_date = self.start_date + timedelta(days=WINDOW + 9)
+        for _ in range(2):
+            self.execute('advance_task_queue.sql', start_date=start_date,
+                         prev_start_date=self.start_date)
+        assert self.window() == start_date
+
+        # 2 has no events on the last day & is removed from the queue
+        assert self.conn.execute('SELECT task, repo_id, num_events '
+                                 'FROM task_queue ORDER BY 1, 2').fetchall() \
+            == [(GITHUB_API, 1, 1), (SCREENSHOT, 1, 1)]
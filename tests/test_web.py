@@ -0,0 +1,105 @@
+from datetime import datetime
+import unittest
+from unittest.mock import MagicMock, Mock, patch
+
+from growser import web
+from growser.app import app, cache
+from growser.cache import LRUCache
+from growser.models import RankingTrend
+
+
+def release(release_id, **kwargs):
+    repository = Mock(language='Python', num_events=1234)
+    repository.name = 'pydata/pandas'
+    rv = Mock(**dict({
+        'release_id': release_id,
+        'repository': repository,
+        'tag': 'v0.{}'.format(release_id),
+        'body': '',
+        'created_at': datetime(2016, 5, 1)
+    }, **kwargs))
+    rv.name = None
+    return rv
+
+
+class ViewTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        for patcher in [patch.object(cache, 'backend', LRUCache()),
+                        patch.object(web, 'reference', Mock())]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class RepositoryTests(ViewTestCase):
+    def test_releases_invalidate(self):
+        calls = []
+        with patch.object(web, 'bus', Mock()), \
+                patch.object(web, 'render',
+                             lambda *args, **kwargs: calls.append(1) or ''):
+            self.client.get('/r/pydata/pandas')
+            self.client.get('/r/pydata/pandas')
+            cache.bump('releases')
+            self.client.get('/r/pydata/pandas')
+        assert len(calls) == 2
+
+
+class ReleasesTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.query = MagicMock()
+        self.query.order_by.return_value = self.query
+        self.query.filter.return_value = self.query
+        self.query.limit.return_value.all.return_value = \
+            [release(2), release(1, body='Notes')]
+        for name, value in [('Release', Mock(query=self.query)),
+                            ('top_languages', lambda limit: ('Python',))]:
+            patcher = patch.object(web, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_releases(self):
+        rv = self.client.get('/releases')
+        assert rv.status_code == 200
+        assert b'pydata/pandas' in rv.data
+        assert b'data-api-uri="/api/release/1"' in rv.data
+        assert b'/releases/Python' in rv.data
+
+    def test_language(self):
+        rv = self.client.get('/releases/Python')
+        assert rv.status_code == 200
+        assert b'Recent Releases in Python' in rv.data
+        self.query.filter.assert_called_once_with(
+            web.Release.repository.has.return_value)
+
+    def test_invalid_cursor(self):
+        assert self.client.get('/releases?after=abc').status_code == 400
+
+
+class TrendingTests(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.query = MagicMock()
+        self.query.filter.return_value = self.query
+        self.query.order_by.return_value = self.query
+        self.query.limit.return_value.all.return_value = []
+        model = Mock(query=self.query, period=RankingTrend.period,
+                     end_date=RankingTrend.end_date,
+                     language=RankingTrend.language,
+                     rank_delta=RankingTrend.rank_delta)
+        patcher = patch.object(web, 'RankingTrend', model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def period_id(self, url):
+        self.query.filter.reset_mock()
+        assert self.client.get(url).status_code == 200
+        for args, _ in self.query.filter.call_args_list:
+            if args[0].left.key == 'period':
+                return args[0].right.value
+
+    def test_periods(self):
+        assert self.period_id('/trending') == 4
+        assert self.period_id('/trending?p=w') == 3
+        assert self.period_id('/trending?p=m') == 2
+        assert self.period_id('/trending/Python?p=a') == 1